@@ -45,6 +45,8 @@ INSTALLED_APPS = [
     #Our Apps
     'users.apps.UsersConfig',
     'issues.apps.IssuesConfig',
+    'taskqueue.apps.TaskqueueConfig',
+    'outbox.apps.OutboxConfig',
 ]
 
 AUTH_USER_MODEL = 'users.User' # app_label.ModelName
@@ -91,6 +93,54 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The issue list result cache (issues/list_cache.py) and the issue detail page
+# fragments (issues/page_cache.py) have their own aliases so they can sit on a
+# shared server once there are several app servers; with locmem every process
+# has its own copy and only sees its own invalidations. From your .env:
+#   ISSUE_LIST_CACHE_BACKEND     locmem (default, per process) | file | redis
+#   ISSUE_LIST_CACHE_LOCATION    directory for 'file', e.g. redis://127.0.0.1:6379/1 for 'redis'
+#                                (any Redis-protocol server; needs the redis package)
+#   ISSUE_DETAIL_CACHE_BACKEND   the same choices for the detail page fragments (default: as the list)
+#   ISSUE_DETAIL_CACHE_LOCATION  (default: the list cache's Redis server, or a directory/locmem of its own)
+
+_ISSUE_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+
+def _issue_cache(backend, location, name, max_entries):
+    cache = {
+        'BACKEND': _ISSUE_CACHE_BACKENDS[backend],
+        'LOCATION': location or (str(BASE_DIR / 'cache' / name) if backend == 'file' else name.replace('_', '-')),
+        'KEY_PREFIX': name,  # Both aliases may point at the same Redis database
+    }
+    if backend != 'redis':
+        cache['OPTIONS'] = {'MAX_ENTRIES': max_entries}
+    return cache
+
+
+_ISSUE_LIST_CACHE_BACKEND = config('ISSUE_LIST_CACHE_BACKEND', default='locmem')
+_ISSUE_LIST_CACHE_LOCATION = config('ISSUE_LIST_CACHE_LOCATION', default='')
+_ISSUE_DETAIL_CACHE_BACKEND = config('ISSUE_DETAIL_CACHE_BACKEND', default=_ISSUE_LIST_CACHE_BACKEND)
+_ISSUE_DETAIL_CACHE_LOCATION = config(
+    'ISSUE_DETAIL_CACHE_LOCATION', default=_ISSUE_LIST_CACHE_LOCATION if _ISSUE_DETAIL_CACHE_BACKEND == 'redis' else '',
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Every cached page is ~11 entries (the id list and its rows); Django's default cap is 300
+    'issue_list': _issue_cache(_ISSUE_LIST_CACHE_BACKEND, _ISSUE_LIST_CACHE_LOCATION, 'issue_list', 20000),
+    # Four fragments and a version key per issue
+    'issue_detail': _issue_cache(_ISSUE_DETAIL_CACHE_BACKEND, _ISSUE_DETAIL_CACHE_LOCATION, 'issue_detail', 5000),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -162,3 +212,71 @@ SITE_URL = 'http://127.0.0.1:8000'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+
+# Issue list pagination: 'cursor' (keyset, no COUNT/OFFSET on deep pages) or 'offset' (numbered pages)
+ISSUE_LIST_PAGINATION = 'cursor'
+ISSUE_LIST_APPROXIMATE_TOTAL = True      # Show "about N issues" in cursor mode (cached COUNT)
+ISSUE_LIST_APPROXIMATE_TOTAL_TTL = 300   # Seconds the cached total is reused per filter combination
+ISSUE_LIST_CACHE_ALIAS = 'issue_list'    # CACHES entry holding cached list pages (issues/list_cache.py)
+ISSUE_LIST_CACHE_TIMEOUT = 300           # Seconds a cached list page lives (writes invalidate it sooner)
+
+ISSUE_MAP_CACHE_TIMEOUT = 60             # Seconds a clustered map viewport response is cached
+ISSUE_DETAIL_CACHE_ALIAS = 'issue_detail'  # CACHES entry holding detail page fragments (issues/page_cache.py)
+ISSUE_DETAIL_CACHE_TIMEOUT = 600         # Seconds a detail page fragment lives (relative "... ago" times can lag this much)
+
+# Duplicate detection for new reports (issues/duplicates.py)
+DUPLICATE_RADIUS_METERS = 150            # Only open issues this close are considered
+DUPLICATE_MIN_SIMILARITY = 0.3           # Minimum estimated text similarity (0-1)
+
+# Reverse geocoding of issue locations to municipal areas (issues/geocoding.py)
+# Ward/suburb polygons. Not shipped with the code: download your city's boundaries (see README.md).
+# Without the file every new issue falls back to Nominatim; `manage.py check` warns about it.
+MUNICIPAL_AREA_GEOJSON = config('MUNICIPAL_AREA_GEOJSON', default=str(BASE_DIR / 'data' / 'municipal_areas.geojson'))
+MUNICIPAL_AREA_NAME_PROPERTY = 'name'    # Feature property holding the area name
+MUNICIPAL_AREA_NOMINATIM_FALLBACK = True # Ask Nominatim when the point is outside every local polygon
+GEOCODE_CACHE_PRECISION = 3              # Decimal places of the cache key (3 = ~110 m)
+GEOCODE_CACHE_TTL_DAYS = 30              # How long a Nominatim answer is reused
+GEOCODE_CACHE_MEMORY_SIZE = 10000        # Entries in the in-process LRU in front of the DB cache
+GEOCODE_BREAKER_FAILURE_THRESHOLD = 3    # Consecutive Nominatim failures before we stop calling it
+GEOCODE_BREAKER_RESET_SECONDS = 300      # Wait before trying Nominatim again
+
+# Background tasks (taskqueue/queue.py); run them with `python manage.py runworker`
+TASK_QUEUE = {
+    'EAGER': False,                      # True: run tasks in-process after commit (no worker needed)
+    'CONCURRENCY': 2,                    # Worker threads per runworker process
+    'POLL_INTERVAL': 1.0,                # Seconds an idle worker waits before checking again
+    'MAX_ATTEMPTS': 5,                   # Default attempts before a task is marked failed
+    'RETRY_BACKOFF_BASE': 10,            # Seconds before the first retry; doubles each attempt
+    'RETRY_BACKOFF_MAX': 3600,           # Upper bound for the retry delay
+    'LOCK_TIMEOUT': 600,                 # A task 'running' longer than this is assumed abandoned
+}
+
+# Outgoing email (outbox/mail.py): queued, then sent in batches over one SMTP connection
+EMAIL_OUTBOX = {
+    'FLUSH_DELAY': 5,                    # Seconds to collect a burst of emails before sending
+    'FLUSH_INTERVAL': 60,                # Seconds between flushes while a backlog remains
+    'BATCH_SIZE': 50,                    # Messages per send_messages() call
+    'MAX_PER_FLUSH': 500,                # Messages per flush; caps our sending rate for the provider
+    'MAX_ATTEMPTS': 5,                   # Failed flushes before a message is marked failed
+}
+ISSUE_ADMIN_NOTIFICATIONS = 'immediate'  # 'immediate': one email per new issue; 'digest': one summary per interval
+ISSUE_ADMIN_DIGEST_INTERVAL = 3600       # Seconds covered by one staff digest
+
+# Generated PDF reports are kept for reuse until they are this old, or until
+# together they exceed this size (least recently downloaded go first).
+REPORT_CACHE_MAX_AGE_DAYS = 7
+REPORT_CACHE_MAX_TOTAL_MB = 500
+# Large reports are laid out in chunks of this many issues, in parallel
+# processes (None: one per CPU core). See issues/report_render.py.
+REPORT_CHUNK_SIZE = 1000
+REPORT_RENDER_PROCESSES = None
+# Uploaded photos are rotated upright, stripped of metadata and downscaled to
+# this many pixels on the longest side before they are stored (issues/uploads.py).
+UPLOAD_IMAGE_MAX_DIMENSION = 2560
+UPLOAD_IMAGE_QUALITY = 85
+UPLOAD_IMAGE_WORKERS = 4  # Threads shared by all requests for processing uploads
+IMAGE_DERIVATIVE_FORMAT = 'WEBP'  # Thumbnails/mid-size copies: 'WEBP' or 'JPEG' (issues/thumbnails.py)
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched per query by the CSV/JSONL export (issues/export.py)
+# The view query-budget tests always check query counts; the SQL time budgets
+# depend on the machine, so they are only enforced when this is on (issues/budgets.py).
+QUERY_BUDGET_CHECK_SQL_TIME = config('QUERY_BUDGET_CHECK_SQL_TIME', default=False, cast=bool)
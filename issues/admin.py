@@ -1,10 +1,14 @@
 # issues/admin.py
 
 from django.contrib import admin, messages
-from django.utils.html import format_html
+from django.db.models import Prefetch
+from django.utils.html import format_html, format_html_join
 from django.urls import reverse
 from django.utils import timezone
-from .models import IssueCategory, Issue, Upvote, Comment, IssueImage
+from .models import IssueCategory, Issue, Upvote, Comment, IssueImage, ReportJob
+from . import duplicates
+from . import bulk
+from .budgets import QueryBudget
 
 # ------------------------------
 # IssueCategory Admin
@@ -26,7 +30,7 @@ class IssueImageInline(admin.TabularInline):
 
     def image_thumbnail(self, obj):
         if obj.image:
-            return format_html('<a href="{}"><img src="{}" width="150" /></a>', obj.image.url, obj.image.url)
+            return format_html('<a href="{}"><img src="{}" width="150" /></a>', obj.image.url, obj.thumbnail_url)
         return "No Image"
     image_thumbnail.short_description = 'Thumbnail Preview'
 
@@ -43,13 +47,30 @@ class IssueAdmin(admin.ModelAdmin):
         return "Not Assigned"
     assigned_manager_name.short_description = 'Manager Name'
 
+    # Open issues nearby in the same category with similar text (issues/duplicates.py)
+    def possible_duplicates(self, obj):
+        if not obj.pk:
+            return "-"
+        candidates = duplicates.find_duplicates_of(obj)
+        if not candidates:
+            return "No likely duplicates found"
+        return format_html_join(
+            format_html('<br>'), '<a href="{}">#{} {}</a> ({}% similar, {} m away)',
+            (
+                (reverse('admin:issues_issue_change', args=[c.issue.pk]), c.issue.pk, c.issue.title,
+                 round(c.similarity * 100), round(c.distance_m))
+                for c in candidates
+            )
+        )
+    possible_duplicates.short_description = 'Possible Duplicates'
+
     # Show thumbnail in list view
     def list_image_preview(self, obj):
-        first_image = obj.images.first()
+        first_image = obj.images.first()  # Served from the prefetch in get_queryset()
         if first_image and first_image.image:
             return format_html(
                 '<a href="{}"><img src="{}" width="50" height="50" style="object-fit: cover;"/></a>',
-                first_image.image.url, first_image.image.url
+                first_image.image.url, first_image.thumbnail_url
             )
         return "(No images)"
     list_image_preview.short_description = 'Image Preview'
@@ -85,6 +106,15 @@ class IssueAdmin(admin.ModelAdmin):
     )
 
     list_editable = ('status', 'priority')
+    # Spelled out: the automatic select_related() skips nullable FKs (category, manager), one query per row each
+    list_select_related = ('user', 'category', 'assigned_to_manager')
+    query_budget = QueryBudget(queries=12, sql_ms=100)  # Changelist; see issues/budgets.py
+
+    def get_queryset(self, request):
+        # Ordered like images.first(), so first() reads the prefetched list instead of one query per row
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('images', queryset=IssueImage.objects.order_by('pk'))
+        )
     raw_id_fields = ('user', 'category', 'assigned_to_manager')
 
     fieldsets = (
@@ -95,7 +125,8 @@ class IssueAdmin(admin.ModelAdmin):
                 'priority',
                 ('assigned_to_manager', 'assigned_manager_name'),
                 'internal_notes',
-                'municipal_area'
+                'municipal_area',
+                'possible_duplicates'
             )
         }),
         ('Location & Media', {
@@ -114,25 +145,26 @@ class IssueAdmin(admin.ModelAdmin):
     readonly_fields = (
         'reported_date', 'created_at', 'updated_at',
         'upvotes_count', 'resolution_notes', 'resolution_image', 'municipal_area',
-        'assigned_manager_name'
+        'assigned_manager_name', 'possible_duplicates'
     )
 
     inlines = [IssueImageInline]
 
     # ---------- Custom Admin Actions ----------
+    # bulk.update_issues() keeps the counters, rollup, map cells and caches current (queryset.update() alone doesn't)
     @admin.action(description='Mark selected issues as Verified & Awaiting Assignment')
     def make_verified_awaiting_assignment(self, request, queryset):
-        updated_count = queryset.update(status='Verified')
+        updated_count = bulk.update_issues(queryset, status='Verified')
         self.message_user(request, f'{updated_count} issues marked as Verified & Awaiting Assignment.', messages.SUCCESS)
 
     @admin.action(description='Mark selected issues as Under Review')
     def make_under_review(self, request, queryset):
-        updated_count = queryset.update(status='Under Review')
+        updated_count = bulk.update_issues(queryset, status='Under Review')
         self.message_user(request, f'{updated_count} issues marked as Under Review.', messages.SUCCESS)
 
     @admin.action(description='Mark selected issues as Resolved')
     def make_resolved(self, request, queryset):
-        updated_count = queryset.update(status='Resolved')
+        updated_count = bulk.update_issues(queryset, status='Resolved')
         self.message_user(request, f'{updated_count} issues marked as Resolved.', messages.SUCCESS)
 
     actions = ['make_verified_awaiting_assignment', 'make_under_review', 'make_resolved']
@@ -172,3 +204,14 @@ class CommentAdmin(admin.ModelAdmin):
     @admin.display(boolean=True, description='Recent?')
     def is_recent_comment(self, obj):
         return obj.created_at >= timezone.now() - timezone.timedelta(days=7)
+
+
+# ------------------------------
+# ReportJob Admin
+# ------------------------------
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'requested_by', 'status_filter', 'state', 'file_size', 'created_at', 'last_accessed_at')
+    list_filter = ('state', 'created_at')
+    search_fields = ('requested_by__username',)
+    readonly_fields = ('cache_key', 'data_version', 'created_at', 'finished_at', 'last_accessed_at', 'error')
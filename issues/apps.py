@@ -6,4 +6,5 @@ class IssuesConfig(AppConfig):
     name = 'issues'
 
     def ready(self):
-        import issues.signals # Import your signals module
\ No newline at end of file
+        import issues.signals # Import your signals module
+        import issues.checks # Registers the system checks
@@ -0,0 +1,119 @@
+# issues/blobs.py
+"""
+Reference counting for content-addressed image files (issues/storage.py).
+
+signals.py calls acquire() when an IssueImage or a resolution image starts
+pointing at a blob and release() when it stops (row deleted or image
+replaced). When the count reaches zero the blob and its thumbnails are
+deleted, after the transaction commits and only if nobody acquired or
+reserved it again in the meantime (a reservation covers the gap between the
+storage handing out an existing name and the row that uses it being saved;
+a blob held only by a reservation is looked at again once it runs out). Files outside the blob area (uploads from before this
+existed) are never deleted here; `python manage.py dedupe_media` moves them in.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import thumbnails
+from .models import Issue, IssueImage, MediaBlob
+from .storage import blob_storage, is_blob_name
+
+# How long a blob the storage handed out is kept even at zero references
+RESERVATION = timedelta(minutes=15)
+
+
+def reserve(name, size):
+    """Keep `name` from being deleted for RESERVATION; called by the storage before it checks the file."""
+    now = timezone.now()
+    if MediaBlob.objects.filter(name=name).update(reserved_at=now):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, size=size, refcount=0, reserved_at=now)
+    except IntegrityError:  # Someone else created the row in the meantime
+        MediaBlob.objects.filter(name=name).update(reserved_at=now)
+
+
+def acquire(name):
+    if not is_blob_name(name):
+        return
+    if MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1):
+        return
+    storage = blob_storage()
+    size = storage.size(name) if storage.exists(name) else 0
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, size=size, refcount=1)
+    except IntegrityError:  # Someone else created the row in the meantime
+        MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def release(name):
+    if not is_blob_name(name):
+        return
+    MediaBlob.objects.filter(name=name).update(refcount=F('refcount') - 1)
+    transaction.on_commit(lambda: collect(name))
+
+
+def collect(name):
+    """Delete an unreferenced blob now, or once the upload that reserved it has had its chance to take a reference."""
+    from . import tasks  # tasks imports this module
+
+    if delete_if_unreferenced(name):
+        return
+    if MediaBlob.objects.filter(name=name, refcount__lte=0).exists():  # Held only by a reservation
+        tasks.collect_media_blob.schedule_once(name, countdown=int(RESERVATION.total_seconds()))
+
+
+def delete_file(name):
+    """Remove a stored image and its thumbnails."""
+    storage = blob_storage()
+    for size in thumbnails.SIZES:
+        storage.delete(thumbnails.derivative_name(name, size))
+    storage.delete(name)
+
+
+def delete_if_unreferenced(name):
+    # The conditional delete is the lock: it only succeeds while the count is still
+    # zero and nobody reserved the blob. The file goes before the delete commits, so
+    # a reserve() waiting on the row sees the file gone and has it written again.
+    unreserved = Q(reserved_at__isnull=True) | Q(reserved_at__lt=timezone.now() - RESERVATION)
+    with transaction.atomic():
+        deleted, _ = MediaBlob.objects.filter(unreserved, name=name, refcount__lte=0).delete()
+        if deleted:
+            delete_file(name)
+    return bool(deleted)
+
+
+def referenced_names():
+    """Counter of stored image names -> number of rows pointing at them."""
+    names = Counter(IssueImage.objects.exclude(image='').values_list('image', flat=True).iterator())
+    names.update(
+        Issue.objects.exclude(resolution_image='').exclude(resolution_image__isnull=True)
+        .values_list('resolution_image', flat=True).iterator()
+    )
+    return names
+
+
+def rebuild_refcounts():
+    """Recount every blob's references from the tables. Returns {name: (old, new)} for the ones that were off."""
+    storage = blob_storage()
+    actual = {name: count for name, count in referenced_names().items() if is_blob_name(name)}
+    drift = {}
+    with transaction.atomic():
+        for blob in MediaBlob.objects.select_for_update():
+            count = actual.pop(blob.name, 0)
+            if blob.refcount != count:
+                drift[blob.name] = (blob.refcount, count)
+                MediaBlob.objects.filter(pk=blob.pk).update(refcount=count)
+        missing = [
+            MediaBlob(name=name, refcount=count, size=storage.size(name) if storage.exists(name) else 0)
+            for name, count in actual.items()
+        ]
+        MediaBlob.objects.bulk_create(missing, batch_size=500)
+    drift.update({blob.name: (0, blob.refcount) for blob in missing})
+    return drift
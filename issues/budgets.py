@@ -0,0 +1,87 @@
+# issues/budgets.py
+"""
+SQL budgets per view.
+
+Each view declares, next to its definition, the most queries (and optionally
+the most total SQL time) a single request may cost:
+
+    @query_budget(queries=8, sql_ms=100)
+    def issue_detail(request, pk): ...
+
+    class IssueListView(ListView):
+        query_budget = QueryBudget(queries=10, sql_ms=100)
+
+and a ModelAdmin can set `query_budget` for its changelist. issues/tests.py
+requests every view against a seeded dataset with empty caches (the
+expensive case) and fails when one goes over budget, listing the statements
+that ran more than once -- the usual signature of an N+1 loop. SQL time
+depends on the machine, so it only counts with QUERY_BUDGET_CHECK_SQL_TIME
+on (e.g. on a known benchmark box). Budgets are plain attributes
+(functools.wraps carries them through login_required and friends); nothing
+is measured in production.
+"""
+import re
+from collections import Counter, namedtuple
+
+from django.conf import settings
+
+QueryBudget = namedtuple('QueryBudget', ['queries', 'sql_ms'], defaults=[None])
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_VALUE_LIST = re.compile(r'\((?:\s*\?\s*,)*\s*\?\s*\)')
+
+
+def query_budget(queries, sql_ms=None):
+    """Declare a view function's budget."""
+    def decorator(view):
+        view.query_budget = QueryBudget(queries, sql_ms)
+        return view
+    return decorator
+
+
+def budget_for(view):
+    """The budget declared for a resolved URL's view function, class-based view or admin changelist."""
+    budget = getattr(view, 'query_budget', None)
+    for owner in (getattr(view, 'view_class', None), getattr(view, 'model_admin', None)):
+        if budget is None and owner is not None:
+            budget = getattr(owner, 'query_budget', None)
+    return budget
+
+
+def normalize_sql(sql):
+    """The statement with its literal values replaced, so repeats with different parameters group together."""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _VALUE_LIST.sub('(...)', sql)
+
+
+def duplicate_queries(captured_queries, limit=5):
+    """[(normalized sql, times run)] for the statements run more than once, most repeated first."""
+    counts = Counter(normalize_sql(query['sql']) for query in captured_queries)
+    return [(sql, count) for sql, count in counts.most_common(limit) if count > 1]
+
+
+def budget_report(budget, captured_queries, check_time=None):
+    """
+    Why the captured queries of one request exceed `budget`, or '' if they don't.
+    `captured_queries` as collected by CaptureQueriesContext (time in seconds).
+    SQL time counts only with `check_time` (default: QUERY_BUDGET_CHECK_SQL_TIME).
+    """
+    if check_time is None:
+        check_time = getattr(settings, 'QUERY_BUDGET_CHECK_SQL_TIME', False)
+    query_count = len(captured_queries)
+    sql_ms = sum(float(query['time']) for query in captured_queries) * 1000
+    problems = []
+    if query_count > budget.queries:
+        problems.append(f"{query_count} queries (budget {budget.queries})")
+    if check_time and budget.sql_ms is not None and sql_ms > budget.sql_ms:
+        problems.append(f"{sql_ms:.1f} ms of SQL (budget {budget.sql_ms} ms)")
+    if not problems:
+        return ''
+    lines = ['Over budget: ' + ', '.join(problems) + '.']
+    repeated = duplicate_queries(captured_queries)
+    if repeated:
+        lines.append('Most repeated queries:')
+        lines.extend(f'  {count}x {sql[:300]}' for sql, count in repeated)
+    return '\n'.join(lines)
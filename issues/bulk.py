@@ -0,0 +1,66 @@
+# issues/bulk.py
+"""
+Bulk issue updates that keep the derived data current.
+
+queryset.update() writes the rows directly: Issue.save() doesn't run, and
+neither do the change handlers in signals.py. update_issues() is the way to
+change many issues at once (admin bulk actions, background tasks). After the
+UPDATE it does the bookkeeping a save() of each issue would have triggered,
+for the issues whose values actually changed:
+
+    status, priority, assigned_to_manager   dashboard counters (stats.py)
+    status, category, municipal_area        daily rollup (rollup.py)
+    status, category, latitude, longitude   map cells (clustering.py)
+    category, municipal_area                search index (search.py)
+    any field                               detail page and list caches, updated_at
+                                            (the PDF report data version, reports.py)
+
+It does not queue the notification emails a save() would, and it doesn't
+cover title/description (duplicate signatures) or latitude/longitude edits
+(geo cells): save those issues one by one.
+"""
+from django.db import models, transaction
+from django.utils import timezone
+
+from . import clustering, list_cache, page_cache, rollup, search, stats
+from .models import Issue
+
+TRACKED_FIELDS = tuple(dict.fromkeys(stats.TRACKED_FIELDS + rollup.TRACKED_FIELDS + clustering.TRACKED_FIELDS))
+SEARCH_FIELDS = ('category_id', 'municipal_area')
+UNSUPPORTED_FIELDS = ('title', 'description', 'latitude', 'longitude')
+
+
+def update_issues(queryset, **values):
+    """
+    queryset.update(**values) plus the bookkeeping above. `values` are plain
+    values (no F() expressions), by field name or attname. Returns the
+    number of issues updated.
+    """
+    values = {
+        Issue._meta.get_field(name).attname: value.pk if isinstance(value, models.Model) else value
+        for name, value in values.items()
+    }
+    unsupported = set(values) & set(UNSUPPORTED_FIELDS)
+    if unsupported:
+        raise ValueError(f"update_issues() can't update {', '.join(sorted(unsupported))}; save those issues instead.")
+
+    with transaction.atomic():
+        rows = list(queryset.order_by().select_for_update().values('pk', *TRACKED_FIELDS))
+        pks = [row['pk'] for row in rows]
+        if not pks:
+            return 0
+        # update() skips auto_now, and reports.data_version() relies on updated_at moving
+        Issue.objects.filter(pk__in=pks).update(**values, updated_at=timezone.now())
+
+        changes = [(row, {**row, **values}) for row in rows]
+        changes = [(old, new) for old, new in changes if old != new]
+        stats.issues_changed(changes)
+        rollup.issues_changed(changes)
+        clustering.issues_changed(changes)
+        if set(values) & set(SEARCH_FIELDS):
+            for old, _ in changes:
+                search.index_issue(old['pk'])
+        # Untracked fields (e.g. internal notes) can still be on the cached pages
+        page_cache.invalidate_issues(pks)
+        list_cache.issues_changed(pks, values.keys())
+    return len(pks)
@@ -0,0 +1,22 @@
+# issues/checks.py
+"""System checks for the issues app (run by `manage.py check`, runserver and migrate)."""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def municipal_area_boundaries_check(app_configs, **kwargs):
+    path = getattr(settings, 'MUNICIPAL_AREA_GEOJSON', None)
+    if not path or Path(path).exists():
+        return []  # Unset means the offline lookup is deliberately off
+    return [Warning(
+        f"Municipal area boundary file {path} does not exist.",
+        hint=(
+            "Issues are then placed in municipal areas only through Nominatim (or not at all with "
+            "MUNICIPAL_AREA_NOMINATIM_FALLBACK = False). Download the ward/suburb polygons as GeoJSON "
+            "and point the MUNICIPAL_AREA_GEOJSON environment variable at them; see README.md."
+        ),
+        id='issues.W001',
+    )]
@@ -0,0 +1,316 @@
+# issues/clustering.py
+"""
+Server-side marker clustering for the issue map.
+
+The map asks for a viewport (bbox) and zoom level; we snap the viewport to a
+fixed world grid whose cell size depends on the zoom and return one GeoJSON
+feature per non-empty cell. Cells holding a single issue come back as normal
+issue markers. The grid is anchored at 0,0 -- the same origin as the stored
+spatial grid cells (Issue.geo_cell_lat/lon) -- so clusters stay put while the
+user pans, neighbouring viewports split the world along the same lines, and
+the snapped viewport makes responses cacheable.
+
+At zoom 13 and below a cluster cell is a whole number of stored grid cells; the
+counts come from IssueMapCell: one row per grid cell and (category,
+status), kept current from the Issue change dispatcher (signals.py) like the
+daily rollup. The cost then depends on how many grid cells the viewport
+covers, not on how many issues it holds. Closer in, clusters are smaller than
+a grid cell and the few issues in the viewport are grouped directly.
+`python manage.py rebuild_map_cells` rebuilds the table from the issues.
+"""
+import math
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.expressions import ExpressionWrapper
+from django.db.models.functions import Cast, Floor
+from django.urls import reverse
+
+from .models import GEO_CELL_SCALE, Issue, IssueMapCell, geo_cell
+
+# Roughly how many screen pixels one cluster cell spans (256px map tiles)
+CLUSTER_CELL_PIXELS = 64
+# From this zoom level on we always return individual issues
+MAX_CLUSTER_ZOOM = 17
+# Never return more individual markers than this in one response
+MAX_POINTS = 2000
+POINT_FIELDS = ('pk', 'title', 'status', 'latitude', 'longitude')
+
+# Fields whose changes move an issue between IssueMapCell rows
+TRACKED_FIELDS = ('latitude', 'longitude', 'category_id', 'status')
+
+
+def parse_bbox(value):
+    """Parse 'west,south,east,north' into floats. Raises ValueError when invalid."""
+    parts = [float(part) for part in (value or '').split(',')]
+    if len(parts) != 4 or any(math.isnan(part) for part in parts):
+        raise ValueError("bbox must be 'west,south,east,north'")
+    west, south, east, north = parts
+    west, east = max(west, -180.0), min(east, 180.0)
+    south, north = max(south, -90.0), min(north, 90.0)
+    if west >= east or south >= north:
+        raise ValueError("bbox is empty")
+    return west, south, east, north
+
+
+def clamp_zoom(zoom):
+    return max(0, min(int(zoom), 22))
+
+
+def cell_size_for_zoom(zoom):
+    """Nominal width of one cluster cell in degrees of longitude at this zoom level."""
+    return 360.0 / (256 * 2 ** zoom) * CLUSTER_CELL_PIXELS
+
+
+def grid_cells_per_cluster(zoom):
+    """How many stored grid cells one cluster cell spans, or None when it is smaller than one."""
+    cells = cell_size_for_zoom(zoom) * GEO_CELL_SCALE
+    return round(cells) if cells >= 1 else None
+
+
+def cluster_cell(value, zoom):
+    """Number of the cluster cell a latitude or longitude falls in, counted from 0."""
+    span = grid_cells_per_cluster(zoom)
+    if span:
+        return geo_cell(value) // span
+    return math.floor(float(value) / cell_size_for_zoom(zoom))
+
+
+def cluster_cell_size(zoom):
+    """Exact width of a cluster cell in degrees."""
+    span = grid_cells_per_cluster(zoom)
+    return span / GEO_CELL_SCALE if span else cell_size_for_zoom(zoom)
+
+
+def snap_viewport(bbox, zoom):
+    """
+    Grow the bbox outwards to whole cluster cells. Returns the range of cell
+    numbers (west, south, east, north), east/north exclusive; viewports that
+    snap to the same range get the same response (and cache key).
+    """
+    west, south, east, north = bbox
+    return (
+        cluster_cell(west, zoom), cluster_cell(south, zoom),
+        cluster_cell(east, zoom) + 1, cluster_cell(north, zoom) + 1,
+    )
+
+
+def viewport_bbox(cells, zoom):
+    """The bbox in degrees covered by a range of cluster cells from snap_viewport()."""
+    size = cluster_cell_size(zoom)
+    west, south, east, north = cells
+    return (
+        max(west * size, -180.0), max(south * size, -90.0),
+        min(east * size, 180.0), min(north * size, 90.0),
+    )
+
+
+def _point_feature(issue):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [float(issue['longitude']), float(issue['latitude'])]},
+        'properties': {
+            'cluster': False,
+            'pk': issue['pk'],
+            'title': issue['title'],
+            'status': issue['status'],
+            'url': reverse('issues:issue_detail', kwargs={'pk': issue['pk']}),
+        },
+    }
+
+
+def _cluster_feature(count, latitude, longitude):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [float(longitude), float(latitude)]},
+        'properties': {'cluster': True, 'count': count},
+    }
+
+
+def cluster_issues(issues, map_cells, cells, zoom):
+    """
+    Return a GeoJSON FeatureCollection (as a dict) for a viewport snapped with
+    snap_viewport(). `issues` and `map_cells` are the Issue and IssueMapCell
+    querysets with the same category/status filters applied.
+    """
+    bbox = viewport_bbox(cells, zoom)
+    if zoom >= MAX_CLUSTER_ZOOM:
+        points = issues.order_by().within_bbox(*bbox).values(*POINT_FIELDS)[:MAX_POINTS]
+        return _collection([_point_feature(issue) for issue in points], bbox, zoom, clustered=False)
+
+    span = grid_cells_per_cluster(zoom)
+    if span:
+        clusters = _clusters_from_map_cells(map_cells, cells, span)
+    else:
+        clusters = _clusters_from_issues(issues, bbox, cluster_cell_size(zoom))
+
+    features, single_pks = [], []
+    for count, latitude, longitude, pk in clusters:
+        if count == 1:
+            single_pks.append(pk)
+        elif count > 1:
+            features.append(_cluster_feature(count, latitude, longitude))
+    # One extra query for all the lone issues so they can be shown as normal markers
+    if single_pks:
+        single_issues = Issue.objects.filter(pk__in=single_pks[:MAX_POINTS]).values(*POINT_FIELDS)
+        features.extend(_point_feature(issue) for issue in single_issues)
+    return _collection(features, bbox, zoom, clustered=True)
+
+
+def _clusters_from_map_cells(map_cells, cells, span):
+    """(count, avg latitude, avg longitude, lone issue pk) per cluster, summed from the grid cell rows."""
+    west, south, east, north = cells
+    rows = map_cells.filter(
+        geo_cell_lat__gte=south * span, geo_cell_lat__lt=north * span,
+        geo_cell_lon__gte=west * span, geo_cell_lon__lt=east * span,
+    ).values('geo_cell_lat', 'geo_cell_lon').annotate(
+        count=Sum('issue_count'),
+        latitude_sum=Sum('latitude_sum'),
+        longitude_sum=Sum('longitude_sum'),
+        pk_sum=Sum('issue_pk_sum'),
+    ).order_by()
+    # Grid cell -> cluster cell in Python: floor division, also for cells west/south of 0
+    totals = {}
+    for row in rows:
+        total = totals.setdefault((row['geo_cell_lon'] // span, row['geo_cell_lat'] // span), [0, 0.0, 0.0, 0])
+        total[0] += row['count']
+        total[1] += row['latitude_sum']
+        total[2] += row['longitude_sum']
+        total[3] += row['pk_sum']
+    return [
+        (count, latitude_sum / count, longitude_sum / count, pk_sum)
+        for count, latitude_sum, longitude_sum, pk_sum in totals.values() if count > 0
+    ]
+
+
+def _clusters_from_issues(issues, bbox, size):
+    """The same, grouped straight from the issues (for viewports of a few grid cells)."""
+    rows = issues.order_by().within_bbox(*bbox).annotate(
+        cell_x=Floor(ExpressionWrapper(Cast('longitude', FloatField()) / Value(size), output_field=FloatField())),
+        cell_y=Floor(ExpressionWrapper(Cast('latitude', FloatField()) / Value(size), output_field=FloatField())),
+    ).values('cell_x', 'cell_y').annotate(
+        count=Count('pk'),
+        latitude_sum=Sum('latitude'),
+        longitude_sum=Sum('longitude'),
+        pk_sum=Sum('pk'),
+    )
+    return [
+        (row['count'], row['latitude_sum'] / row['count'], row['longitude_sum'] / row['count'], row['pk_sum'])
+        for row in rows
+    ]
+
+
+def _collection(features, bbox, zoom, clustered):
+    return {
+        'type': 'FeatureCollection',
+        'features': features,
+        'bbox': list(bbox),
+        'zoom': zoom,
+        'clustered': clustered,
+    }
+
+
+# --- IssueMapCell maintenance (called from signals and the management command) ---
+
+def _deltas(position, pk, sign):
+    """
+    (row, deltas) that add (sign=1) or remove (sign=-1) issue `pk` at
+    `position` (its TRACKED_FIELDS values) to/from its IssueMapCell row.
+    """
+    latitude, longitude, category_id, status = position
+    row = (geo_cell(latitude), geo_cell(longitude), category_id, status)
+    return row, {
+        'issue_count': sign,
+        'latitude_sum': sign * float(latitude),
+        'longitude_sum': sign * float(longitude),
+        'issue_pk_sum': sign * pk,
+    }
+
+
+def _bump(row, deltas):
+    bucket = dict(zip(('geo_cell_lat', 'geo_cell_lon', 'category_id', 'status'), row))
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if IssueMapCell.objects.filter(**bucket).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            IssueMapCell.objects.create(**bucket, **deltas)
+    except IntegrityError:  # Someone else created the row in the meantime
+        IssueMapCell.objects.filter(**bucket).update(**updates)
+
+
+def issues_changed(changes):
+    """
+    Move issues between rows. `changes` is [(old, new)], each a dict with the
+    pk and TRACKED_FIELDS of one issue, or None where it didn't/doesn't exist.
+    """
+    totals = {}
+    for old, new in changes:
+        for values, sign in ((old, -1), (new, 1)):
+            if values is None:
+                continue
+            row, deltas = _deltas(tuple(values[name] for name in TRACKED_FIELDS), values['pk'], sign)
+            total = totals.setdefault(row, dict.fromkeys(deltas, 0))
+            for field, delta in deltas.items():
+                total[field] += delta
+    with transaction.atomic():
+        for row, deltas in totals.items():
+            if any(deltas.values()):
+                _bump(row, deltas)
+
+
+def category_deleted(category_id):
+    """
+    Fold a category's rows into the uncategorized rows of the same cell and
+    status, before the delete sets its issues' category to NULL.
+    """
+    with transaction.atomic():
+        rows = IssueMapCell.objects.select_for_update().filter(category_id=category_id)
+        for row in rows:
+            _bump((row.geo_cell_lat, row.geo_cell_lon, None, row.status), {
+                'issue_count': row.issue_count,
+                'latitude_sum': row.latitude_sum,
+                'longitude_sum': row.longitude_sum,
+                'issue_pk_sum': row.issue_pk_sum,
+            })
+        rows.delete()
+
+
+def _values(issue):
+    return {'pk': issue.pk, **{name: getattr(issue, name) for name in TRACKED_FIELDS}}
+
+
+def issue_saved(issue, changes, created):
+    new = _values(issue)
+    old = None if created else {**new, **{name: change[0] for name, change in changes.items() if name in TRACKED_FIELDS}}
+    if old != new:
+        issues_changed([(old, new)])
+
+
+def issue_deleted(issue):
+    issues_changed([(_values(issue), None)])
+
+
+def rebuild():
+    """Rebuild IssueMapCell from the Issue table. Returns the number of rows written."""
+    rows = Issue.objects.exclude(geo_cell_lat=None).order_by().values('geo_cell_lat', 'geo_cell_lon', 'category_id', 'status').annotate(
+        issue_count=Count('pk'),
+        latitude_sum=Sum('latitude'),
+        longitude_sum=Sum('longitude'),
+        issue_pk_sum=Sum('pk'),
+    )
+    with transaction.atomic():
+        IssueMapCell.objects.all().delete()
+        IssueMapCell.objects.bulk_create(
+            (
+                IssueMapCell(
+                    geo_cell_lat=row['geo_cell_lat'], geo_cell_lon=row['geo_cell_lon'],
+                    category_id=row['category_id'], status=row['status'], issue_count=row['issue_count'],
+                    latitude_sum=float(row['latitude_sum']), longitude_sum=float(row['longitude_sum']),
+                    issue_pk_sum=row['issue_pk_sum'],
+                )
+                for row in rows
+            ),
+            batch_size=1000,
+        )
+    return IssueMapCell.objects.count()
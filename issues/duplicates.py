@@ -0,0 +1,152 @@
+# issues/duplicates.py
+"""
+Near-duplicate detection for new reports.
+
+Every issue gets a MinHash signature of its title + description (word and
+word-pair shingles). The signature is cut into bands and each band is stored
+as an indexed key (IssueSignatureBand), which is classic locality-sensitive
+hashing: two texts with a high Jaccard similarity are very likely to share at
+least one band key, while unrelated texts almost never do.
+
+find_duplicate_candidates() therefore only looks at open issues that
+  1. are in the same category,
+  2. are within a small radius (grid cell index, see IssueQuerySet.within_radius),
+  3. share a band key (band_key index),
+and then ranks that short list by estimated text similarity and distance.
+"""
+import hashlib
+import random
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Issue, IssueSignatureBand, IssueTextSignature
+
+NUM_PERMUTATIONS = 48
+BAND_ROWS = 2                       # 24 bands of 2 rows: ~90% chance to share a band at 0.3 similarity
+NUM_BANDS = NUM_PERMUTATIONS // BAND_ROWS
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20250701)      # Fixed seed: signatures must be stable across processes
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+MAX_CANDIDATES = 200                # Newest first; enough for any one spot, bounded for a busy one
+CLOSED_STATUSES = ['Resolved', 'Closed-No Action', 'Invalid', 'Duplicate']
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'at', 'be', 'by', 'for', 'from', 'has', 'in', 'is', 'it',
+    'near', 'of', 'on', 'or', 'the', 'there', 'this', 'to', 'very', 'was', 'with',
+}
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+DuplicateCandidate = namedtuple('DuplicateCandidate', ['issue', 'similarity', 'distance_m'])
+
+
+def _tokens(text):
+    return [word for word in _WORD_RE.findall((text or '').lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def shingles(title, description):
+    """Word unigrams and bigrams of the title and description."""
+    words = _tokens(title) + _tokens(description)
+    result = set(words)
+    result.update(f'{first} {second}' for first, second in zip(words, words[1:]))
+    return result
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def minhash(shingle_set):
+    if not shingle_set:
+        return []
+    hashes = [_hash64(shingle) for shingle in shingle_set]
+    return [
+        min((a * value + b) % _MERSENNE_PRIME for value in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def band_keys(signature):
+    keys = []
+    for band in range(NUM_BANDS if signature else 0):
+        rows = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS]
+        digest = hashlib.blake2b(','.join(map(str, rows)).encode(), digest_size=8).hexdigest()
+        keys.append(f'{band}:{digest}')
+    return keys
+
+
+def estimated_similarity(signature_a, signature_b):
+    """Fraction of matching MinHash slots ~ Jaccard similarity of the shingle sets."""
+    if not signature_a or not signature_b:
+        return 0.0
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / NUM_PERMUTATIONS
+
+
+def _fingerprint(title, description):
+    return hashlib.md5(f'{title}\x00{description}'.encode()).hexdigest()
+
+
+def update_signature(issue):
+    """Store (or refresh) the signature and band keys for an issue. Skips unchanged text."""
+    fingerprint = _fingerprint(issue.title, issue.description)
+    existing = IssueTextSignature.objects.filter(issue_id=issue.pk).values_list('fingerprint', flat=True).first()
+    if existing == fingerprint:
+        return
+    signature = minhash(shingles(issue.title, issue.description))
+    with transaction.atomic():
+        IssueTextSignature.objects.update_or_create(
+            issue_id=issue.pk, defaults={'fingerprint': fingerprint, 'minhash': signature}
+        )
+        IssueSignatureBand.objects.filter(issue_id=issue.pk).delete()
+        IssueSignatureBand.objects.bulk_create(
+            IssueSignatureBand(issue_id=issue.pk, band_key=key) for key in band_keys(signature)
+        )
+
+
+def find_duplicate_candidates(title, description, category_id, latitude, longitude,
+                              exclude_pk=None, radius_m=None, limit=5, min_similarity=None):
+    """
+    Ranked list of DuplicateCandidate(issue, similarity, distance_m) for a report
+    with the given text and location. Best match first.
+    """
+    if latitude is None or longitude is None:
+        return []
+    radius_m = radius_m or getattr(settings, 'DUPLICATE_RADIUS_METERS', 150)
+    if min_similarity is None:
+        min_similarity = getattr(settings, 'DUPLICATE_MIN_SIMILARITY', 0.3)
+    signature = minhash(shingles(title, description))
+    keys = band_keys(signature)
+    if not keys:
+        return []
+
+    candidate_ids = IssueSignatureBand.objects.filter(band_key__in=keys).values('issue_id')
+    candidates = (
+        Issue.objects.within_radius(latitude, longitude, radius_m)
+        .filter(category_id=category_id, pk__in=candidate_ids)
+        .exclude(status__in=CLOSED_STATUSES)
+        .select_related('text_signature')
+        .order_by('-reported_date', '-pk')
+    )
+    if exclude_pk is not None:
+        candidates = candidates.exclude(pk=exclude_pk)
+
+    results = []
+    for issue in candidates[:MAX_CANDIDATES]:
+        similarity = estimated_similarity(signature, issue.text_signature.minhash)
+        if similarity >= min_similarity:
+            results.append(DuplicateCandidate(issue, similarity, issue.distance_sq ** 0.5))
+    results.sort(key=lambda candidate: (-candidate.similarity, candidate.distance_m))
+    return results[:limit]
+
+
+def find_duplicates_of(issue, **kwargs):
+    """Candidates for an already saved issue (used by the admin)."""
+    return find_duplicate_candidates(
+        issue.title, issue.description, issue.category_id, issue.latitude, issue.longitude,
+        exclude_pk=issue.pk, **kwargs
+    )
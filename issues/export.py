@@ -0,0 +1,131 @@
+# issues/export.py
+"""
+Streaming bulk export of issues as CSV or JSON Lines.
+
+Rows are read with values() + iterator(chunk_size=EXPORT_CHUNK_SIZE), so
+no model instances are built and memory stays flat however many issues
+match; output is produced in batches of rows and can be gzip-compressed on
+the fly. Used by the staff export view and `python manage.py export_issues`
+(nightly open-data dumps).
+
+Internal notes and reporter contact details are never exported.
+"""
+import csv
+import datetime
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Issue
+
+# (column name, values() lookup)
+EXPORT_COLUMNS = [
+    ('id', 'pk'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('category', 'category__name'),
+    ('status', 'status'),
+    ('priority', 'priority'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('municipal_area', 'municipal_area'),
+    ('upvotes', 'upvotes_count'),
+    ('reported_by', 'user__username'),
+    ('assigned_to', 'assigned_to_manager__username'),
+    ('reported_date', 'reported_date'),
+    ('updated_at', 'updated_at'),
+    ('resolution_notes', 'resolution_notes'),
+]
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+
+def _day_start(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def export_queryset(start_date=None, end_date=None, status='', category=None, municipal_area=''):
+    """Issues matching the export filters, oldest first. Both dates are inclusive local days."""
+    issues = Issue.objects.all()
+    if start_date:
+        issues = issues.filter(reported_date__gte=_day_start(start_date))
+    if end_date:
+        issues = issues.filter(reported_date__lt=_day_start(end_date + datetime.timedelta(days=1)))
+    if status:
+        issues = issues.filter(status=status)
+    if category:
+        issues = issues.filter(category=category)
+    if municipal_area:
+        issues = issues.filter(municipal_area=municipal_area)
+    return issues.order_by('reported_date', 'pk')  # Read in index order (issue_reported_idx), no sort
+
+
+def iter_rows(issues):
+    """Export rows as dicts keyed by column name, fetched EXPORT_CHUNK_SIZE at a time."""
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    lookups = [lookup for _column, lookup in EXPORT_COLUMNS]
+    for values in issues.values_list(*lookups).iterator(chunk_size=chunk_size):
+        yield dict(zip((column for column, _lookup in EXPORT_COLUMNS), values))
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each written row back to us."""
+    def write(self, value):
+        return value
+
+
+def _batched(lines, batch_size=500):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == batch_size:
+            yield ''.join(batch).encode()
+            batch = []
+    if batch:
+        yield ''.join(batch).encode()
+
+
+def iter_csv(issues):
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow([column for column, _lookup in EXPORT_COLUMNS])
+        for row in iter_rows(issues):
+            yield writer.writerow([
+                value.isoformat() if isinstance(value, datetime.datetime) else value
+                for value in row.values()
+            ])
+    return _batched(lines())
+
+
+def iter_jsonl(issues):
+    return _batched(
+        json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n' for row in iter_rows(issues)
+    )
+
+
+def gzipped(chunks):
+    """gzip-compress a stream of byte chunks as it is produced."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(issues, export_format='csv', compress=False):
+    """Byte chunks of `issues` exported as `export_format`, optionally gzipped."""
+    chunks = iter_csv(issues) if export_format == 'csv' else iter_jsonl(issues)
+    return gzipped(chunks) if compress else chunks
+
+
+def export_filename(export_format, compress=False):
+    extension = FORMATS[export_format][1] + ('.gz' if compress else '')
+    return f"communitywatch_issues_{timezone.localdate():%Y%m%d}.{extension}"
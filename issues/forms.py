@@ -1,5 +1,9 @@
+import datetime
+
 from django import forms
+from django.utils import timezone
 from .models import Issue, IssueCategory, Comment
+from . import uploads
 
 class IssueForm(forms.ModelForm):
     category = forms.ModelChoiceField(
@@ -91,6 +95,16 @@ class ManagerIssueUpdateForm(forms.ModelForm):
             'resolution_image': 'Upload Resolution Image (Optional):',
         }
 
+    def clean_resolution_image(self):
+        image = self.cleaned_data.get('resolution_image')
+        if image and hasattr(image, 'content_type'):
+            # A new upload: rotate, downscale and strip it like the issue photos (issues/uploads.py)
+            try:
+                return uploads.normalize_image(image)
+            except uploads.InvalidImage as e:
+                raise forms.ValidationError(str(e))
+        return image
+
 
 
 #report
@@ -121,4 +135,78 @@ class ReportGenerationForm(forms.Form):
         if start_date and end_date and start_date > end_date:
             raise forms.ValidationError("End date cannot be before the start date.")
 
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+class IssueExportForm(ReportGenerationForm):
+    """Filters for the CSV/JSONL export (issues/export.py). Without dates everything is exported."""
+    FORMAT_CHOICES = [('csv', 'CSV'), ('jsonl', 'JSON Lines')]
+
+    start_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        required=False
+    )
+    end_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        required=False
+    )
+    category = forms.ModelChoiceField(
+        queryset=IssueCategory.objects.all(),
+        required=False,
+        empty_label="All Categories",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    municipal_area = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'All Areas'})
+    )
+    format = forms.ChoiceField(
+        choices=FORMAT_CHOICES,
+        initial='csv',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    compress = forms.BooleanField(
+        required=False,
+        label="Compress (gzip)"
+    )
+
+class TrendFilterForm(forms.Form):
+    """Filters for the issue trend charts (issues/rollup.py). Defaults to the last 30 days."""
+    MAX_DAYS = 731
+    STATUS_CHOICES = [('', 'All Open Statuses')] + Issue.STATUS_CHOICES
+
+    start_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        required=False
+    )
+    end_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        required=False
+    )
+    category = forms.ModelChoiceField(
+        queryset=IssueCategory.objects.all(),
+        required=False,
+        empty_label="All Categories",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    municipal_area = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'All Areas'})
+    )
+    status = forms.ChoiceField(
+        choices=STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        end_date = cleaned_data.get("end_date") or timezone.localdate()
+        start_date = cleaned_data.get("start_date") or end_date - datetime.timedelta(days=29)
+
+        if start_date > end_date:
+            raise forms.ValidationError("End date cannot be before the start date.")
+        if (end_date - start_date).days >= self.MAX_DAYS:
+            raise forms.ValidationError(f"Please choose a range of at most {self.MAX_DAYS} days.")
+
+        cleaned_data['start_date'], cleaned_data['end_date'] = start_date, end_date
+        return cleaned_data
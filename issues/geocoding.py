@@ -0,0 +1,389 @@
+# issues/geocoding.py
+"""
+Reverse geocoding: latitude/longitude -> municipal area (ward/suburb) name.
+
+The primary path is offline. Ward/suburb boundaries are loaded once per process
+from a local GeoJSON file (settings.MUNICIPAL_AREA_GEOJSON, not part of the
+repository; issues/checks.py warns when it is missing) into a WardIndex:
+every polygon is registered in the cells of a coarse lat/lon grid that its
+bounding box touches, so a lookup only runs point-in-polygon tests against the
+handful of polygons near the point.
+
+The Nominatim web API is kept as an optional fallback for points the local
+dataset does not cover (settings.MUNICIPAL_AREA_NOMINATIM_FALLBACK). Its answers
+are cached by rounded coordinates (an in-process LRU in front of the
+ReverseGeocodeCache table) and calls go through a circuit breaker, so an outage
+costs a few failed requests instead of a 10 second timeout on every report.
+The lookups run in the task worker; their counters and the breaker state are
+kept in the database (GeocoderCounter, CircuitBreakerState) so that every
+worker shares one breaker and geocoder_stats() on the admin dashboard, in the
+web process, shows them.
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+NOMINATIM_HEADERS = {
+    'User-Agent': 'CommunityWatchProject/1.0 (Contact: your-email@example.com)'
+}
+NOMINATIM_TIMEOUT = 10  # seconds
+
+
+def _point_in_ring(x, y, ring):
+    """Even-odd ray casting. `ring` is a list of (x, y) = (lon, lat) tuples."""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+class WardIndex:
+    """In-memory grid index over ward/suburb polygons."""
+
+    def __init__(self, areas, cell_size=0.01):
+        """
+        `areas` is a list of (name, polygons) where polygons is a list of
+        rings lists: [outer_ring, hole_ring, ...], rings as (lon, lat) tuples.
+        """
+        self.cell_size = cell_size
+        self.polygons = []          # [(name, bbox, rings)]
+        self.grid = {}              # (cell_x, cell_y) -> [polygon index]
+        for name, polygons in areas:
+            for rings in polygons:
+                if not rings or len(rings[0]) < 3:
+                    continue
+                xs = [x for x, _ in rings[0]]
+                ys = [y for _, y in rings[0]]
+                bbox = (min(xs), min(ys), max(xs), max(ys))
+                index = len(self.polygons)
+                self.polygons.append((name, bbox, rings))
+                for cell_x in range(self._cell(bbox[0]), self._cell(bbox[2]) + 1):
+                    for cell_y in range(self._cell(bbox[1]), self._cell(bbox[3]) + 1):
+                        self.grid.setdefault((cell_x, cell_y), []).append(index)
+
+    def _cell(self, value):
+        return math.floor(value / self.cell_size)
+
+    def __len__(self):
+        return len(self.polygons)
+
+    @classmethod
+    def from_geojson(cls, data, name_property='name', cell_size=0.01):
+        areas = []
+        for feature in data.get('features', []):
+            geometry = feature.get('geometry') or {}
+            name = (feature.get('properties') or {}).get(name_property)
+            if not name:
+                continue
+            if geometry.get('type') == 'Polygon':
+                coordinates = [geometry['coordinates']]
+            elif geometry.get('type') == 'MultiPolygon':
+                coordinates = geometry['coordinates']
+            else:
+                continue
+            polygons = [
+                [[(float(point[0]), float(point[1])) for point in ring] for ring in polygon]
+                for polygon in coordinates
+            ]
+            areas.append((name, polygons))
+        return cls(areas, cell_size=cell_size)
+
+    @classmethod
+    def from_file(cls, path, name_property='name'):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_geojson(json.load(f), name_property=name_property)
+
+    def lookup(self, latitude, longitude):
+        """Name of the area containing the point, or None."""
+        x, y = float(longitude), float(latitude)
+        for index in self.grid.get((self._cell(x), self._cell(y)), ()):
+            name, (min_x, min_y, max_x, max_y), rings = self.polygons[index]
+            if not (min_x <= x <= max_x and min_y <= y <= max_y):
+                continue
+            if _point_in_ring(x, y, rings[0]) and not any(_point_in_ring(x, y, hole) for hole in rings[1:]):
+                return name
+        return None
+
+
+_ward_index = None
+_ward_index_lock = threading.Lock()
+
+
+def get_ward_index():
+    """
+    The process-wide WardIndex, built on first use. Returns an empty index
+    if no boundary file is configured or it cannot be read.
+    """
+    global _ward_index
+    if _ward_index is None:
+        with _ward_index_lock:
+            if _ward_index is None:
+                path = getattr(settings, 'MUNICIPAL_AREA_GEOJSON', None)
+                name_property = getattr(settings, 'MUNICIPAL_AREA_NAME_PROPERTY', 'name')
+                index = WardIndex([])
+                if path and Path(path).exists():
+                    try:
+                        index = WardIndex.from_file(path, name_property=name_property)
+                        print(f"Loaded {len(index)} municipal area polygons from {path}")
+                    except (OSError, ValueError, KeyError, TypeError) as e:
+                        print(f"ERROR: Could not load municipal area boundaries from {path}: {e}")
+                elif path:
+                    print(f"WARNING: Municipal area boundary file {path} not found; areas come from Nominatim only.")
+                _ward_index = index
+    return _ward_index
+
+
+def reverse_geocode_offline(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return get_ward_index().lookup(latitude, longitude)
+
+
+def nominatim_fallback_enabled():
+    return getattr(settings, 'MUNICIPAL_AREA_NOMINATIM_FALLBACK', True)
+
+
+def reverse_geocode_nominatim(latitude, longitude):
+    """
+    Ask Nominatim for the most specific local area name.
+    Returns None if the response has no usable area; raises
+    requests.exceptions.RequestException on network/HTTP errors and
+    ValueError on a body that is not a JSON object.
+    """
+    params = {'format': 'json', 'lat': latitude, 'lon': longitude, 'addressdetails': 1}
+    response = requests.get(NOMINATIM_URL, params=params, headers=NOMINATIM_HEADERS, timeout=NOMINATIM_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    if not isinstance(data, dict):
+        raise ValueError(f"Unexpected Nominatim response: {type(data).__name__}")
+    address = data.get('address') or {}
+    # For Kochi, 'suburb' (e.g., 'Kaloor'), 'neighbourhood', or 'quarter' are common.
+    return (
+        address.get('suburb') or
+        address.get('neighbourhood') or
+        address.get('quarter') or
+        address.get('county')  # This might be the Taluk name, e.g., 'Kochi Taluk'
+    )
+
+
+# --- Cache and circuit breaker for the Nominatim fallback ---
+
+class LRUCache:
+    """Small thread-safe LRU with per-entry expiry. Stores None values too (negative caching)."""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through; `failure_threshold` consecutive failures open it.
+    open      -> calls are refused until `reset_timeout` seconds have passed.
+    half_open -> one trial call is let through; success closes, failure re-opens.
+                 A trial that never reports back (e.g. the worker died mid-call)
+                 is given up after another `reset_timeout`, and a new one is let through.
+
+    The state is a CircuitBreakerState row, shared by every web and worker
+    process: one worker's failures open the breaker for all of them, and the
+    admin dashboard shows the real state. Transitions lock the row.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=300):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    def _states(self):
+        from .models import CircuitBreakerState  # Avoid importing models at module load
+        return CircuitBreakerState.objects.filter(name=self.name)
+
+    def _locked_row(self):
+        from .models import CircuitBreakerState
+        CircuitBreakerState.objects.get_or_create(name=self.name)
+        return self._states().select_for_update().get()
+
+    @property
+    def state(self):
+        return self._states().values_list('state', flat=True).first() or self.CLOSED
+
+    def allow_request(self):
+        if self.state == self.CLOSED:  # The common case needs no lock
+            return True
+        with transaction.atomic():
+            row = self._locked_row()
+            if row.state == self.CLOSED:
+                return True
+            if time.time() - row.opened_at < self.reset_timeout:
+                # Still open, or a trial call is already in flight
+                return False
+            # Open long enough: let a trial through. Or the last trial never reported back: try again
+            row.state, row.opened_at = self.HALF_OPEN, time.time()  # When the trial started
+            row.save(update_fields=['state', 'opened_at'])
+            return True
+
+    def record_success(self):
+        # No write while it is already closed (one UPDATE matching no row)
+        self._states().exclude(state=self.CLOSED, consecutive_failures=0).update(
+            state=self.CLOSED, consecutive_failures=0, opened_at=None,
+        )
+
+    def record_failure(self):
+        with transaction.atomic():
+            row = self._locked_row()
+            row.consecutive_failures += 1
+            if row.state == self.HALF_OPEN or row.consecutive_failures >= self.failure_threshold:
+                row.state, row.opened_at = self.OPEN, time.time()
+            row.save(update_fields=['state', 'consecutive_failures', 'opened_at'])
+
+    def snapshot(self):
+        row = self._states().values('state', 'consecutive_failures', 'opened_at').first()
+        if row is None:
+            return {'state': self.CLOSED, 'consecutive_failures': 0, 'retry_in_seconds': None}
+        retry_in = None
+        if row['state'] == self.OPEN:
+            retry_in = max(0, round(self.reset_timeout - (time.time() - row['opened_at'])))
+        return {
+            'state': row['state'],
+            'consecutive_failures': row['consecutive_failures'],
+            'retry_in_seconds': retry_in,
+        }
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Nominatim while the breaker is open."""
+
+
+_memory_cache = LRUCache(maxsize=getattr(settings, 'GEOCODE_CACHE_MEMORY_SIZE', 10000))
+_breaker = CircuitBreaker(
+    'nominatim',
+    failure_threshold=getattr(settings, 'GEOCODE_BREAKER_FAILURE_THRESHOLD', 3),
+    reset_timeout=getattr(settings, 'GEOCODE_BREAKER_RESET_SECONDS', 300),
+)
+COUNTERS = ('memory_hits', 'db_hits', 'api_calls', 'api_failures', 'short_circuited')
+
+
+def _count(name):
+    """Bump a GeocoderCounter row, so the dashboard sees the lookups the task worker makes."""
+    from .models import GeocoderCounter
+    if GeocoderCounter.objects.filter(key=name).update(value=F('value') + 1):
+        return
+    try:
+        with transaction.atomic():
+            GeocoderCounter.objects.create(key=name, value=1)
+    except IntegrityError:  # Someone else created the row in the meantime
+        GeocoderCounter.objects.filter(key=name).update(value=F('value') + 1)
+
+
+def _cache_key(latitude, longitude):
+    # Rounded coordinates: precision 3 is ~110 m, so issues on the same street share an entry
+    scale = 10 ** getattr(settings, 'GEOCODE_CACHE_PRECISION', 3)
+    return round(float(latitude) * scale), round(float(longitude) * scale)
+
+
+def cached_reverse_geocode(latitude, longitude):
+    """
+    Nominatim lookup through the memory cache, the database cache and the
+    circuit breaker. Returns the area name or None. Raises CircuitOpenError
+    while the breaker is open, and whatever the call itself raised when it
+    fails (requests.exceptions.RequestException, ValueError, ...).
+    """
+    from .models import ReverseGeocodeCache  # Avoid importing models at module load
+
+    ttl_seconds = getattr(settings, 'GEOCODE_CACHE_TTL_DAYS', 30) * 24 * 3600
+    key = _cache_key(latitude, longitude)
+
+    cached = _memory_cache.get(key, LRUCache._MISSING)
+    if cached is not LRUCache._MISSING:
+        _count('memory_hits')
+        return cached
+
+    row = ReverseGeocodeCache.objects.filter(
+        lat_key=key[0], lon_key=key[1],
+        fetched_at__gte=timezone.now() - timedelta(seconds=ttl_seconds)
+    ).values_list('area_name', flat=True)
+    for area_name in row:
+        _count('db_hits')
+        _memory_cache.set(key, area_name, ttl_seconds)
+        return area_name
+
+    if not _breaker.allow_request():
+        _count('short_circuited')
+        raise CircuitOpenError("Nominatim circuit breaker is open.")
+
+    _count('api_calls')
+    try:
+        area_name = reverse_geocode_nominatim(latitude, longitude)
+    except Exception:
+        # Whatever went wrong, the breaker must hear about it: a half-open
+        # breaker lets no further call through until the trial reports back
+        _count('api_failures')
+        _breaker.record_failure()
+        raise
+    _breaker.record_success()
+
+    ReverseGeocodeCache.objects.update_or_create(
+        lat_key=key[0], lon_key=key[1],
+        defaults={'area_name': area_name, 'fetched_at': timezone.now()}
+    )
+    _memory_cache.set(key, area_name, ttl_seconds)
+    return area_name
+
+
+def geocoder_stats():
+    """Lookup counters and breaker state of all processes (shown on the admin dashboard)."""
+    from .models import GeocoderCounter
+    stats = dict.fromkeys(COUNTERS, 0)
+    stats.update(GeocoderCounter.objects.filter(key__in=COUNTERS).values_list('key', 'value'))
+    lookups = stats['memory_hits'] + stats['db_hits'] + stats['api_calls'] + stats['short_circuited']
+    hits = stats['memory_hits'] + stats['db_hits']
+    stats['hit_rate'] = round(100.0 * hits / lookups, 1) if lookups else None
+    stats['breaker'] = _breaker.snapshot()
+    return stats
@@ -0,0 +1,172 @@
+# issues/list_cache.py
+"""
+Result cache for the issue list page.
+
+Visitors request the same few filter/sort/page combinations over and over.
+For each combination IssueListView stores the page's issue ids plus what the
+pagination controls need (total count, or the cursors), and every issue on it
+is stored once as a ready-to-render row (category joined, cover image and
+comment count attached, see viewer_state.attach_card_state). A repeat request
+is answered from the cache without touching the issues table; only the
+per-viewer upvote flags are looked up for signed-in users.
+
+All entries carry a global list version. Writes that change which issues a
+list holds or their order (new and deleted issues, status/category/reported
+date changes, category renames) move to a new version after their
+transaction commits, and entries of the old one are never read again and
+simply expire. As with the detail page (issues/page_cache.py) the version is
+a time-based token, so an evicted version key can't come back with a value
+that old entries used. Pages sorted by upvotes also carry an upvote order
+version, which votes move on.
+
+Writes that only change what a card shows (comment and upvote counts, cover
+image, title, ...) evict just that issue's row; pages referring to it become
+misses and are rebuilt on their next request. So that a request which read
+the old row before the write can't store it afterwards, the eviction first
+marks the issue as changed, and store_page() skips pages holding an issue
+changed since the request read its version.
+
+Entries live in the ISSUE_LIST_CACHE_ALIAS cache (settings.CACHES): locmem or
+file for a single node, a Redis server when several app servers must see the
+same versions. Hit/miss counters are per server process, like geocoding's.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = 'issue_list:version'
+UPVOTE_ORDER_KEY = 'issue_list:upvote_order'
+
+# Issue fields (attnames) that decide which lists an issue is on, or where
+ORDER_FIELDS = frozenset({'category_id', 'status', 'reported_date'})
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'ISSUE_LIST_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'ISSUE_LIST_CACHE_TIMEOUT', 300)
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _token(cache, key):
+    token = cache.get(key)
+    if token is None:
+        cache.add(key, time.time_ns(), None)
+        token = cache.get(key)  # Whoever added first wins
+    return token
+
+
+def current_version(params):
+    """
+    The versions the cached page for the normalized request `params` is stored
+    under. Read it *before* querying the database.
+    """
+    cache = _cache()
+    return {
+        'list': _token(cache, VERSION_KEY),
+        'upvotes': _token(cache, UPVOTE_ORDER_KEY) if params.get('sort') == 'upvotes' else None,
+        'read_at': time.time_ns(),
+    }
+
+
+def invalidate():
+    """Move every cached list to a new version once the current transaction commits."""
+    transaction.on_commit(lambda: _cache().delete(VERSION_KEY))
+
+
+def invalidate_upvote_order():
+    """Drop the cached pages sorted by upvotes once the current transaction commits."""
+    transaction.on_commit(lambda: _cache().delete(UPVOTE_ORDER_KEY))
+
+
+def invalidate_rows(issue_pks):
+    """Evict these issues' cached rows once the current transaction commits."""
+    pks = list(issue_pks)
+    if pks:
+        transaction.on_commit(lambda: _evict_rows(pks))
+
+
+def _evict_rows(pks):
+    cache = _cache()
+    cache.set_many({_changed_key(pk): time.time_ns() for pk in pks}, _timeout())
+    version = cache.get(VERSION_KEY)
+    if version is not None:
+        cache.delete_many([_row_key(version, pk) for pk in pks])
+
+
+def issues_changed(issue_pks, fields):
+    """
+    Invalidate what a change to `fields` (attnames, or None when unknown) of
+    these issues can affect: every list if the change can move them between or
+    within lists, otherwise just their rows. Comments and images pass ().
+    """
+    if fields is None or not ORDER_FIELDS.isdisjoint(fields):
+        invalidate()
+        return
+    if 'upvotes_count' in fields:
+        invalidate_upvote_order()
+    invalidate_rows(issue_pks)
+
+
+def _page_key(version, params):
+    digest = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return f"issue_list:page:{version['list']}:{version['upvotes'] or '-'}:{digest}"
+
+
+def _row_key(version, pk):
+    return f'issue_list:row:{version}:{pk}'
+
+
+def _changed_key(pk):
+    return f'issue_list:changed:{pk}'
+
+
+def get_page(version, params):
+    """
+    Return (page_info, issues) stored for the normalized request `params`
+    under `version`, or None on a miss (including a page whose rows were evicted).
+    """
+    cache = _cache()
+    entry = cache.get(_page_key(version, params))
+    if entry is not None:
+        keys = [_row_key(version['list'], pk) for pk in entry['ids']]
+        rows = cache.get_many(keys)
+        if len(rows) == len(keys):
+            _count('hits')
+            return entry['page'], [rows[key] for key in keys]
+    _count('misses')
+    return None
+
+
+def store_page(version, params, page_info, issues):
+    """Cache a page rendered from the database. `issues` must have their card state attached."""
+    cache = _cache()
+    changed = cache.get_many([_changed_key(issue.pk) for issue in issues])
+    if any(changed_at >= version['read_at'] for changed_at in changed.values()):
+        return  # Some rows may be older than the write that changed them
+    timeout = _timeout()
+    cache.set_many({_row_key(version['list'], issue.pk): issue for issue in issues}, timeout)
+    cache.set(_page_key(version, params), {'ids': [issue.pk for issue in issues], 'page': page_info}, timeout)
+
+
+def list_cache_stats():
+    """Hit/miss counters for this process (for the admin dashboard)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(100.0 * stats['hits'] / lookups, 1) if lookups else None
+    return stats
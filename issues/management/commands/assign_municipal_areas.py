@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from issues import geocoding
+from issues.models import Issue
+
+
+class Command(BaseCommand):
+    help = "Fills municipal_area for issues from the local ward boundary file (no network calls)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true',
+                            help="Also recompute issues that already have an area.")
+
+    def handle(self, *args, **options):
+        index = geocoding.get_ward_index()
+        if not len(index):
+            self.stdout.write(self.style.WARNING("No municipal area polygons loaded; check MUNICIPAL_AREA_GEOJSON."))
+            return
+        # status/category: read by the daily rollup when the area changes
+        issues = Issue.objects.only('pk', 'latitude', 'longitude', 'municipal_area', 'status', 'category').order_by('pk')
+        if not options['overwrite']:
+            issues = issues.filter(municipal_area__isnull=True) | issues.filter(municipal_area='')
+        updated = 0
+        for issue in issues.iterator(chunk_size=2000):
+            area_name = index.lookup(issue.latitude, issue.longitude)
+            if area_name and area_name != issue.municipal_area:
+                issue.municipal_area = area_name
+                issue.save(update_fields=['municipal_area'])  # Keeps the search index in sync
+                updated += 1
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} issues."))
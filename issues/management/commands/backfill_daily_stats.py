@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from issues import rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the IssueDailyStats rollup used by the trend charts from the Issue table."
+
+    def handle(self, *args, **options):
+        row_count = rollup.backfill()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {row_count} daily statistics rows."))
@@ -0,0 +1,224 @@
+import datetime
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from issues.models import Comment, Issue, IssueCategory, IssueImage, Upvote
+
+from .seed_benchmark import EMAIL_DOMAIN
+
+User = get_user_model()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the hot issue views through the test client against the current database "
+        "(fill it with `manage.py seed_benchmark`) and writes the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per case.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per case before timing.")
+        parser.add_argument('--cold', action='store_true', help="Clear all caches before every request.")
+        parser.add_argument('--only', action='append', default=[], help="Run only cases whose name starts with this (repeatable).")
+        parser.add_argument('--output', '-o', default='-', help="JSON file to write; '-' (default) writes to stdout.")
+        parser.add_argument('--compare', help="Earlier JSON output to compare the medians against.")
+        parser.add_argument('--label', default='', help="Free text stored with the results (e.g. what changed).")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as f:
+                    baseline = {result['name']: result for result in json.load(f)['results']}
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read {options['compare']}: {e}")
+
+        cases = self.build_cases()
+        if options['only']:
+            cases = [case for case in cases if case['name'].startswith(tuple(options['only']))]
+
+        # The test client's host; caches start empty so every run sees the same state
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.clear_caches()
+            results = [self.run_case(case, options) for case in cases]
+
+        report = {
+            'label': options['label'],
+            'commit': _git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': {
+                'issues': Issue.objects.count(),
+                'users': User.objects.count(),
+                'upvotes': Upvote.objects.count(),
+                'comments': Comment.objects.count(),
+                'images': IssueImage.objects.count(),
+            },
+            'iterations': options['iterations'],
+            'warmup': options['warmup'],
+            'cache': 'cold' if options['cold'] else 'warm',
+            'results': results,
+        }
+        self.print_table(results, baseline)
+
+        data = json.dumps(report, indent=2)
+        if options['output'] == '-':
+            sys.stdout.write(data + '\n')
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(data + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}."))
+
+    # --- Cases ---
+
+    def build_cases(self):
+        def bench_user(**filters):
+            user = User.objects.filter(email__endswith='@' + EMAIL_DOMAIN, **filters).order_by('pk').first()
+            if user is None:
+                raise CommandError("No benchmark users found; run `manage.py seed_benchmark` first.")
+            return user
+
+        admin = bench_user(is_staff=True)
+        citizen = bench_user(role='citizen')
+        manager = User.objects.get(pk=(
+            Issue.objects.filter(assigned_to_manager__isnull=False).values('assigned_to_manager')
+            .annotate(n=Count('pk')).order_by('-n').values_list('assigned_to_manager', flat=True).first()
+            or bench_user(role='manager').pk
+        ))
+        category = IssueCategory.objects.annotate(n=Count('issues')).order_by('-n').first()
+        hot_issue = Issue.objects.order_by('-upvotes_count', 'pk').first()
+        busy_issue = Issue.objects.annotate(n=Count('comments')).order_by('-n', 'pk').first()
+        if hot_issue is None or category is None:
+            raise CommandError("The database has no issues; run `manage.py seed_benchmark` first.")
+        latest = Issue.objects.aggregate(latest=Max('reported_date'))['latest']
+        report_end = timezone.localtime(latest).date()
+        report_form = {
+            'start_date': (report_end - datetime.timedelta(days=30)).isoformat(),
+            'end_date': report_end.isoformat(),
+            'status': '',
+        }
+
+        def detail(issue):
+            return reverse('issues:issue_detail', kwargs={'pk': issue.pk})
+
+        issue_list = reverse('issues:issue_list')
+        issue_map = reverse('issues:issue_map_data')
+        cases = [
+            ('list_newest', 'get', issue_list, {}, None),
+            ('list_oldest', 'get', issue_list, {'sort': 'oldest'}, None),
+            ('list_upvotes', 'get', issue_list, {'sort': 'upvotes'}, None),
+            ('list_status', 'get', issue_list, {'status': 'Reported'}, None),
+            ('list_category', 'get', issue_list, {'category': category.name}, None),
+            ('list_category_status', 'get', issue_list, {'category': category.name, 'status': 'Reported', 'sort': 'upvotes'}, None),
+            ('list_search', 'get', issue_list, {'q': 'pothole'}, None),
+            ('list_search_page_2', 'get', issue_list, {'q': 'pothole', 'page': '2'}, None),
+            ('list_search_newest', 'get', issue_list, {'q': 'pothole', 'sort': 'newest'}, None),
+            ('list_offset_page_50', 'get', issue_list, {'page': '50'}, None),
+            ('list_newest_signed_in', 'get', issue_list, {}, citizen),
+            ('map_city', 'get', issue_map, {'bbox': '76.2,9.9,76.4,10.2', 'zoom': '12'}, None),
+            ('map_city_status', 'get', issue_map, {'bbox': '76.2,9.9,76.4,10.2', 'zoom': '12', 'status': 'Reported'}, None),
+            ('map_district', 'get', issue_map, {'bbox': '75.5,9.5,77.0,10.6', 'zoom': '9'}, None),
+            ('map_street', 'get', issue_map, {'bbox': '76.29,9.99,76.31,10.005', 'zoom': '15'}, None),
+            ('detail_hot', 'get', detail(hot_issue), {}, None),
+            ('detail_busy_signed_in', 'get', detail(busy_issue), {}, citizen),
+            # Each request toggles: an even number of requests leaves the vote as it was
+            ('toggle_upvote', 'post', reverse('issues:toggle_upvote_issue', kwargs={'pk': hot_issue.pk}), {}, citizen),
+            ('admin_dashboard', 'get', reverse('issues:admin_dashboard'), {}, admin),
+            ('manager_dashboard', 'get', reverse('issues:manager_dashboard'), {}, manager),
+            ('report_form', 'get', reverse('issues:generate_issue_report'), {}, admin),
+            ('report_submit', 'post', reverse('issues:generate_issue_report'), report_form, admin),
+        ]
+        return [
+            {'name': name, 'method': method, 'path': path, 'data': data, 'user': user}
+            for name, method, path, data, user in cases
+        ]
+
+    def clear_caches(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def run_case(self, case, options):
+        client = Client()
+        if case['user'] is not None:
+            client.force_login(case['user'])
+        request = getattr(client, case['method'])
+
+        for _ in range(options['warmup']):
+            request(case['path'], case['data'])
+
+        timings, sql_timings, query_counts, status = [], [], [], None
+        for _ in range(options['iterations']):
+            if options['cold']:
+                self.clear_caches()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = request(case['path'], case['data'])
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            status = response.status_code
+            query_counts.append(len(queries))
+            sql_timings.append(sum(float(query['time']) for query in queries.captured_queries) * 1000)
+
+        timings.sort()
+        return {
+            'name': case['name'],
+            'method': case['method'].upper(),
+            'path': case['path'],
+            'params': case['data'],
+            'status': status,
+            'queries': max(query_counts),
+            'sql_ms': round(statistics.median(sql_timings), 3),
+            'ms': {
+                'min': round(timings[0], 3),
+                'median': round(statistics.median(timings), 3),
+                'p95': round(_percentile(timings, 0.95), 3),
+                'max': round(timings[-1], 3),
+                'mean': round(statistics.fmean(timings), 3),
+            },
+        }
+
+    def print_table(self, results, baseline):
+        # To stderr, so `bench > results.json` still gets clean JSON
+        out = sys.stderr
+        out.write(f"{'case':26} {'status':>6} {'queries':>7} {'sql ms':>8} {'median ms':>10} {'p95 ms':>8}"
+                  f"{'  vs baseline' if baseline else ''}\n")
+        for result in results:
+            line = (f"{result['name']:26} {result['status']:>6} {result['queries']:>7} {result['sql_ms']:>8.1f} "
+                    f"{result['ms']['median']:>10.1f} {result['ms']['p95']:>8.1f}")
+            previous = (baseline or {}).get(result['name'])
+            if previous and previous['ms']['median']:
+                change = 100.0 * (result['ms']['median'] - previous['ms']['median']) / previous['ms']['median']
+                line += f"  {change:+.1f}% ({previous['ms']['median']:.1f} ms)"
+            out.write(line + '\n')
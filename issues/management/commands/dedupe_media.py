@@ -0,0 +1,76 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from issues import blobs, list_cache, page_cache
+from issues.models import Issue, IssueImage, MediaBlob
+from issues.storage import blob_name, blob_storage, content_digest, is_blob_name, normalized_extension
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves existing issue/resolution images into the content-addressed blob store, "
+        "dropping duplicate copies, and rebuilds the blob reference counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without touching anything.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = blob_storage()
+        legacy_names = sorted(name for name in blobs.referenced_names() if not is_blob_name(name))
+
+        moved = duplicates = missing = 0
+        bytes_saved = 0
+        seen = set()  # Targets written (or, in a dry run, that would be) during this run
+        for name in legacy_names:
+            if not storage.exists(name):
+                self.stdout.write(self.style.WARNING(f"  Missing file, left as is: {name}"))
+                missing += 1
+                continue
+            with storage.open(name, 'rb') as f:
+                target = blob_name(content_digest(f), normalized_extension(name))
+                already_stored = target in seen or storage.exists(target)
+                seen.add(target)
+                if already_stored:
+                    duplicates += 1
+                    bytes_saved += storage.size(name)
+                else:
+                    moved += 1
+                if dry_run:
+                    continue
+                if not already_stored:
+                    storage.save(target, File(f))  # Hashes to `target`
+
+            with transaction.atomic():
+                # Queryset updates fire no signals: drop the affected detail page
+                # caches here; the blob counts are rebuilt below
+                page_cache.invalidate_issues(
+                    IssueImage.objects.filter(image=name).order_by().values_list('issue_id', flat=True).union(
+                        Issue.objects.filter(resolution_image=name).order_by().values_list('pk', flat=True)
+                    )
+                )
+                list_cache.invalidate()
+                IssueImage.objects.filter(image=name).update(image=target)
+                Issue.objects.filter(resolution_image=name).update(resolution_image=target)
+            blobs.delete_file(name)  # The old copy and its thumbnails
+            self.stdout.write(f"  {name} -> {target}{' (duplicate)' if already_stored else ''}")
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f"Dry run: {moved} files would move, {duplicates} duplicates would be removed "
+                f"({bytes_saved / 1024 / 1024:.1f} MB), {missing} files are missing."
+            ))
+            return
+
+        drift = blobs.rebuild_refcounts()
+        unreferenced = [
+            name for name in MediaBlob.objects.filter(refcount__lte=0).values_list('name', flat=True)
+            if blobs.delete_if_unreferenced(name)
+        ]
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} files, removed {duplicates} duplicates ({bytes_saved / 1024 / 1024:.1f} MB), "
+            f"{missing} missing. {len(drift)} reference counts corrected, {len(unreferenced)} unused blobs deleted. "
+            f"Run generate_image_derivatives to rebuild thumbnails."
+        ))
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from issues import export
+from issues.forms import IssueExportForm
+
+
+class Command(BaseCommand):
+    help = "Streams issues to a CSV or JSON Lines file (e.g. for nightly open-data dumps)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(export.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help="gzip-compress the output.")
+        parser.add_argument('--output', '-o', default='-', help="File to write; '-' (default) writes to stdout.")
+        parser.add_argument('--start-date', help="First reported day to include (YYYY-MM-DD).")
+        parser.add_argument('--end-date', help="Last reported day to include (YYYY-MM-DD).")
+        parser.add_argument('--status', default='')
+        parser.add_argument('--category', help="Category id.")
+        parser.add_argument('--area', default='', help="Municipal area name.")
+
+    def handle(self, *args, **options):
+        # Validate through the same form as the staff export page
+        form = IssueExportForm({
+            'format': options['format'],
+            'compress': options['gzip'],
+            'start_date': options['start_date'],
+            'end_date': options['end_date'],
+            'status': options['status'],
+            'category': options['category'],
+            'municipal_area': options['area'],
+        })
+        if not form.is_valid():
+            errors = '; '.join(f"{field}: {' '.join(messages)}" for field, messages in form.errors.items())
+            raise CommandError(f"Invalid export options: {errors}")
+
+        issues = export.export_queryset(
+            start_date=form.cleaned_data['start_date'],
+            end_date=form.cleaned_data['end_date'],
+            status=form.cleaned_data['status'],
+            category=form.cleaned_data['category'],
+            municipal_area=form.cleaned_data['municipal_area'],
+        )
+        chunks = export.stream_export(issues, options['format'], options['gzip'])
+
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        # Write next to the target and rename, so a half-written dump never replaces the last good one
+        output = os.path.abspath(options['output'])
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output), prefix='.export-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.chmod(temp_path, 0o644)  # mkstemp creates it private
+            os.replace(temp_path, output)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.stderr.write(self.style.SUCCESS(f"Exported issues to {output}."))
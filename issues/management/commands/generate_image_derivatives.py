@@ -0,0 +1,31 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from issues import thumbnails
+from issues.models import Issue, IssueImage
+
+
+class Command(BaseCommand):
+    help = "Writes the missing thumbnail and mid-size copies of issue and resolution images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true', help="Regenerate copies that already exist.")
+
+    def handle(self, *args, **options):
+        names = list(IssueImage.objects.exclude(image='').values_list('image', flat=True).iterator())
+        names += Issue.objects.exclude(resolution_image='').exclude(resolution_image__isnull=True).values_list('resolution_image', flat=True)
+
+        written = failed = 0
+        for name in names:
+            if not default_storage.exists(name):
+                self.stdout.write(self.style.WARNING(f"  Missing original: {name}"))
+                failed += 1
+                continue
+            try:
+                written += thumbnails.generate(name, overwrite=options['overwrite'])
+            except Exception as e:  # A corrupt upload shouldn't stop the whole run
+                self.stdout.write(self.style.WARNING(f"  Could not process {name}: {e}"))
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {len(names)} images: wrote {written} copies, {failed} images skipped."
+        ))
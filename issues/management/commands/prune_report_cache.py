@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from issues import reports
+
+
+class Command(BaseCommand):
+    help = "Deletes stored PDF reports that are older than REPORT_CACHE_MAX_AGE_DAYS or exceed REPORT_CACHE_MAX_TOTAL_MB."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age-days', type=int, help="Override settings.REPORT_CACHE_MAX_AGE_DAYS.")
+        parser.add_argument('--max-total-mb', type=int, help="Override settings.REPORT_CACHE_MAX_TOTAL_MB.")
+
+    def handle(self, *args, **options):
+        evicted = reports.evict_artifacts(options['max_age_days'], options['max_total_mb'])
+        self.stdout.write(self.style.SUCCESS(f"Report cache pruned ({evicted} reports removed)."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from issues import duplicates
+from issues.models import Issue
+
+
+class Command(BaseCommand):
+    help = "Builds the MinHash signatures used for duplicate detection for every issue (unchanged ones are skipped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = 0
+        issues = Issue.objects.only('pk', 'title', 'description').order_by('pk')
+        for issue in issues.iterator(chunk_size=options['chunk_size']):
+            duplicates.update_signature(issue)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} issues."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from issues import clustering
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the IssueMapCell counts the map clusters are drawn from, from the Issue table."
+
+    def handle(self, *args, **options):
+        row_count = clustering.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {row_count} map cell rows."))
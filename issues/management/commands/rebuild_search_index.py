@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from issues import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index for issues from the Issue table."
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write(self.style.WARNING(
+                "Full-text index is not available on this database (SQLite FTS5 only). "
+                "Search falls back to icontains filtering."
+            ))
+            return
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} issues."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from issues import stats
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the materialized admin dashboard counters from the issue, user and category tables."
+
+    def handle(self, *args, **options):
+        drift = stats.recompute()
+        for key, (old, new) in sorted(drift.items()):
+            self.stdout.write(f"  {key}: {old} -> {new}")
+        self.stdout.write(self.style.SUCCESS(f"Dashboard statistics rebuilt ({len(drift)} counters corrected)."))
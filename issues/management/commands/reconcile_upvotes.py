@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from issues.upvotes import reconcile_upvote_counts
+
+
+class Command(BaseCommand):
+    help = "Recomputes Issue.upvotes_count from the Upvote table for every issue whose counter has drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('issue_ids', nargs='*', type=int, help="Only check these issues.")
+
+    def handle(self, *args, **options):
+        fixed = reconcile_upvote_counts(options['issue_ids'] or None)  # Also drops the affected cached pages
+        self.stdout.write(self.style.SUCCESS(f"Corrected upvote counts on {fixed} issues."))
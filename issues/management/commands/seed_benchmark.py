@@ -0,0 +1,247 @@
+import datetime
+import io
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from issues import blobs, clustering, rollup, search, stats, thumbnails
+from issues.models import Comment, Issue, IssueCategory, IssueImage, Upvote, geo_cell
+from issues.storage import blob_storage
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'bench.invalid'
+PASSWORD = 'benchmark'  # Every generated account, so `bench` (or a person) can log in as any of them
+
+# (area, latitude, longitude, spread in degrees): neighbourhoods of Kochi
+AREAS = [
+    ('Kaloor', 9.9973, 76.2999, 0.006),
+    ('Edappally', 10.0261, 76.3083, 0.008),
+    ('Palarivattom', 10.0033, 76.3060, 0.005),
+    ('Vyttila', 9.9682, 76.3182, 0.007),
+    ('Kakkanad', 10.0159, 76.3419, 0.012),
+    ('Fort Kochi', 9.9658, 76.2421, 0.006),
+    ('Ernakulam South', 9.9667, 76.2890, 0.006),
+    ('Kadavanthra', 9.9667, 76.3000, 0.005),
+    ('Thrikkakara', 10.0327, 76.3296, 0.009),
+    ('Aluva', 10.1076, 76.3516, 0.010),
+]
+
+# (category, description, title templates)
+CATEGORIES = [
+    ('Roads & Potholes', 'Damaged road surfaces', ['Pothole on {street}', 'Road surface broken near {landmark}', 'Deep crater on {street}']),
+    ('Streetlights', 'Broken or flickering lights', ['Streetlight not working on {street}', 'Flickering lamp near {landmark}']),
+    ('Garbage Collection', 'Missed pickups and overflowing bins', ['Garbage not collected on {street}', 'Overflowing bin near {landmark}']),
+    ('Water Supply', 'Leaks and outages', ['Water pipe leaking on {street}', 'No water supply near {landmark}']),
+    ('Drainage', 'Blocked drains and flooding', ['Blocked drain on {street}', 'Waterlogging near {landmark} after rain']),
+    ('Stray Animals', 'Stray dogs and cattle', ['Stray dogs chasing people on {street}', 'Cattle blocking traffic near {landmark}']),
+    ('Traffic Signals', 'Faulty signals and signage', ['Traffic signal stuck at {landmark}', 'Missing stop sign on {street}']),
+    ('Parks & Public Spaces', 'Maintenance of parks', ['Broken bench in park near {landmark}', 'Overgrown grass at {landmark} park']),
+    ('Illegal Dumping', 'Construction and waste dumping', ['Construction debris dumped on {street}', 'Waste burning near {landmark}']),
+    ('Footpaths', 'Damaged or blocked footpaths', ['Footpath slabs missing on {street}', 'Footpath blocked by shops near {landmark}']),
+]
+
+STREETS = [
+    'MG Road', 'Banerji Road', 'Chittoor Road', 'Sahodaran Ayyappan Road', 'Seaport-Airport Road',
+    'Palarivattom-Kakkanad Road', 'Kaloor-Kadavanthra Road', 'Pipeline Road', 'Market Road', 'Temple Road',
+]
+LANDMARKS = [
+    'the bus stand', 'the metro station', 'the market', 'the school gate', 'the temple', 'the church',
+    'the hospital', 'the stadium', 'the junction', 'the library',
+]
+DETAILS = [
+    "It has been like this for over a week.", "Vehicles are swerving to avoid it.", "Children walk here every morning.",
+    "It gets much worse when it rains.", "Several neighbours have complained already.", "It is dangerous at night.",
+    "Two-wheelers have skidded here.", "The smell is unbearable.", "Please send someone to inspect.",
+]
+COMMENTS = [
+    "Same problem on our street too.", "Still not fixed as of today.", "Thanks for reporting this!",
+    "I nearly had an accident here yesterday.", "The ward councillor has been informed.", "+1, please prioritise.",
+    "Someone came to look at it but nothing was done.", "Photos attached in the original report show it clearly.",
+]
+
+# Relative weights; most issues are open and in the early stages
+STATUS_WEIGHTS = [
+    ('Reported', 30), ('Under Review', 8), ('Verified', 8), ('Assigned', 8), ('Manager Acknowledged', 5),
+    ('Manager Investigating', 5), ('Work In Progress', 6), ('Awaiting Resources', 3), ('Requires Assistance', 2),
+    ('Action Taken', 4), ('Resolved', 15), ('Closed-No Action', 2), ('Duplicate', 2), ('Invalid', 2),
+]
+MANAGED_STATUSES = {
+    'Assigned', 'Manager Acknowledged', 'Manager Investigating', 'Work In Progress', 'Awaiting Resources',
+    'Requires Assistance', 'Action Taken', 'Resolved',
+}
+PRIORITY_WEIGHTS = [('Low', 30), ('Medium', 50), ('High', 20)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills an empty database with deterministic synthetic users, categories, issues, upvotes, comments "
+        "and images for benchmarking (see `manage.py bench`). Same options and seed give the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issues', type=int, default=10000, help="Number of issues (10k to 1M is the intended range).")
+        parser.add_argument('--users', type=int, help="Citizen accounts (default: one per 10 issues, at least 100).")
+        parser.add_argument('--managers', type=int, default=20)
+        parser.add_argument('--images', type=int, default=24, help="Distinct photos to attach (they are reused).")
+        parser.add_argument('--days', type=int, default=730, help="Reported dates spread over this many days.")
+        parser.add_argument('--end-date', default='2026-01-01', help="Last reported day (YYYY-MM-DD), fixed for reproducibility.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(email__endswith='@' + EMAIL_DOMAIN).exists():
+            raise CommandError("Benchmark data is already present; seed a fresh database.")
+        try:
+            end_date = datetime.date.fromisoformat(options['end_date'])
+        except ValueError:
+            raise CommandError("--end-date must be YYYY-MM-DD.")
+        issue_total = options['issues']
+        if issue_total < 1:
+            raise CommandError("--issues must be at least 1.")
+
+        self.rng = random.Random(options['seed'])
+        self.end = timezone.make_aware(datetime.datetime.combine(end_date, datetime.time(23, 59)))
+        self.span_seconds = options['days'] * 86400
+
+        citizens, managers = self.create_users(options['users'] or max(100, issue_total // 10), options['managers'])
+        categories = self.create_categories()
+        image_names = self.create_images(options['images'])
+        self.stdout.write(f"Created {len(citizens)} citizens, {len(managers)} managers, {len(categories)} categories, "
+                          f"{len(image_names)} photos.")
+
+        totals = {'issues': 0, 'images': 0, 'upvotes': 0, 'comments': 0}
+        batch_size = options['batch_size']
+        for start in range(0, issue_total, batch_size):
+            with transaction.atomic():
+                counts = self.create_issue_batch(
+                    min(batch_size, issue_total - start), citizens, managers, categories, image_names
+                )
+            for key, value in counts.items():
+                totals[key] += value
+            self.stdout.write(f"  {totals['issues']}/{issue_total} issues")
+
+        # bulk_create skips the signals that maintain these
+        self.stdout.write("Rebuilding the search index, dashboard counters, daily rollup, map cells and blob counts...")
+        search.rebuild_index()
+        stats.recompute()
+        rollup.backfill()
+        clustering.rebuild()
+        blobs.rebuild_refcounts()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {totals['issues']} issues with {totals['images']} images, {totals['upvotes']} upvotes and "
+            f"{totals['comments']} comments. Log in as bench_admin@{EMAIL_DOMAIN} / {PASSWORD}."
+        ))
+
+    # --- Reference data ---
+
+    def create_users(self, citizen_count, manager_count):
+        password = make_password(PASSWORD)  # Hashing once; it's deliberately slow
+        User.objects.bulk_create([
+            User(username='bench_admin', email=f'bench_admin@{EMAIL_DOMAIN}', password=password,
+                 is_staff=True, is_superuser=True, role='moderator'),
+        ])
+        User.objects.bulk_create(
+            (User(username=f'bench_manager_{n}', email=f'bench_manager_{n}@{EMAIL_DOMAIN}', password=password,
+                  role='manager') for n in range(manager_count)),
+            batch_size=1000,
+        )
+        User.objects.bulk_create(
+            (User(username=f'bench_user_{n}', email=f'bench_user_{n}@{EMAIL_DOMAIN}', password=password)
+             for n in range(citizen_count)),
+            batch_size=1000,
+        )
+        bench_users = User.objects.filter(email__endswith='@' + EMAIL_DOMAIN).order_by('pk')
+        managers = list(bench_users.filter(role='manager').values_list('pk', flat=True))
+        citizens = list(bench_users.filter(role='citizen').values_list('pk', flat=True))
+        return citizens, managers
+
+    def create_categories(self):
+        existing = set(IssueCategory.objects.values_list('name', flat=True))
+        IssueCategory.objects.bulk_create(
+            IssueCategory(name=name, description=description)
+            for name, description, _ in CATEGORIES if name not in existing
+        )
+        by_name = dict(IssueCategory.objects.values_list('name', 'pk'))
+        return [(by_name[name], titles) for name, _, titles in CATEGORIES]
+
+    def create_images(self, count):
+        """`count` distinct small photos in the blob store, with their thumbnails."""
+        names = []
+        for n in range(count):
+            rng = random.Random(n)
+            image = Image.new('RGB', (1024, 768), tuple(rng.randrange(60, 200) for _ in range(3)))
+            draw = ImageDraw.Draw(image)
+            for _ in range(12):
+                x, y = rng.randrange(1024), rng.randrange(768)
+                draw.ellipse((x, y, x + rng.randrange(40, 300), y + rng.randrange(40, 200)),
+                             fill=tuple(rng.randrange(256) for _ in range(3)))
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=80)
+            name = blob_storage().save(f'bench_{n}.jpg', ContentFile(output.getvalue()))
+            thumbnails.generate(name)
+            names.append(name)
+        return names
+
+    # --- Issues and their rows ---
+
+    def weighted(self, pairs):
+        return self.rng.choices([value for value, _ in pairs], weights=[weight for _, weight in pairs])[0]
+
+    def create_issue_batch(self, count, citizens, managers, categories, image_names):
+        rng = self.rng
+        issues, plans = [], []
+        for _ in range(count):
+            area, center_lat, center_lon, spread = rng.choice(AREAS)
+            latitude = round(rng.gauss(center_lat, spread), 7)
+            longitude = round(rng.gauss(center_lon, spread), 7)
+            category_id, titles = rng.choice(categories)
+            street, landmark = rng.choice(STREETS), rng.choice(LANDMARKS)
+            status = self.weighted(STATUS_WEIGHTS)
+            priority = self.weighted(PRIORITY_WEIGHTS)
+            # Heavy-tailed: most issues get a few votes, a handful get hundreds
+            upvoter_count = min(int(rng.paretovariate(1.2)) - 1, 500, len(citizens))
+            issues.append(Issue(
+                title=rng.choice(titles).format(street=street, landmark=landmark),
+                description=' '.join([f"Reported near {landmark} on {street}."] + rng.sample(DETAILS, 2)),
+                user_id=rng.choice(citizens),
+                category_id=category_id,
+                latitude=latitude,
+                longitude=longitude,
+                geo_cell_lat=geo_cell(latitude),
+                geo_cell_lon=geo_cell(longitude),
+                municipal_area=area,
+                status=status,
+                priority=priority,
+                priority_rank=Issue.PRIORITY_RANKS[priority],
+                # A few managers carry most of the load, like the real queue
+                assigned_to_manager_id=(
+                    managers[min(int(rng.expovariate(0.5)), len(managers) - 1)]
+                    if managers and status in MANAGED_STATUSES else None
+                ),
+                upvotes_count=upvoter_count,
+                reported_date=self.end - datetime.timedelta(seconds=rng.randrange(self.span_seconds)),
+            ))
+            plans.append((
+                rng.sample(citizens, upvoter_count),
+                [(rng.choice(citizens), rng.choice(COMMENTS)) for _ in range(self.weighted([(0, 40), (1, 25), (2, 15), (3, 10), (6, 7), (15, 3)]))],
+                rng.sample(image_names, min(self.weighted([(0, 25), (1, 50), (2, 15), (3, 10)]), len(image_names))),
+            ))
+        Issue.objects.bulk_create(issues)
+
+        upvote_rows, comment_rows, image_rows = [], [], []
+        for issue, (voters, comments, images) in zip(issues, plans):
+            upvote_rows.extend(Upvote(user_id=user_id, issue_id=issue.pk) for user_id in voters)
+            comment_rows.extend(Comment(issue_id=issue.pk, user_id=user_id, comment_text=text) for user_id, text in comments)
+            image_rows.extend(IssueImage(issue_id=issue.pk, image=name) for name in images)
+        Upvote.objects.bulk_create(upvote_rows, batch_size=5000)
+        Comment.objects.bulk_create(comment_rows, batch_size=5000)
+        IssueImage.objects.bulk_create(image_rows, batch_size=5000)
+        return {'issues': len(issues), 'images': len(image_rows), 'upvotes': len(upvote_rows), 'comments': len(comment_rows)}
@@ -0,0 +1,35 @@
+# Creates the FTS5 full-text index used by issues/search.py (SQLite only).
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return  # Other backends use the icontains fallback in issues/search.py
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS issues_issue_fts USING fts5("
+        "title, description, category, municipal_area, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO issues_issue_fts (rowid, title, description, category, municipal_area) "
+        "SELECT i.id, i.title, i.description, COALESCE(c.name, ''), COALESCE(i.municipal_area, '') "
+        "FROM issues_issue i LEFT JOIN issues_issuecategory c ON c.id = i.category_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS issues_issue_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0007_remove_issue_image_issueimage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:06
+
+from django.conf import settings
+import math
+
+from django.db import migrations, models
+
+
+def backfill_geo_cells(apps, schema_editor):
+    # Same formula as issues.models.geo_cell (GEO_CELL_SCALE = 100)
+    Issue = apps.get_model('issues', 'Issue')
+    batch = []
+    for issue in Issue.objects.only('pk', 'latitude', 'longitude').iterator(chunk_size=2000):
+        issue.geo_cell_lat = math.floor(float(issue.latitude) * 100)
+        issue.geo_cell_lon = math.floor(float(issue.longitude) * 100)
+        batch.append(issue)
+        if len(batch) >= 2000:
+            Issue.objects.bulk_update(batch, ['geo_cell_lat', 'geo_cell_lon'])
+            batch = []
+    if batch:
+        Issue.objects.bulk_update(batch, ['geo_cell_lat', 'geo_cell_lon'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0008_issue_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='geo_cell_lat',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='geo_cell_lon',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['geo_cell_lat', 'geo_cell_lon'], name='issue_geo_cell_idx'),
+        ),
+        migrations.RunPython(backfill_geo_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0009_issue_geo_cells'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueTextSignature',
+            fields=[
+                ('issue', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text_signature', serialize=False, to='issues.issue')),
+                ('fingerprint', models.CharField(help_text='Hash of the text the signature was built from.', max_length=32)),
+                ('minhash', models.JSONField(default=list)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IssueSignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band_key', models.CharField(db_index=True, max_length=24)),
+                ('issue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='issues.issue')),
+            ],
+        ),
+    ]
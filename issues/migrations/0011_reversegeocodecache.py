@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0010_issue_text_signatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReverseGeocodeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lat_key', models.IntegerField()),
+                ('lon_key', models.IntegerField()),
+                ('area_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Reverse Geocode Cache Entry',
+                'verbose_name_plural': 'Reverse Geocode Cache',
+                'unique_together': {('lat_key', 'lon_key')},
+            },
+        ),
+    ]
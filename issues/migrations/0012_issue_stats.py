@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_issue_stats(apps, schema_editor):
+    # Same keys as issues.stats.stat_keys()
+    Issue = apps.get_model('issues', 'Issue')
+    IssueCategory = apps.get_model('issues', 'IssueCategory')
+    IssueStat = apps.get_model('issues', 'IssueStat')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    final_statuses = ['Resolved', 'Closed-No Action', 'Invalid', 'Duplicate']
+    counts = {'total': 0, 'users': User.objects.count(), 'categories': IssueCategory.objects.count()}
+    rows = Issue.objects.order_by().values('status', 'priority', 'assigned_to_manager_id').annotate(n=Count('pk'))
+    for row in rows:
+        keys = ['total', f"status:{row['status']}"]
+        if row['status'] not in final_statuses:
+            keys.append('open')
+            if row['priority'] == 'High':
+                keys.append('high_priority_open')
+        if row['status'] == 'Verified' and row['assigned_to_manager_id'] is None:
+            keys.append('unassigned_verified')
+        for key in keys:
+            counts[key] = counts.get(key, 0) + row['n']
+    IssueStat.objects.bulk_create(IssueStat(key=key, value=value) for key, value in counts.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0011_reversegeocodecache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('value', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Issue Statistic',
+                'verbose_name_plural': 'Issue Statistics',
+            },
+        ),
+        migrations.RunPython(fill_issue_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0012_issue_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('municipal_area', models.CharField(blank=True, default='', max_length=255)),
+                ('status', models.CharField(choices=[('Reported', 'Reported'), ('Under Review', 'Under Review'), ('Verified', 'Verified & Awaiting Assignment'), ('Assigned', 'Assigned to Manager'), ('Manager Acknowledged', 'Manager: Acknowledged'), ('Manager Investigating', 'Manager: Investigating'), ('Work In Progress', 'Manager: Work In Progress'), ('Awaiting Resources', 'Manager: Awaiting Resources'), ('Requires Assistance', 'Manager: Requires Moderator Assistance'), ('Action Taken', 'Action Taken'), ('Resolved', 'Resolved'), ('Closed-No Action', 'Closed-No Action'), ('Duplicate', 'Duplicate Issue'), ('Invalid', 'Invalid Report')], max_length=50)),
+                ('new_count', models.IntegerField(default=0, help_text='Issues reported this day (in their initial status)')),
+                ('entered_count', models.IntegerField(default=0, help_text='Issues moved into this status this day')),
+                ('exited_count', models.IntegerField(default=0, help_text='Issues moved out of this status this day')),
+                ('adjusted_count', models.IntegerField(default=0, help_text='Net issues moved in by category/area edits or deletions')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='issues.issuecategory')),
+            ],
+            options={
+                'verbose_name': 'Issue Daily Statistics',
+                'verbose_name_plural': 'Issue Daily Statistics',
+                'indexes': [models.Index(fields=['date', 'status'], name='issue_daily_date_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'category', 'municipal_area', 'status'), name='issue_daily_bucket_unique')],
+            },
+        ),
+    ]
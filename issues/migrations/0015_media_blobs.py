@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:31
+
+import issues.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0014_report_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='resolution_image',
+            field=models.ImageField(blank=True, help_text='Optional image uploaded by the manager showing the resolved issue or work done', null=True, storage=issues.storage.blob_storage, upload_to='resolution_images/'),
+        ),
+        migrations.AlterField(
+            model_name='issueimage',
+            name='image',
+            field=models.ImageField(help_text='One of the images for the issue.', storage=issues.storage.blob_storage, upload_to='issue_images/'),
+        ),
+    ]
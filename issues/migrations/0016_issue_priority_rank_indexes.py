@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-18 00:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_priority_rank(apps, schema_editor):
+    # Same values as Issue.PRIORITY_RANKS; anything else ranks last
+    Issue = apps.get_model('issues', 'Issue')
+    Issue.objects.update(priority_rank=0)
+    for priority, rank in {'Low': 1, 'Medium': 2, 'High': 3}.items():
+        Issue.objects.filter(priority=priority).update(priority_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0015_media_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='issue',
+            options={'ordering': ['-priority_rank', '-reported_date']},
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=2, editable=False),
+        ),
+        migrations.RunPython(fill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['priority_rank', 'reported_date'], name='issue_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['reported_date', 'id'], name='issue_reported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['status', 'reported_date', 'id'], name='issue_status_reported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['category', 'reported_date', 'id'], name='issue_category_reported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['upvotes_count', 'reported_date', 'id'], name='issue_upvotes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['assigned_to_manager', '-priority_rank', 'reported_date', 'id'], name='issue_manager_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['user', 'reported_date'], name='issue_reporter_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['status', 'priority', 'assigned_to_manager'], name='issue_stats_idx'),
+        ),
+    ]
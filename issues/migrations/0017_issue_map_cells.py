@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_map_cells(apps, schema_editor):
+    # Same rows as issues.clustering.rebuild()
+    Issue = apps.get_model('issues', 'Issue')
+    IssueMapCell = apps.get_model('issues', 'IssueMapCell')
+    rows = Issue.objects.exclude(geo_cell_lat=None).order_by().values(
+        'geo_cell_lat', 'geo_cell_lon', 'category_id', 'status'
+    ).annotate(n=Count('pk'), lat=Sum('latitude'), lon=Sum('longitude'), pks=Sum('pk'))
+    IssueMapCell.objects.bulk_create(
+        (
+            IssueMapCell(
+                geo_cell_lat=row['geo_cell_lat'], geo_cell_lon=row['geo_cell_lon'], category_id=row['category_id'],
+                status=row['status'], issue_count=row['n'], latitude_sum=float(row['lat']),
+                longitude_sum=float(row['lon']), issue_pk_sum=row['pks'],
+            )
+            for row in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0016_issue_priority_rank_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueMapCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geo_cell_lat', models.IntegerField()),
+                ('geo_cell_lon', models.IntegerField()),
+                ('status', models.CharField(choices=[('Reported', 'Reported'), ('Under Review', 'Under Review'), ('Verified', 'Verified & Awaiting Assignment'), ('Assigned', 'Assigned to Manager'), ('Manager Acknowledged', 'Manager: Acknowledged'), ('Manager Investigating', 'Manager: Investigating'), ('Work In Progress', 'Manager: Work In Progress'), ('Awaiting Resources', 'Manager: Awaiting Resources'), ('Requires Assistance', 'Manager: Requires Moderator Assistance'), ('Action Taken', 'Action Taken'), ('Resolved', 'Resolved'), ('Closed-No Action', 'Closed-No Action'), ('Duplicate', 'Duplicate Issue'), ('Invalid', 'Invalid Report')], max_length=50)),
+                ('issue_count', models.IntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0)),
+                ('longitude_sum', models.FloatField(default=0)),
+                ('issue_pk_sum', models.BigIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='map_cells', to='issues.issuecategory')),
+            ],
+            options={
+                'verbose_name': 'Issue Map Cell',
+                'verbose_name_plural': 'Issue Map Cells',
+                'constraints': [models.UniqueConstraint(fields=('geo_cell_lat', 'geo_cell_lon', 'category', 'status'), name='issue_map_cell_unique')],
+            },
+        ),
+        migrations.RunPython(fill_map_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:19
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_uncategorized_rows(apps, schema_editor):
+    # Deleted categories could leave several uncategorized rows per cell and status
+    IssueMapCell = apps.get_model('issues', 'IssueMapCell')
+    uncategorized = IssueMapCell.objects.filter(category__isnull=True)
+    duplicates = uncategorized.order_by().values('geo_cell_lat', 'geo_cell_lon', 'status').annotate(
+        rows=Count('pk'), n=Sum('issue_count'), lat=Sum('latitude_sum'), lon=Sum('longitude_sum'), pks=Sum('issue_pk_sum'),
+    ).filter(rows__gt=1)
+    for row in duplicates:
+        bucket = uncategorized.filter(geo_cell_lat=row['geo_cell_lat'], geo_cell_lon=row['geo_cell_lon'], status=row['status'])
+        keep = bucket.order_by('pk').first()
+        bucket.exclude(pk=keep.pk).delete()
+        IssueMapCell.objects.filter(pk=keep.pk).update(
+            issue_count=row['n'], latitude_sum=row['lat'], longitude_sum=row['lon'], issue_pk_sum=row['pks'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0017_issue_map_cells'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_uncategorized_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='issuemapcell',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('geo_cell_lat', 'geo_cell_lon', 'status'), name='issue_map_cell_unique_uncategorized'),
+        ),
+    ]
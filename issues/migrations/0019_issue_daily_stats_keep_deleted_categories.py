@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+COUNTS = ('new_count', 'entered_count', 'exited_count', 'adjusted_count')
+
+
+def merge_uncategorized_rows(apps, schema_editor):
+    # Concurrent first writes could create the same uncategorized bucket twice
+    IssueDailyStats = apps.get_model('issues', 'IssueDailyStats')
+    uncategorized = IssueDailyStats.objects.filter(category__isnull=True)
+    duplicates = uncategorized.order_by().values('date', 'municipal_area', 'status').annotate(
+        rows=Count('pk'), **{field: Sum(field) for field in COUNTS},
+    ).filter(rows__gt=1)
+    for row in duplicates:
+        bucket = uncategorized.filter(date=row['date'], municipal_area=row['municipal_area'], status=row['status'])
+        keep = bucket.order_by('pk').first()
+        bucket.exclude(pk=keep.pk).delete()
+        IssueDailyStats.objects.filter(pk=keep.pk).update(**{field: row[field] for field in COUNTS})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0018_issue_map_cell_uncategorized_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_uncategorized_rows, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='issuedailystats',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_stats', to='issues.issuecategory'),
+        ),
+        migrations.AddConstraint(
+            model_name='issuedailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('date', 'municipal_area', 'status'), name='issue_daily_bucket_unique_uncategorized'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0019_issue_daily_stats_keep_deleted_categories'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CircuitBreakerState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('state', models.CharField(default='closed', max_length=10)),
+                ('consecutive_failures', models.IntegerField(default=0)),
+                ('opened_at', models.FloatField(blank=True, help_text='time.time() when it opened, or the trial call started', null=True)),
+            ],
+            options={
+                'verbose_name': 'Circuit Breaker State',
+                'verbose_name_plural': 'Circuit Breaker States',
+            },
+        ),
+        migrations.CreateModel(
+            name='GeocoderCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Geocoder Counter',
+                'verbose_name_plural': 'Geocoder Counters',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0020_geocoder_shared_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='reserved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
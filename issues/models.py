@@ -1,7 +1,12 @@
+import math
+
 from django.db import models
+from django.db.models import F, Value, ExpressionWrapper
 from django.conf import settings # To get AUTH_USER_MODEL if needed, though not directly for Category
 from django.utils import timezone # For default dates if needed, though auto_now_add handles it
 from django.urls import reverse 
+from . import thumbnails # Resized image copies for lists/detail pages
+from .storage import blob_storage # Content-addressed, deduplicated image files
 # from django.contrib.gis.db import models as gis_models # Not needed if skipping GeoDjango
 
 # Create your models here.
@@ -23,6 +28,53 @@ class IssueCategory(models.Model):
     
 
 
+# --- Spatial grid index for Issue coordinates ---
+# Each issue stores the integer grid cell its coordinates fall in
+# (GEO_CELL_SCALE cells per degree, i.e. ~1.1 km at 100). A composite index on
+# (geo_cell_lat, geo_cell_lon) lets bbox/radius queries jump straight to the
+# candidate cells instead of scanning every issue.
+GEO_CELL_SCALE = 100
+METERS_PER_DEGREE = 111320.0
+
+
+def geo_cell(value):
+    """Grid cell number for a latitude or longitude value."""
+    return math.floor(float(value) * GEO_CELL_SCALE)
+
+
+class IssueQuerySet(models.QuerySet):
+
+    def within_bbox(self, west, south, east, north):
+        """Issues inside a bounding box (GeoJSON order: west, south, east, north)."""
+        return self.filter(
+            # Index range scan on the grid cells first...
+            geo_cell_lat__gte=geo_cell(south), geo_cell_lat__lte=geo_cell(north),
+            geo_cell_lon__gte=geo_cell(west), geo_cell_lon__lte=geo_cell(east),
+            # ...then the exact bounds on the few rows left
+            latitude__gte=south, latitude__lte=north,
+            longitude__gte=west, longitude__lte=east,
+        )
+
+    def within_radius(self, latitude, longitude, meters):
+        """
+        Issues within `meters` of a point, annotated with `distance_sq`
+        (squared distance in metres, handy for order_by('distance_sq')).
+        Uses an equirectangular approximation, which is accurate to well under
+        1% at city scale and needs only arithmetic, so it runs inside the database.
+        """
+        latitude, longitude, meters = float(latitude), float(longitude), float(meters)
+        cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+        lat_delta = meters / METERS_PER_DEGREE
+        lon_delta = meters / (METERS_PER_DEGREE * cos_lat)
+        dy = (F('latitude') - Value(latitude)) * Value(METERS_PER_DEGREE)
+        dx = (F('longitude') - Value(longitude)) * Value(METERS_PER_DEGREE * cos_lat)
+        return self.within_bbox(
+            longitude - lon_delta, latitude - lat_delta, longitude + lon_delta, latitude + lat_delta
+        ).annotate(
+            distance_sq=ExpressionWrapper(dx * dx + dy * dy, output_field=models.FloatField())
+        ).filter(distance_sq__lte=meters * meters)
+
+
 #actual civic issues reported by users.
 class Issue(models.Model):
     STATUS_CHOICES = [
@@ -47,6 +99,8 @@ class Issue(models.Model):
         ('Medium', 'Medium Priority'),
         ('High', 'High Priority'),
     ]
+    # Stored as priority_rank so ordering by priority is numeric and indexable
+    PRIORITY_RANKS = {'Low': 1, 'Medium': 2, 'High': 3}
 
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -81,6 +135,8 @@ class Issue(models.Model):
         default='Medium',
         help_text="Priority level of the issue (Low, Medium, High)"
     )
+    # Kept in sync with `priority` by save(); higher is more urgent
+    priority_rank = models.PositiveSmallIntegerField(default=2, editable=False)
     resolution_notes = models.TextField(
         blank=True,
         null=True,
@@ -88,6 +144,7 @@ class Issue(models.Model):
     )
     resolution_image = models.ImageField(
         upload_to='resolution_images/', # Store resolution images in a separate folder
+        storage=blob_storage, # Stored once per unique content (issues/storage.py)
         null=True,
         blank=True,
         help_text="Optional image uploaded by the manager showing the resolved issue or work done"
@@ -107,14 +164,155 @@ class Issue(models.Model):
         help_text="Automatically determined municipal area/ward/suburb from location"
     )
 
+    # Spatial grid cells, kept in sync with latitude/longitude by save()
+    geo_cell_lat = models.IntegerField(null=True, blank=True, editable=False)
+    geo_cell_lon = models.IntegerField(null=True, blank=True, editable=False)
+
+    objects = IssueQuerySet.as_manager()
+
     class Meta:
-        ordering = ['-priority', '-reported_date'] # Order by priority, then by newest first
+        ordering = ['-priority_rank', '-reported_date'] # Order by priority (High first), then by newest first
+        # One index per hot access path. Each ends with the sort column(s) and id, so the
+        # database reads rows already in order, scanning backwards for descending sorts
+        indexes = [
+            models.Index(fields=['geo_cell_lat', 'geo_cell_lon'], name='issue_geo_cell_idx'),
+            models.Index(fields=['priority_rank', 'reported_date'], name='issue_priority_idx'),  # Default ordering
+            # Issue list: unfiltered / by status / by category, newest or oldest first; report and export date ranges
+            models.Index(fields=['reported_date', 'id'], name='issue_reported_idx'),
+            models.Index(fields=['status', 'reported_date', 'id'], name='issue_status_reported_idx'),
+            models.Index(fields=['category', 'reported_date', 'id'], name='issue_category_reported_idx'),
+            models.Index(fields=['upvotes_count', 'reported_date', 'id'], name='issue_upvotes_idx'),
+            # Manager queue: one manager's issues, most urgent then oldest first
+            models.Index(fields=['assigned_to_manager', '-priority_rank', 'reported_date', 'id'], name='issue_manager_queue_idx'),
+            # "My reported issues"
+            models.Index(fields=['user', 'reported_date'], name='issue_reporter_idx'),
+            # Covers the GROUP BY of the dashboard counter rebuild (stats.recompute)
+            models.Index(fields=['status', 'priority', 'assigned_to_manager'], name='issue_stats_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} (Status: {self.get_status_display()})"
     
     def get_absolute_url(self):
         return reverse('issues:issue_detail', kwargs={'pk': self.pk})
+
+    @property
+    def resolution_thumbnail_url(self):
+        return thumbnails.derivative_url(self.resolution_image, 'thumb')
+
+    @property
+    def resolution_medium_url(self):
+        return thumbnails.derivative_url(self.resolution_image, 'medium')
+
+    def update_priority_rank(self):
+        self.priority_rank = self.PRIORITY_RANKS.get(self.priority, 0)
+
+    def update_geo_cells(self):
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell_lat = geo_cell(self.latitude)
+            self.geo_cell_lon = geo_cell(self.longitude)
+        else:
+            self.geo_cell_lat = self.geo_cell_lon = None
+
+    # --- Change tracking ---
+    # A snapshot of these fields is taken when the issue is loaded from the
+    # database, so save() can tell what changed without re-reading the row.
+    # post_save receivers read the result from `saved_changes` (see
+    # dispatch_issue_changes in signals.py).
+    TRACKED_FIELDS = (
+        'title', 'description', 'category_id', 'status', 'priority', 'assigned_to_manager_id',
+        'municipal_area', 'latitude', 'longitude', 'resolution_notes', 'resolution_image',
+        'reported_date',
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        # Also runs when a deferred field is loaded on first access
+        if fields is None:
+            self._snapshot_tracked_fields()
+        else:
+            fields = set(fields)
+            self._snapshot_tracked_fields([
+                name for name in self.TRACKED_FIELDS if name in fields or name.removesuffix('_id') in fields
+            ])
+
+    def _snapshot_tracked_fields(self, names=None):
+        if names is None or not hasattr(self, '_original_values'):
+            self._original_values = {}
+        for name in names if names is not None else self.TRACKED_FIELDS:
+            if name in self.__dict__:
+                self._original_values[name] = self._tracked_value(name)
+
+    def _tracked_value(self, name):
+        value = self.__dict__.get(name)
+        if name == 'resolution_image':
+            return getattr(value, 'name', value) or None  # FieldFile -> stored file name
+        return value
+
+    def get_changed_fields(self, fields=None):
+        """
+        {field: (old, new)} for tracked fields that differ from the loaded
+        snapshot. A new, unsaved issue reports every tracked field (old=None).
+        `fields` limits the check, e.g. to the update_fields of a save().
+        """
+        names = [
+            name for name in self.TRACKED_FIELDS
+            # Deferred and never loaded/assigned means save() does not write it either
+            if name in self.__dict__ and (fields is None or name in fields or name.removesuffix('_id') in fields)
+        ]
+        original = {} if self._state.adding else getattr(self, '_original_values', {})
+        unknown = [name for name in names if name not in original]
+        if unknown and not self._state.adding and self.pk is not None:
+            # Assigned without having been loaded (deferred field): one query for the old values
+            row = type(self)._base_manager.filter(pk=self.pk).values(*unknown).first() or {}
+            if 'resolution_image' in row:
+                row['resolution_image'] = row['resolution_image'] or None
+            original = {**original, **row}
+        changes = {}
+        for name in names:
+            new = self._tracked_value(name)
+            old = original.get(name)
+            if name not in original or old != new:
+                changes[name] = (old, new)
+        return changes
+
+    def _fields_to_write(self, update_fields):
+        """
+        The attnames save() will write, or None for every field. Like Django,
+        an instance loaded with only()/defer() writes just its loaded fields.
+        """
+        if update_fields is not None:
+            # Names or attnames ('category' / 'category_id'); unknown names are left for Django to reject
+            attnames = {field.name: field.attname for field in self._meta.concrete_fields}
+            return {attnames.get(name, name) for name in update_fields}
+        deferred = self.get_deferred_fields()
+        if not deferred or self._state.adding:
+            return None
+        return {field.attname for field in self._meta.concrete_fields if not field.primary_key} - deferred
+
+    def save(self, *args, **kwargs):
+        # Derived fields are only recomputed when their source fields are written,
+        # so a narrow save on a partially loaded issue doesn't load deferred fields
+        fields = self._fields_to_write(kwargs.get('update_fields'))
+        if fields is None or {'latitude', 'longitude'} & fields:
+            self.update_geo_cells()
+            if fields is not None:
+                fields |= {'geo_cell_lat', 'geo_cell_lon'}
+        if fields is None or 'priority' in fields:
+            self.update_priority_rank()
+            if fields is not None:
+                fields.add('priority_rank')
+        update_fields = kwargs['update_fields'] = fields
+        self.saved_changes = self.get_changed_fields(update_fields)
+        super().save(*args, **kwargs)
+        # Only what was written becomes the new baseline
+        self._snapshot_tracked_fields(None if update_fields is None else list(self.saved_changes))
     
     def is_upvoted_by_user(self, user):
         if user.is_authenticated:
@@ -184,9 +382,250 @@ class IssueImage(models.Model):
     )
     image = models.ImageField(
         upload_to='issue_images/', # We can keep using the same directory
+        storage=blob_storage, # Stored once per unique content (issues/storage.py)
         help_text="One of the images for the issue."
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Image for Issue PK {self.issue.pk} uploaded at {self.uploaded_at.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"Image for Issue PK {self.issue.pk} uploaded at {self.uploaded_at.strftime('%Y-%m-%d')}"
+
+    @property
+    def thumbnail_url(self):
+        """Cropped thumbnail for cards and the admin (see issues/thumbnails.py)."""
+        return thumbnails.derivative_url(self.image, 'thumb')
+
+    @property
+    def medium_url(self):
+        """Mid-size copy for the issue detail page."""
+        return thumbnails.derivative_url(self.image, 'medium')
+
+
+# --- Near-duplicate detection (see issues/duplicates.py) ---
+class IssueTextSignature(models.Model):
+    """MinHash signature of an issue's title + description."""
+    issue = models.OneToOneField(
+        'Issue',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='text_signature'
+    )
+    fingerprint = models.CharField(max_length=32, help_text="Hash of the text the signature was built from.")
+    minhash = models.JSONField(default=list)
+
+    def __str__(self):
+        return f"Text signature for Issue PK {self.issue_id}"
+
+
+class IssueSignatureBand(models.Model):
+    """One LSH band of an issue's signature. Issues sharing a band_key are duplicate candidates."""
+    issue = models.ForeignKey(
+        'Issue',
+        on_delete=models.CASCADE,
+        related_name='signature_bands'
+    )
+    band_key = models.CharField(max_length=24, db_index=True)
+
+    def __str__(self):
+        return f"{self.band_key} (Issue PK {self.issue_id})"
+
+
+
+# --- Reverse geocoding cache (see issues/geocoding.py) ---
+class ReverseGeocodeCache(models.Model):
+    """Nominatim answers keyed by rounded coordinates. area_name is NULL when Nominatim had no area."""
+    lat_key = models.IntegerField()
+    lon_key = models.IntegerField()
+    area_name = models.CharField(max_length=255, null=True, blank=True)
+    fetched_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('lat_key', 'lon_key')
+        verbose_name = "Reverse Geocode Cache Entry"
+        verbose_name_plural = "Reverse Geocode Cache"
+
+    def __str__(self):
+        return f"({self.lat_key}, {self.lon_key}) -> {self.area_name or 'no area'}"
+
+
+
+# --- Nominatim fallback state shared by the web and worker processes (see issues/geocoding.py) ---
+class GeocoderCounter(models.Model):
+    """One lookup counter of the Nominatim fallback, e.g. 'api_calls'."""
+    key = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Geocoder Counter"
+        verbose_name_plural = "Geocoder Counters"
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class CircuitBreakerState(models.Model):
+    """The state of one geocoding.CircuitBreaker, so every process trips and resets the same breaker."""
+    name = models.CharField(max_length=50, unique=True)
+    state = models.CharField(max_length=10, default='closed')
+    consecutive_failures = models.IntegerField(default=0)
+    opened_at = models.FloatField(null=True, blank=True, help_text="time.time() when it opened, or the trial call started")
+
+    class Meta:
+        verbose_name = "Circuit Breaker State"
+        verbose_name_plural = "Circuit Breaker States"
+
+    def __str__(self):
+        return f"{self.name}: {self.state}"
+
+
+# --- Materialized dashboard counters (see issues/stats.py) ---
+class IssueStat(models.Model):
+    """
+    One named counter for the admin dashboard, e.g. 'total', 'open' or
+    'status:Resolved'. Kept up to date incrementally on issue changes.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Issue Statistic"
+        verbose_name_plural = "Issue Statistics"
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+
+# --- Daily time-series rollup (see issues/rollup.py) ---
+class IssueDailyStats(models.Model):
+    """
+    Per-day issue movements for one (category, municipal_area, status) bucket.
+    The backlog in a status on a given day is the running total of
+    new + entered - exited + adjusted up to that day.
+    """
+    date = models.DateField()
+    # Like its issues, a deleted category's history moves to the uncategorized rows (rollup.category_deleted)
+    category = models.ForeignKey(IssueCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_stats')
+    municipal_area = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(max_length=50, choices=Issue.STATUS_CHOICES)
+    new_count = models.IntegerField(default=0, help_text="Issues reported this day (in their initial status)")
+    entered_count = models.IntegerField(default=0, help_text="Issues moved into this status this day")
+    exited_count = models.IntegerField(default=0, help_text="Issues moved out of this status this day")
+    adjusted_count = models.IntegerField(default=0, help_text="Net issues moved in by category/area edits or deletions")
+
+    class Meta:
+        verbose_name = "Issue Daily Statistics"
+        verbose_name_plural = "Issue Daily Statistics"
+        indexes = [
+            models.Index(fields=['date', 'status'], name='issue_daily_date_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'category', 'municipal_area', 'status'], name='issue_daily_bucket_unique'
+            ),
+            # NULLs never conflict above, so the uncategorized rows need their own constraint
+            models.UniqueConstraint(
+                fields=['date', 'municipal_area', 'status'], condition=models.Q(category__isnull=True),
+                name='issue_daily_bucket_unique_uncategorized',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status} ({self.category_id or '-'}, {self.municipal_area or '-'})"
+
+
+# --- Map clusters (see issues/clustering.py) ---
+class IssueMapCell(models.Model):
+    """
+    How many issues of one (category, status) lie in one spatial grid cell,
+    with the sums needed to place their cluster marker. The map clusters
+    from these rows instead of reading every issue in the viewport.
+    """
+    geo_cell_lat = models.IntegerField()
+    geo_cell_lon = models.IntegerField()
+    # Deleting a category folds its rows into the uncategorized ones first (clustering.category_deleted)
+    category = models.ForeignKey(IssueCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='map_cells')
+    status = models.CharField(max_length=50, choices=Issue.STATUS_CHOICES)
+    issue_count = models.IntegerField(default=0)
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+    # Sum of the issue pks: while issue_count is 1 this is the lone issue's pk
+    issue_pk_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Issue Map Cell"
+        verbose_name_plural = "Issue Map Cells"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['geo_cell_lat', 'geo_cell_lon', 'category', 'status'], name='issue_map_cell_unique'
+            ),
+            # NULLs never conflict above, so the uncategorized rows need their own constraint
+            models.UniqueConstraint(
+                fields=['geo_cell_lat', 'geo_cell_lon', 'status'], condition=models.Q(category__isnull=True),
+                name='issue_map_cell_unique_uncategorized',
+            ),
+        ]
+
+    def __str__(self):
+        return f"({self.geo_cell_lat}, {self.geo_cell_lon}) {self.status}: {self.issue_count}"
+
+
+# --- Asynchronous PDF reports (see issues/reports.py) ---
+class ReportJob(models.Model):
+    """
+    A request for a PDF issue report, rendered by the task worker. Finished
+    jobs double as the artifact cache: a new request with the same cache_key
+    (date range + status filter + data version) reuses the stored PDF.
+    """
+    STATE_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Rendering'),
+        ('done', 'Ready'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),   # Artifact evicted from the cache
+    ]
+
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='report_jobs')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    status_filter = models.CharField(max_length=50, blank=True)
+    data_version = models.CharField(max_length=64)
+    cache_key = models.CharField(max_length=64, db_index=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='queued')
+    file = models.FileField(upload_to='reports/', blank=True)
+    file_size = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_accessed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['state', 'last_accessed_at'], name='report_job_state_access_idx'),
+        ]
+
+    def __str__(self):
+        return f"Report {self.start_date} to {self.end_date} ({self.get_state_display()})"
+
+    def get_absolute_url(self):
+        return reverse('issues:report_job_detail', kwargs={'pk': self.pk})
+
+    @property
+    def download_filename(self):
+        return f"CommunityWatch_Report_{self.start_date}_to_{self.end_date}.pdf"
+
+
+# --- Content-addressed image files (see issues/storage.py, issues/blobs.py) ---
+class MediaBlob(models.Model):
+    """How many IssueImage/Issue rows point at one stored image file."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    # Last time the storage handed this blob out for a new upload (issues/blobs.py reserve())
+    reserved_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
@@ -0,0 +1,73 @@
+# issues/page_cache.py
+"""
+Versioned fragment caching for the issue detail page.
+
+Everything the page shows about an issue (description and facts, image
+carousel, map, resolution details, comment thread) is the same for every
+viewer, so the template keeps it in `{% cache %}` fragments keyed by
+
+    issue_detail_<part> <issue pk> <issue version>
+
+and only the per-viewer parts (upvote button, comment/manager forms) are
+rendered on every request. The version is a token stored in the cache under
+`issue_version:<pk>`. Invalidating an issue deletes that key; the next reader
+mints a new token, so the old fragments are simply never looked up again and
+expire after ISSUE_DETAIL_CACHE_TIMEOUT. Tokens are time based, so a version
+key that was evicted never comes back with a value old fragments used.
+
+Fragments and version keys live in the ISSUE_DETAIL_CACHE_ALIAS cache
+(settings.CACHES). With the default locmem backend every server process has
+its own copy, and an invalidation only reaches the process that made the
+change; use a shared backend (Redis) as soon as there is more than one.
+
+signals.py invalidates on Issue, Comment, IssueImage and Upvote writes (after
+the transaction commits, so a reader can't cache uncommitted-away data under
+the new version); bulk updates (issues/bulk.py) call invalidate_issues().
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _version_key(issue_pk):
+    return f'issue_version:{issue_pk}'
+
+
+def cache_alias():
+    """The CACHES alias for the fragments; the template passes it to {% cache ... using=... %}."""
+    return getattr(settings, 'ISSUE_DETAIL_CACHE_ALIAS', 'default')
+
+
+def _cache():
+    return caches[cache_alias()]
+
+
+def fragment_timeout():
+    return getattr(settings, 'ISSUE_DETAIL_CACHE_TIMEOUT', 600)
+
+
+def issue_version(issue_pk):
+    """
+    Current version token for the issue's cached fragments. Read it *before*
+    loading the issue, so a change committed in between can only ever land
+    under an already-abandoned version.
+    """
+    cache = _cache()
+    key = _version_key(issue_pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)  # Whoever added first wins
+    return version
+
+
+def invalidate_issues(issue_pks):
+    pks = list(issue_pks)
+    if pks:
+        transaction.on_commit(lambda: _cache().delete_many([_version_key(pk) for pk in pks]))
+
+
+def invalidate_issue(issue_pk):
+    invalidate_issues([issue_pk])
@@ -0,0 +1,164 @@
+# issues/pagination.py
+"""
+Keyset (cursor) pagination for issue lists.
+
+Django's Paginator needs a COUNT(*) and an OFFSET scan for every page, which
+gets slower the deeper a visitor (or crawler) goes. KeysetPaginator instead
+remembers the sort key of the last row it showed and asks the database for the
+rows that come after it, so page 5,000 costs the same as page 1.
+
+The queryset must be ordered and its ordering must end with the primary key
+(e.g. ['-reported_date', '-pk']) so every row has a unique position.
+Cursors are opaque url-safe tokens; a tampered or stale token raises
+InvalidCursor (a subclass of Django's InvalidPage, so ListView turns it into a 404).
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import InvalidPage
+from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class KeysetPage:
+    """One page of results, with cursors for its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, approximate_total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_total = approximate_total
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+
+    def __init__(self, queryset, per_page, with_total=False):
+        ordering = list(queryset.query.order_by)
+        if not ordering or ordering[-1].lstrip('-') not in ('pk', 'id'):
+            raise ValueError("KeysetPaginator needs a queryset ordered with a trailing pk tiebreaker.")
+        self.queryset = queryset
+        self.per_page = per_page
+        self.with_total = with_total
+        # [(field_name, descending), ...]
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+    # --- Cursor encoding ---
+
+    def _encode(self, obj, direction):
+        values = []
+        for name, _ in self.keys:
+            value = getattr(obj, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        payload = json.dumps({'d': direction, 'k': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, values = payload['d'], payload['k']
+        except (ValueError, KeyError, TypeError):
+            raise InvalidCursor("Invalid cursor.")
+        if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != len(self.keys):
+            raise InvalidCursor("Cursor does not match the current ordering.")
+        return direction, [self._to_python(name, value) for (name, _), value in zip(self.keys, values)]
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.pk if name == 'pk' else self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value  # An annotation such as search_rank; JSON already has the right type
+        if value is None:
+            return None
+        if isinstance(field, models.DateTimeField):
+            parsed = parse_datetime(value)
+        elif isinstance(field, models.DateField):
+            parsed = parse_date(value)
+        elif isinstance(field, (models.IntegerField, models.AutoField)):
+            parsed = value if isinstance(value, int) else None
+        else:
+            parsed = value
+        if parsed is None:
+            raise InvalidCursor("Invalid cursor value.")
+        return parsed
+
+    # --- Queries ---
+
+    def _after(self, values, forward):
+        """Rows strictly after `values` in the (forward or reversed) ordering."""
+        condition = Q()
+        for index, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for prev_index in range(index):
+                step &= Q(**{self.keys[prev_index][0]: values[prev_index]})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return [name if descending else f'-{name}' for name, descending in self.keys]
+
+    def approximate_total(self):
+        """
+        Row count for the whole result set, cached per filter combination so it
+        is computed at most once per ISSUE_LIST_APPROXIMATE_TOTAL_TTL seconds.
+        """
+        sql, params = self.queryset.query.sql_with_params()
+        key = 'keyset_total:' + hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+        total = cache.get(key)
+        if total is None:
+            total = self.queryset.order_by().count()
+            cache.set(key, total, getattr(settings, 'ISSUE_LIST_APPROXIMATE_TOTAL_TTL', 300))
+        return total
+
+    def page(self, cursor=None):
+        per_page = self.per_page
+        if cursor:
+            direction, values = self._decode(cursor)
+        else:
+            direction, values = 'n', None
+
+        if direction == 'n':
+            queryset = self.queryset
+            if values is not None:
+                queryset = queryset.filter(self._after(values, forward=True))
+            rows = list(queryset[:per_page + 1])
+            has_more, rows = len(rows) > per_page, rows[:per_page]
+            has_next, has_previous = has_more, values is not None
+        else:
+            queryset = self.queryset.filter(self._after(values, forward=False)).order_by(*self._reversed_ordering())
+            rows = list(queryset[:per_page + 1])
+            has_more, rows = len(rows) > per_page, rows[:per_page]
+            rows.reverse()
+            has_next, has_previous = True, has_more
+
+        next_cursor = self._encode(rows[-1], 'n') if rows and has_next else None
+        previous_cursor = self._encode(rows[0], 'p') if rows and has_previous else None
+        total = self.approximate_total() if self.with_total else None
+        return KeysetPage(rows, next_cursor, previous_cursor, total)
@@ -0,0 +1,272 @@
+# issues/pdfmerge.py
+"""
+Merge PDFs rendered separately (one per report chunk) into one document.
+
+pydyf only writes PDFs, so this module carries a small reader for the files
+WeasyPrint produces with `write_pdf(uncompressed_pdf=True)`: a classic xref
+table and plain `N 0 obj ... endobj` objects, no object streams. It is not a
+general PDF parser; feed it only WeasyPrint/pydyf output.
+
+    merger = PdfMerger()
+    for pdf_bytes in chunks:
+        merger.append(pdf_bytes)
+    merger.number_pages('Page {page} of {pages}')
+    merger.write(output)
+
+Each appended page is copied with everything it references (content streams,
+fonts, images); the chunk's own page tree, outlines and metadata are dropped.
+"""
+import re
+
+import pydyf
+
+_WHITESPACE = b' \t\r\n\f\x00'
+_DELIMITERS = b'()<>[]{}/%'
+_NUMBER = re.compile(rb'[+-]?(\d+\.?\d*|\.\d+)')
+_OBJECT_HEADER = re.compile(rb'(\d+)\s+(\d+)\s+obj')
+_REFERENCE_TAIL = re.compile(rb'\s+\d+\s+R(?![^\s/\[\]<>()])')
+
+
+class PdfMergeError(Exception):
+    pass
+
+
+class _Reference:
+    def __init__(self, number):
+        self.number = number
+
+
+class _Indirect(bytes):
+    """'N 0 R' in the merged PDF, remembering which object it points to."""
+    def __new__(cls, target):
+        instance = super().__new__(cls, target.reference)
+        instance.target = target
+        return instance
+
+
+def _resolve(value):
+    return value.target if isinstance(value, _Indirect) else value
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        start = data.rfind(b'startxref')
+        if start < 0:
+            raise PdfMergeError("No startxref found; is this an uncompressed PDF?")
+        xref_position = int(data[start + len(b'startxref'):].split()[0])
+        if not data.startswith(b'xref', xref_position):
+            raise PdfMergeError("Cross-reference streams are not supported; render with uncompressed_pdf=True.")
+        self.offsets = {}
+        lines = iter(data[xref_position:].split(b'\n')[1:])
+        for line in lines:
+            fields = line.split()
+            if fields == [b'trailer']:
+                break
+            first, count = int(fields[0]), int(fields[1])
+            for number in range(first, first + count):
+                offset, _generation, kind = next(lines).split()[:3]
+                if kind == b'n':
+                    self.offsets[number] = int(offset)
+        trailer_position = data.index(b'trailer', xref_position) + len(b'trailer')
+        self.trailer, _ = self._parse(trailer_position)
+
+    # --- Tokenizer / parser ---
+    def _skip_space(self, position):
+        data = self.data
+        while position < len(data):
+            if data[position] in _WHITESPACE:
+                position += 1
+            elif data[position] == ord('%'):
+                while position < len(data) and data[position] not in b'\r\n':
+                    position += 1
+            else:
+                break
+        return position
+
+    def _parse(self, position):
+        """Parse one PDF value at `position`. Returns (value, end position)."""
+        data = self.data
+        position = self._skip_space(position)
+        if data.startswith(b'<<', position):
+            result = pydyf.Dictionary()
+            position += 2
+            while True:
+                position = self._skip_space(position)
+                if data.startswith(b'>>', position):
+                    return result, position + 2
+                key, position = self._parse(position)
+                value, position = self._parse(position)
+                result[key[1:]] = value
+        if data[position] == ord('['):
+            result = pydyf.Array()
+            position += 1
+            while True:
+                position = self._skip_space(position)
+                if data[position] == ord(']'):
+                    return result, position + 1
+                value, position = self._parse(position)
+                result.append(value)
+        if data[position] == ord('/'):
+            end = position + 1
+            while end < len(data) and data[end] not in _WHITESPACE and data[end] not in _DELIMITERS:
+                end += 1
+            return data[position:end].decode('latin-1'), end
+        if data[position] == ord('('):
+            depth, end = 0, position
+            while True:
+                char = data[end]
+                if char == ord('\\'):
+                    end += 2
+                    continue
+                if char == ord('('):
+                    depth += 1
+                elif char == ord(')'):
+                    depth -= 1
+                    if depth == 0:
+                        return data[position:end + 1], end + 1
+                end += 1
+        if data[position] == ord('<'):
+            end = data.index(b'>', position)
+            return data[position:end + 1], end + 1
+        number = _NUMBER.match(data, position)
+        if number:
+            token = number.group()
+            if b'.' in token:
+                return float(token), number.end()
+            # An integer may start an indirect reference: 'N G R'
+            reference = _REFERENCE_TAIL.match(data, number.end())
+            if reference:
+                return _Reference(int(token)), reference.end()
+            return int(token), number.end()
+        end = position
+        while end < len(data) and data[end] not in _WHITESPACE and data[end] not in _DELIMITERS:
+            end += 1
+        if end == position:
+            raise PdfMergeError(f"Unexpected {data[position:position + 1]!r} at byte {position}.")
+        return data[position:end], end  # true / false / null
+
+    def read_object(self, number):
+        """Returns (value, raw stream bytes or None)."""
+        header = _OBJECT_HEADER.match(self.data, self.offsets[number])
+        if header is None or int(header.group(1)) != number:
+            raise PdfMergeError(f"Object {number} is not where the xref table says it is.")
+        value, position = self._parse(header.end())
+        position = self._skip_space(position)
+        if not self.data.startswith(b'stream', position):
+            return value, None
+        position += len(b'stream')
+        position += 2 if self.data.startswith(b'\r\n', position) else 1
+        length = value['Length']
+        if isinstance(length, _Reference):
+            length = self.read_object(length.number)[0]
+        return value, self.data[position:position + length]
+
+    def page_numbers(self):
+        catalog = self.read_object(self.trailer['Root'].number)[0]
+        numbers = []
+
+        def walk(reference):
+            node = self.read_object(reference.number)[0]
+            if node.get('Type') == '/Pages':
+                for kid in node['Kids']:
+                    walk(kid)
+            else:
+                numbers.append(reference.number)
+        walk(catalog['Pages'])
+        return numbers
+
+
+class PdfMerger:
+    def __init__(self):
+        self.pdf = pydyf.PDF()
+        self.pages = []
+
+    def append(self, data):
+        """Copy every page of the PDF `data` to the end of the merged document."""
+        reader = _Reader(data)
+        copied = {}
+
+        def copy(value):
+            if isinstance(value, _Reference):
+                if value.number not in copied:
+                    copied[value.number] = copy_object(value.number)
+                return copied[value.number]
+            if isinstance(value, pydyf.Dictionary):
+                return pydyf.Dictionary({key: copy(item) for key, item in value.items()})
+            if isinstance(value, pydyf.Array):
+                return pydyf.Array([copy(item) for item in value])
+            return value
+
+        def copy_object(number):
+            value, stream = reader.read_object(number)
+            if stream is not None:
+                extra = {key: item for key, item in value.items() if key != 'Length'}
+                target = pydyf.Stream([stream], compress='Filter' not in extra)
+            elif isinstance(value, (pydyf.Dictionary, pydyf.Array)):
+                target = type(value)()
+            else:
+                return value  # Indirect number/string: inline it
+            self.pdf.add_object(target)
+            # Register before copying the children so reference cycles terminate
+            copied[number] = _Indirect(target)
+            if stream is not None:
+                target.extra = pydyf.Dictionary({key: copy(item) for key, item in extra.items()})
+            elif isinstance(target, pydyf.Dictionary):
+                target.update({key: copy(item) for key, item in value.items()})
+            else:
+                target.extend(copy(item) for item in value)
+            return copied[number]
+
+        for number in reader.page_numbers():
+            source = reader.read_object(number)[0]
+            page = pydyf.Dictionary({'Type': '/Page', 'Parent': self.pdf.pages.reference})
+            self.pdf.add_page(page)
+            copied[number] = _Indirect(page)
+            page.update({key: copy(item) for key, item in source.items() if key not in ('Type', 'Parent')})
+            self.pages.append(page)
+        return len(self.pages)
+
+    def number_pages(self, label='Page {page} of {pages}', font_size=8, margin=20):
+        """Stamp `label` at the bottom centre of every page, numbering across all appended PDFs."""
+        font = pydyf.Dictionary({
+            'Type': '/Font', 'Subtype': '/Type1', 'BaseFont': '/Helvetica', 'Encoding': '/WinAnsiEncoding',
+        })
+        self.pdf.add_object(font)
+        # Wrap the existing content in q/Q so its graphics state can't move our text
+        save_state = pydyf.Stream([b'q'])
+        self.pdf.add_object(save_state)
+
+        for index, page in enumerate(self.pages, start=1):
+            resources = _resolve(page.get('Resources'))
+            if resources is None:
+                resources = page['Resources'] = pydyf.Dictionary()
+            fonts = _resolve(resources.get('Font'))
+            if fonts is None:
+                fonts = resources['Font'] = pydyf.Dictionary()
+            fonts['CWPageNumber'] = font.reference
+
+            text = label.format(page=index, pages=len(self.pages))
+            left, bottom, right, _top = (float(v) for v in _resolve(page['MediaBox']))
+            x = (left + right) / 2 - len(text) * font_size * 0.25  # Helvetica is roughly 0.5em per character
+            stamp = pydyf.Stream(compress=True)
+            stamp.stream.append(b'Q')
+            stamp.begin_text()
+            stamp.set_font_size('CWPageNumber', font_size)
+            stamp.set_text_matrix(1, 0, 0, 1, x, bottom + margin)
+            stamp.show_text_string(text)
+            stamp.end_text()
+            self.pdf.add_object(stamp)
+
+            contents = _resolve(page.get('Contents'))
+            if isinstance(contents, pydyf.Array):
+                contents = list(contents)
+            else:
+                contents = [page['Contents']] if 'Contents' in page else []
+            page['Contents'] = pydyf.Array([save_state.reference, *contents, stamp.reference])
+
+    def write(self, output, title=None, compress=True):
+        """`compress=False` keeps the classic xref table, so the result can be read (and merged) again."""
+        if title:
+            self.pdf.info['Title'] = pydyf.String(title)
+        self.pdf.write(output, version=b'1.7', compress=compress)
@@ -0,0 +1,137 @@
+# issues/report_render.py
+"""
+Chunked, parallel rendering of the PDF issue report.
+
+WeasyPrint lays a document out in one thread and keeps the whole box tree in
+memory, so one big HTML table does not scale. Instead the report's issues are
+split into chunks of REPORT_CHUNK_SIZE rows (keyset bounds on
+(reported_date, pk), so each chunk is an indexed range query), every chunk is
+rendered to its own PDF in a process pool, and the pages are merged with pydyf
+(issues/pdfmerge.py) behind a summary page, then numbered "Page X of Y".
+
+Layout memory per process is bounded by the chunk size; at most two chunks per
+process are in flight at a time.
+
+This module imports no models at load time: the pool uses the 'spawn' start
+method (safe from the task worker's threads), so child processes import it
+before calling django.setup() in _init_worker().
+"""
+import io
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.template.loader import render_to_string
+from weasyprint import HTML
+
+from .pdfmerge import PdfMerger
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def chunk_bounds(issues, chunk_size):
+    """[(first, last), ...] (reported_date, pk) pairs splitting `issues` into chunks."""
+    bounds, first, last, count = [], None, None, 0
+    for key in issues.order_by('reported_date', 'pk').values_list('reported_date', 'pk').iterator(chunk_size=chunk_size):
+        if first is None:
+            first = key
+        last, count = key, count + 1
+        if count == chunk_size:
+            bounds.append((first, last))
+            first, count = None, 0
+    if first is not None:
+        bounds.append((first, last))
+    return bounds
+
+
+def _within(first, last):
+    (first_date, first_pk), (last_date, last_pk) = first, last
+    after_first = Q(reported_date__gt=first_date) | Q(reported_date=first_date, pk__gte=first_pk)
+    before_last = Q(reported_date__lt=last_date) | Q(reported_date=last_date, pk__lte=last_pk)
+    return after_first & before_last
+
+
+def render_chunk(start_date, end_date, status, first, last):
+    """Render the issues between the keyset bounds `first` and `last` (inclusive) to PDF bytes."""
+    from .reports import build_report_context
+
+    context = build_report_context(start_date, end_date, status)
+    context['issues'] = context['issues'].filter(_within(first, last)).order_by('reported_date', 'pk')
+    html_string = render_to_string('reports/issue_report_pdf.html', context)
+    return HTML(string=html_string).write_pdf(uncompressed_pdf=True)
+
+
+def render_summary(start_date, end_date, status, chunk_count):
+    from .models import Issue
+    from .reports import build_report_context
+
+    context = build_report_context(start_date, end_date, status)
+    issues = context['issues'].order_by()
+    status_names = dict(Issue.STATUS_CHOICES)
+    context.update({
+        'total': issues.count(),
+        'unassigned': issues.filter(assigned_to_manager__isnull=True).count(),
+        'by_status': [
+            (status_names.get(row['status'], row['status']), row['n'])
+            for row in issues.values('status').annotate(n=Count('pk')).order_by('-n')
+        ],
+        'by_category': [
+            (row['category__name'] or 'N/A', row['n'])
+            for row in issues.values('category__name').annotate(n=Count('pk')).order_by('-n')
+        ],
+        'by_priority': list(issues.values_list('priority').annotate(n=Count('pk')).order_by('-n')),
+        'chunk_count': chunk_count,
+    })
+    html_string = render_to_string('reports/issue_report_summary_pdf.html', context)
+    return HTML(string=html_string).write_pdf(uncompressed_pdf=True)
+
+
+def _render_in_pool(jobs, processes):
+    """Yield render_chunk() results in order, keeping at most 2 chunks per process in flight."""
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    ) as executor:
+        pending = deque()
+        jobs = iter(jobs)
+        for args in jobs:
+            pending.append(executor.submit(render_chunk, *args))
+            if len(pending) >= processes * 2:
+                break
+        while pending:
+            yield pending.popleft().result()
+            for args in jobs:
+                pending.append(executor.submit(render_chunk, *args))
+                break
+
+
+def render_report_pdf(start_date, end_date, status=''):
+    """The complete report (summary page + issue table) as PDF bytes."""
+    from .reports import report_queryset
+
+    chunk_size = getattr(settings, 'REPORT_CHUNK_SIZE', 1000)
+    processes = getattr(settings, 'REPORT_RENDER_PROCESSES', None) or os.cpu_count() or 1
+
+    bounds = chunk_bounds(report_queryset(start_date, end_date, status), chunk_size)
+    jobs = [(start_date, end_date, status, first, last) for first, last in bounds]
+
+    merger = PdfMerger()
+    merger.append(render_summary(start_date, end_date, status, len(jobs)))
+    if len(jobs) > 1 and processes > 1:
+        chunks = _render_in_pool(jobs, min(processes, len(jobs)))
+    else:
+        chunks = (render_chunk(*args) for args in jobs)
+    for pdf in chunks:
+        merger.append(pdf)
+    merger.number_pages('Page {page} of {pages}')
+
+    output = io.BytesIO()
+    merger.write(output, title='CommunityWatch - Civic Issue Report')
+    return output.getvalue()
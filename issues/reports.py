@@ -0,0 +1,126 @@
+# issues/reports.py
+"""
+PDF issue reports, rendered in the background.
+
+Submitting the report form calls submit_report(): it works out the report's
+cache key from the date range, the status filter and a *data version* (count
+and latest updated_at of the matching issues, one aggregate query). If a
+finished report with that key is still stored, it is reused immediately; if
+one is already being rendered the user is sent to that job. Otherwise a
+ReportJob is created and the task worker renders it (issues.tasks.render_report,
+using the chunked renderer in issues/report_render.py).
+
+Stored PDFs are evicted by evict_artifacts() once they are older than
+REPORT_CACHE_MAX_AGE_DAYS or when all reports together exceed
+REPORT_CACHE_MAX_TOTAL_MB (least recently downloaded first).
+"""
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from . import report_render
+from .models import Issue, ReportJob
+
+
+def report_queryset(start_date, end_date, status=''):
+    issues = Issue.objects.filter(reported_date__range=(start_date, end_date))
+    if status:  # If a specific status was chosen
+        issues = issues.filter(status=status)
+    return issues
+
+
+def data_version(start_date, end_date, status=''):
+    """Changes whenever an issue in the report is added, removed or edited."""
+    summary = report_queryset(start_date, end_date, status).aggregate(count=Count('pk'), latest=Max('updated_at'))
+    latest = summary['latest'].isoformat() if summary['latest'] else '-'
+    return f"{summary['count']}:{latest}"
+
+
+def make_cache_key(start_date, end_date, status, version):
+    return hashlib.sha256(f"{start_date}|{end_date}|{status}|{version}".encode()).hexdigest()
+
+
+def submit_report(user, start_date, end_date, status=''):
+    """Return the ReportJob serving this request, creating (and queueing) one if needed."""
+    from .tasks import render_report  # issues.tasks imports this module
+
+    version = data_version(start_date, end_date, status)
+    cache_key = make_cache_key(start_date, end_date, status, version)
+
+    existing = ReportJob.objects.filter(
+        cache_key=cache_key, state__in=['queued', 'running', 'done']
+    ).order_by('-created_at').first()
+    if existing:
+        if existing.state != 'done' or existing.file.storage.exists(existing.file.name):
+            ReportJob.objects.filter(pk=existing.pk).update(last_accessed_at=timezone.now())
+            return existing
+        ReportJob.objects.filter(pk=existing.pk).update(state='expired')  # File vanished from storage
+
+    job = ReportJob.objects.create(
+        requested_by=user,
+        start_date=start_date,
+        end_date=end_date,
+        status_filter=status,
+        data_version=version,
+        cache_key=cache_key,
+    )
+    render_report.delay(job.pk)
+    return job
+
+
+def build_report_context(start_date, end_date, status=''):
+    issues = report_queryset(start_date, end_date, status).select_related(
+        'user', 'category', 'assigned_to_manager'
+    ).order_by('reported_date')
+    return {
+        'issues': issues,
+        'start_date': start_date,
+        'end_date': end_date,
+        'status_filter': dict(Issue.STATUS_CHOICES).get(status, 'All') if status else 'All',
+        'generated_at': datetime.datetime.now(),
+    }
+
+
+def run_job(job):
+    """Render a queued job's PDF into storage. Called by the task worker."""
+    ReportJob.objects.filter(pk=job.pk).update(state='running')
+    try:
+        pdf = report_render.render_report_pdf(job.start_date, job.end_date, job.status_filter)
+    except Exception as e:
+        ReportJob.objects.filter(pk=job.pk).update(state='failed', error=str(e), finished_at=timezone.now())
+        raise
+    job.file.save(f"report_{job.cache_key[:16]}.pdf", ContentFile(pdf), save=False)
+    ReportJob.objects.filter(pk=job.pk).update(
+        state='done', file=job.file.name, file_size=len(pdf), error='', finished_at=timezone.now()
+    )
+    evict_artifacts()
+
+
+def evict_artifacts(max_age_days=None, max_total_mb=None):
+    """Delete stored PDFs that are too old or push the cache over its size limit. Returns how many."""
+    if max_age_days is None:
+        max_age_days = getattr(settings, 'REPORT_CACHE_MAX_AGE_DAYS', 7)
+    if max_total_mb is None:
+        max_total_mb = getattr(settings, 'REPORT_CACHE_MAX_TOTAL_MB', 500)
+
+    stored = ReportJob.objects.filter(state='done')
+    expired = list(stored.filter(finished_at__lt=timezone.now() - datetime.timedelta(days=max_age_days)))
+
+    # Over the size budget: drop the least recently used reports until we fit
+    budget = max_total_mb * 1024 * 1024
+    remaining = stored.exclude(pk__in=[job.pk for job in expired]).order_by('-last_accessed_at')
+    total = 0
+    for job in remaining.only('pk', 'file', 'file_size'):
+        total += job.file_size
+        if total > budget:
+            expired.append(job)
+
+    for job in expired:
+        if job.file:
+            job.file.delete(save=False)
+        ReportJob.objects.filter(pk=job.pk).update(state='expired', file='', file_size=0)
+    return len(expired)
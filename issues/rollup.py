@@ -0,0 +1,206 @@
+# issues/rollup.py
+"""
+Daily time-series rollup for trend charts.
+
+IssueDailyStats holds, per day and per (category, municipal_area, status)
+bucket, how many issues were reported, moved into or out of the status, or
+were moved between buckets by an edit/deletion. The rows are updated
+incrementally from the Issue change dispatcher (signals.py), so a year of
+history is a few hundred/thousand small rows instead of a scan of every issue.
+
+    new per day       = sum(new_count)
+    resolved per day  = sum(entered_count) for status 'Resolved'
+    backlog on day D  = running sum up to D of new + entered - exited + adjusted,
+                        over the open (non-final) statuses
+
+`python manage.py backfill_daily_stats` rebuilds the table from the issues
+themselves. Issues keep no status history, so the backfill assumes every issue
+was reported as 'Reported' and moved to its current status on its updated_at day.
+"""
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Issue, IssueDailyStats
+from .stats import FINAL_STATUSES
+
+TRACKED_FIELDS = ('status', 'category_id', 'municipal_area')
+INITIAL_STATUS = 'Reported'
+
+
+def _local_date(value=None):
+    return timezone.localdate(value or timezone.now())
+
+
+def _bump(date, category_id, municipal_area, status, **deltas):
+    bucket = {
+        'date': date,
+        'category_id': category_id,
+        'municipal_area': municipal_area or '',
+        'status': status,
+    }
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if IssueDailyStats.objects.filter(**bucket).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            IssueDailyStats.objects.create(**bucket, **deltas)
+    except IntegrityError:  # Someone else created the bucket in the meantime
+        IssueDailyStats.objects.filter(**bucket).update(**updates)
+
+
+def _movements(old, new):
+    """
+    [(bucket, field, delta)] that move one issue from bucket `old` to bucket
+    `new`, each a (category_id, municipal_area, status) tuple.
+    """
+    if old == new:
+        return []
+    movements = []
+    if old[:2] != new[:2]:
+        # Category/area edit: move the issue between buckets without counting it as a status change
+        movements += [(old, 'adjusted_count', -1), ((*new[:2], old[2]), 'adjusted_count', 1)]
+    if old[2] != new[2]:
+        movements += [((*new[:2], old[2]), 'exited_count', 1), (new, 'entered_count', 1)]
+    return movements
+
+
+def _bucket(values):
+    return values['category_id'], values['municipal_area'] or '', values['status']
+
+
+def issue_saved(issue, changes, created):
+    if created:
+        _bump(_local_date(issue.reported_date), issue.category_id, issue.municipal_area, issue.status, new_count=1)
+        return
+    current = {name: getattr(issue, name) for name in TRACKED_FIELDS}
+    previous = {name: changes[name][0] if name in changes else value for name, value in current.items()}
+    today = _local_date()
+    with transaction.atomic():
+        for bucket, field, delta in _movements(_bucket(previous), _bucket(current)):
+            _bump(today, *bucket, **{field: delta})
+
+
+def issues_changed(changes):
+    """
+    Apply many issue changes at once, e.g. after a bulk update. `changes` is
+    [(old, new)], each a dict with the TRACKED_FIELDS of one issue.
+    """
+    totals = {}
+    for old, new in changes:
+        for bucket, field, delta in _movements(_bucket(old), _bucket(new)):
+            deltas = totals.setdefault(bucket, {})
+            deltas[field] = deltas.get(field, 0) + delta
+    today = _local_date()
+    with transaction.atomic():
+        for bucket, deltas in totals.items():
+            deltas = {field: delta for field, delta in deltas.items() if delta}
+            if deltas:
+                _bump(today, *bucket, **deltas)
+
+
+def issue_deleted(issue):
+    _bump(_local_date(), issue.category_id, issue.municipal_area, issue.status, adjusted_count=-1)
+
+
+def category_deleted(category_id):
+    """
+    Fold a category's rows into the uncategorized rows of the same day, area
+    and status, before the delete sets its issues' category to NULL.
+    """
+    with transaction.atomic():
+        rows = IssueDailyStats.objects.select_for_update().filter(category_id=category_id)
+        for row in rows:
+            _bump(
+                row.date, None, row.municipal_area, row.status,
+                new_count=row.new_count, entered_count=row.entered_count,
+                exited_count=row.exited_count, adjusted_count=row.adjusted_count,
+            )
+        rows.delete()
+
+
+def backfill():
+    """Rebuild IssueDailyStats from the Issue table. Returns the number of rows written."""
+    rows = {}
+
+    def add(date, category_id, municipal_area, status, field, count):
+        key = (date, category_id, municipal_area or '', status)
+        row = rows.setdefault(key, {'new_count': 0, 'entered_count': 0, 'exited_count': 0})
+        row[field] += count
+
+    issues = Issue.objects.order_by()
+    reported = issues.annotate(day=TruncDate('reported_date')).values('day', 'category_id', 'municipal_area')
+    for row in reported.annotate(n=Count('pk')):
+        add(row['day'], row['category_id'], row['municipal_area'], INITIAL_STATUS, 'new_count', row['n'])
+
+    moved = (
+        issues.exclude(status=INITIAL_STATUS).annotate(day=TruncDate('updated_at'))
+        .values('day', 'category_id', 'municipal_area', 'status')
+    )
+    for row in moved.annotate(n=Count('pk')):
+        add(row['day'], row['category_id'], row['municipal_area'], INITIAL_STATUS, 'exited_count', row['n'])
+        add(row['day'], row['category_id'], row['municipal_area'], row['status'], 'entered_count', row['n'])
+
+    with transaction.atomic():
+        IssueDailyStats.objects.all().delete()
+        IssueDailyStats.objects.bulk_create(
+            (
+                IssueDailyStats(date=date, category_id=category_id, municipal_area=area, status=status, **counts)
+                for (date, category_id, area, status), counts in rows.items()
+            ),
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def daily_series(start, end, category_id=None, municipal_area=None, status=None):
+    """
+    One entry per day from start to end (inclusive):
+    {'date', 'new', 'resolved', 'backlog'}. `status` restricts new/backlog to
+    that status; by default the backlog counts every open (non-final) status.
+    """
+    rows = IssueDailyStats.objects.all()
+    if category_id:
+        rows = rows.filter(category_id=category_id)
+    if municipal_area:
+        rows = rows.filter(municipal_area=municipal_area)
+    backlog_filter = Q(status=status) if status else ~Q(status__in=FINAL_STATUSES)
+    net = F('new_count') + F('entered_count') - F('exited_count') + F('adjusted_count')
+
+    # Backlog carried into the range: one aggregate over the rows before it
+    opening = rows.filter(backlog_filter, date__lt=start).aggregate(total=Sum(net))['total'] or 0
+
+    per_day = rows.filter(date__gte=start, date__lte=end).values('date').annotate(
+        new=Sum('new_count', filter=Q(status=status) if status else Q()),
+        resolved=Sum('entered_count', filter=Q(status='Resolved')),
+        backlog_change=Sum(net, filter=backlog_filter),
+    ).order_by('date')
+    by_date = {row['date']: row for row in per_day}
+
+    series, backlog = [], opening
+    day = start
+    while day <= end:
+        row = by_date.get(day, {})
+        backlog += row.get('backlog_change') or 0
+        series.append({
+            'date': day.isoformat(),
+            'new': row.get('new') or 0,
+            'resolved': row.get('resolved') or 0,
+            'backlog': backlog,
+        })
+        day += datetime.timedelta(days=1)
+    return series
+
+
+def status_breakdown(start, end, category_id=None, municipal_area=None):
+    """Issues entering each status in the range: {status: count}."""
+    rows = IssueDailyStats.objects.filter(date__gte=start, date__lte=end)
+    if category_id:
+        rows = rows.filter(category_id=category_id)
+    if municipal_area:
+        rows = rows.filter(municipal_area=municipal_area)
+    totals = rows.values('status').annotate(total=Sum(F('new_count') + F('entered_count'))).order_by()
+    return {row['status']: row['total'] for row in totals if row['total']}
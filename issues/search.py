@@ -0,0 +1,137 @@
+# issues/search.py
+"""
+Full-text search for issues.
+
+On SQLite we keep an FTS5 shadow table (issues_issue_fts) whose rowid is the
+Issue pk and whose columns are the issue title, description, category name and
+municipal area. The table is created and filled by migration 0008, kept in sync
+by the receivers in issues/signals.py and can be rebuilt at any time with
+`python manage.py rebuild_search_index`.
+
+On any other database backend (or if the table is missing) we fall back to the
+old icontains filter so search keeps working, just slower.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'issues_issue_fts'
+
+# Column weights for bm25(): title matches count the most, then category/area.
+# Order must match the column order of the FTS table.
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 4.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_fts_ready = False
+
+
+def is_available():
+    """True if the FTS5 table exists on the default database."""
+    global _fts_ready
+    if _fts_ready:
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+        _fts_ready = cursor.fetchone() is not None  # Only positive results are cached
+    return _fts_ready
+
+
+def build_match_query(text):
+    """
+    Turn free text typed by a citizen into a safe FTS5 MATCH expression.
+    Every word becomes a quoted prefix term and all terms must match,
+    e.g. 'pot hole kaloor' -> '"pot"* "hole"* "kaloor"*'.
+    Returns None if the text has no searchable words.
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_issues(queryset, text):
+    """
+    Filter an Issue queryset down to the issues matching `text`.
+
+    Returns (queryset, ranked). When ranked is True the queryset carries a
+    `search_rank` annotation (lower is better) that callers can order by.
+    """
+    match = build_match_query(text)
+    if match is None or not is_available():
+        return queryset.filter(Q(title__icontains=text) | Q(description__icontains=text)), False
+
+    issue_table = queryset.model._meta.db_table
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    # Join the FTS table once: SQLite runs the MATCH first and looks the issues up
+    # by pk, and bm25() is read off the same row. (A correlated subquery for the
+    # rank would re-run the MATCH for every matching issue.)
+    queryset = queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f"{FTS_TABLE}.rowid = {issue_table}.id", f"{FTS_TABLE} MATCH %s"],
+        params=[match],
+    ).annotate(
+        search_rank=RawSQL(f"bm25({FTS_TABLE}, {weights})", ())
+    )
+    return queryset, True
+
+
+# --- Index maintenance (called from signals and the management command) ---
+
+_INSERT_FROM_ISSUES_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, title, description, category, municipal_area)
+    SELECT i.id, i.title, i.description, COALESCE(c.name, ''), COALESCE(i.municipal_area, '')
+    FROM issues_issue i
+    LEFT JOIN issues_issuecategory c ON c.id = i.category_id
+"""
+
+
+def index_issue(issue_pk):
+    """(Re)index a single issue from its current database row."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [issue_pk])
+        cursor.execute(_INSERT_FROM_ISSUES_SQL + " WHERE i.id = %s", [issue_pk])
+
+
+def remove_issue(issue_pk):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [issue_pk])
+
+
+def reindex_category(category_pk, clear=False):
+    """
+    Refresh the category column for every issue in a category. Called after a
+    rename, and with clear=True just before the category is deleted.
+    """
+    if not is_available():
+        return
+    if clear:
+        name_sql, params = "''", []
+    else:
+        name_sql = "COALESCE((SELECT name FROM issues_issuecategory WHERE id = %s), '')"
+        params = [category_pk]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {FTS_TABLE} SET category = {name_sql} "
+            f"WHERE rowid IN (SELECT id FROM issues_issue WHERE category_id = %s)",
+            params + [category_pk]
+        )
+
+
+def rebuild_index():
+    """Drop and refill the whole index in one statement. Returns the row count."""
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(_INSERT_FROM_ISSUES_SQL)
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
@@ -1,465 +1,330 @@
 # issues/signals.py
-import requests
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
 from django.conf import settings
 from .models import Issue
 from .models import Comment
+from .models import IssueCategory
+from .models import IssueImage
+from .models import Upvote
+from . import search
+from . import duplicates
+from . import geocoding
+from . import tasks
+from . import stats
+from . import rollup
+from . import clustering
+from . import blobs
+from . import page_cache
+from . import list_cache
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Notifications and the Nominatim lookup run on the task queue (issues/tasks.py,
+# `python manage.py runworker`). The receivers below only decide *whether*
+# something needs doing and enqueue it; the queue stores the task once the
+# surrounding transaction commits.
 
-# Receiver to store the original status before the instance is saved
-@receiver(pre_save, sender=Issue)
-def store_original_issue_status(sender, instance, **kwargs):
+
+# --- Issue change dispatch ---
+# Issue tracks its own field changes (Issue.TRACKED_FIELDS, snapshot taken when
+# it is loaded), so there is no extra SELECT before a save. A single post_save
+# receiver reads the diff once and calls only the handlers whose fields changed.
+# A save that touches nothing tracked (e.g. update_fields=['upvotes_count'])
+# runs no handlers at all.
+
+_issue_change_handlers = []
+
+
+def on_issue_change(*fields, on_create=False):
     """
-    Before saving an issue, if it's an update (not a new creation),
-    store its current status from the database onto the instance
-    as a temporary attribute.
+    Register `handler(issue, changes, created)` to run after an Issue save
+    that changed any of `fields` (attnames, e.g. 'assigned_to_manager_id').
+    With on_create=True it also runs when the issue is first created.
+    `changes` is {field: (old, new)}.
     """
-    if instance.pk:  # Check if this is an existing instance (has a primary key)
-        try:
-            # Fetch the current state from the database
-            original_instance_from_db = sender.objects.get(pk=instance.pk)
-            instance._original_status_from_db = original_instance_from_db.status
-            instance._original_assigned_to_manager_from_db = original_instance_from_db.assigned_to_manager # NEW
-        except sender.DoesNotExist:
-            # Object doesn't exist in DB yet, so it's effectively a new object or edge case
-            instance._original_status_from_db = None
-            instance._original_assigned_to_manager_from_db = None # NEW
-    else:
-        # This is a new instance being created, no original status yet from DB
-        instance._original_status_from_db = None
-        instance._original_assigned_to_manager_from_db = None # NEW
-
+    def decorator(handler):
+        _issue_change_handlers.append((frozenset(fields), on_create, handler))
+        return handler
+    return decorator
 
 
 @receiver(post_save, sender=Issue)
-def issue_status_changed_and_assignment_notifications(sender, instance, created, **kwargs):
+def dispatch_issue_changes(sender, instance, created, raw=False, **kwargs):
+    if raw:  # Loading fixtures
+        return
+    changes = getattr(instance, 'saved_changes', None)
+    if changes is None:  # Saved without going through Issue.save(); assume everything changed
+        changes = {name: (None, getattr(instance, name)) for name in Issue.TRACKED_FIELDS}
+    changed = changes.keys()
+    for fields, on_create, handler in _issue_change_handlers:
+        if (on_create if created else not fields.isdisjoint(changed)):
+            handler(instance, changes, created)
+
+
+@on_issue_change('status')
+def issue_status_changed_notification(issue, changes, created):
+    """Queue an email to the issue reporter when the issue's status changes."""
+    old_status, new_status = changes['status']
+    tasks.send_issue_status_email.delay(issue.pk, old_status, new_status)
+
+
+@on_issue_change('assigned_to_manager_id')
+def issue_assigned_to_manager_notification(issue, changes, created):
     """
-    Handles notifications for:
-    1. Issue status changes (to the reporter).
-    2. Issue assignments to managers (to the manager).
-    3. New issue creation (to admins - if this logic is also here).
-    Separated the assignment logic into its own function above for clarity.
-    This function will now primarily focus on status changes and new issue admin notifications.
+    Queue an email to a Municipal Manager when an issue is newly assigned to them
+    or if the assignment changes to them.
     """
-    original_status = getattr(instance, '_original_status_from_db', None)
-    current_status = instance.status
-
-    # --- Logic for Status Change Notification to Reporter ---
-    if not created and original_status is not None and original_status != current_status:
-        print(f"DEBUG: issue_status_changed_notification: Status has changed from '{original_status}' to '{current_status}' for Issue PK {instance.pk}.")
-        try:
-            user_to_notify = instance.user # The original reporter
-            if not user_to_notify or not user_to_notify.email:
-                print(f"DEBUG: Reporter ({user_to_notify}) or their email is missing. No status change email sent.")
-                return # Exit this part of the function
-
-            subject = f"Update on Your Reported Issue: '{instance.title[:50]}...'"
-
-            status_choices_dict = dict(Issue.STATUS_CHOICES)
-            old_status_display = status_choices_dict.get(original_status, original_status)
-            new_status_display = instance.get_status_display()
-
-            context = {
-                'user_name': user_to_notify.username,
-                'issue_title': instance.title,
-                'issue_pk': instance.pk,
-                'old_status': old_status_display,
-                'new_status': new_status_display,
-                'issue_url': settings.SITE_URL + instance.get_absolute_url() if hasattr(instance, 'get_absolute_url') else f"{settings.SITE_URL}/issues/{instance.pk}/",
-                'resolution_notes': None, # Initialize
-                'resolution_image_url': None # Initialize
-            }
-
-            # Add resolution details if the issue is marked Resolved and details exist
-            if instance.status == 'Resolved': # Or any other status you consider "resolved by manager"
-                if instance.resolution_notes:
-                    context['resolution_notes'] = instance.resolution_notes
-                if instance.resolution_image:
-                    context['resolution_image_url'] = settings.SITE_URL + instance.resolution_image.url # Construct full URL
-
-            text_message = render_to_string('emails/issue_status_update.txt', context)
-            html_message = render_to_string('emails/issue_status_update.html', context)
-
-            send_mail(
-                subject,
-                text_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user_to_notify.email],
-                html_message=html_message,
-                fail_silently=False
-            )
-            print(f"SUCCESS: Status change email sent to {user_to_notify.email} for issue PK {instance.pk} (Status: {original_status} -> {current_status})")
-        except Exception as e:
-            print(f"ERROR sending status change email for issue PK {instance.pk}: {e}")
-    elif not created and original_status == current_status:
-        print(f"DEBUG: issue_status_changed_notification: Status for issue PK {instance.pk} did not change ('{current_status}'). No status change email sent for this save.")
-
-    # --- Logic for New Issue Admin Notification (Keep your existing working version) ---
-    if created: # This should be your existing, working admin notification logic
-        print(f"DEBUG: New issue admin notification logic triggered for Issue PK {instance.pk} (created={created}).")
-        # ... (your existing code for new_issue_admin_notification) ...
-        # Example:
-        # admin_users = User.objects.filter(is_staff=True, is_active=True, email__isnull=False).exclude(email__exact='')
-        # admin_emails = [user.email for user in admin_users if user.email]
-        # if admin_emails:
-        #     subject_admin = f"New Civic Issue Reported: '{instance.title[:50]}...'"
-        #     # ... context_admin and render_to_string for admin email ...
-        #     send_mail(...)
-        #     print(f"SUCCESS: New issue admin notification sent for issue PK {instance.pk}")
-
-
-# Ensure only one @receiver(post_save, sender=Issue) decorator is used for a single function,
-# OR ensure that if you have multiple functions decorated with this, their logic is clearly distinct
-# (e.g., one handles 'created=True', another handles 'created=False and specific field change').
-# The new_issue_admin_notification was previously a separate function.
-# It's cleaner to keep them as separate functions, each with its own @receiver.
+    if issue.assigned_to_manager_id:
+        tasks.send_issue_assigned_email.delay(issue.pk, issue.assigned_to_manager_id)
 
 
+@on_issue_change(on_create=True)
+def new_issue_admin_notification(issue, changes, created):
+    """
+    Queue an email to all staff users when a new issue is created, or, in
+    digest mode, make sure a digest is scheduled for the end of the interval.
+    """
+    if getattr(settings, 'ISSUE_ADMIN_NOTIFICATIONS', 'immediate') == 'digest':
+        tasks.send_new_issue_admin_digest.schedule_once(
+            countdown=getattr(settings, 'ISSUE_ADMIN_DIGEST_INTERVAL', 3600)
+        )
+    else:
+        tasks.send_new_issue_admin_notification.delay(issue.pk)
+
 
-@receiver(post_save, sender=Issue)
-def issue_status_changed_notification(sender, instance, created, **kwargs):
+@on_issue_change(on_create=True)
+def fetch_municipal_area_for_new_issue(issue, changes, created):
     """
-    Sends an email notification to the issue reporter when the issue's status changes.
+    Fallback for new issues the offline index could not place: queue a
+    Nominatim lookup (retried with backoff while Nominatim is unreachable).
+    Disabled with settings.MUNICIPAL_AREA_NOMINATIM_FALLBACK = False.
     """
-    if not created: # Only on updates
-        original_status = getattr(instance, '_original_status_from_db', None)
-        current_status = instance.status
-
-        print(f"DEBUG: issue_status_changed_notification called for Issue PK {instance.pk}")
-        print(f"DEBUG: Original status (from pre_save): {original_status}")
-        print(f"DEBUG: Current status (after save): {current_status}")
-
-        if original_status is not None and original_status != current_status:
-            print(f"DEBUG: Status has changed from '{original_status}' to '{current_status}'. Preparing email for reporter.")
-            try:
-                user_to_notify = instance.user
-                if not user_to_notify or not user_to_notify.email:
-                    print(f"DEBUG: Reporter ({user_to_notify}) or their email is missing. No status change email sent.")
-                    return
-
-                subject = f"Update on Your Reported Issue: '{instance.title[:50]}...'"
-
-                status_choices_dict = dict(Issue.STATUS_CHOICES)
-                old_status_display = status_choices_dict.get(original_status, original_status)
-                new_status_display = instance.get_status_display()
-
-                context = {
-                    'user_name': user_to_notify.username,
-                    'issue_title': instance.title,
-                    'issue_pk': instance.pk,
-                    'old_status': old_status_display,
-                    'new_status': new_status_display,
-                    'issue_url': settings.SITE_URL + instance.get_absolute_url() if hasattr(instance, 'get_absolute_url') else f"{settings.SITE_URL}/issues/{instance.pk}/",
-                    'resolution_notes': None,
-                    'resolution_image_url': None
-                }
-
-                if instance.status == 'Resolved': # Check if issue is resolved
-                    if instance.resolution_notes:
-                        context['resolution_notes'] = instance.resolution_notes
-                    if instance.resolution_image and hasattr(instance.resolution_image, 'url'): # Check if image exists and has a URL
-                        context['resolution_image_url'] = request.build_absolute_uri(instance.resolution_image.url) if hasattr(settings,'SITE_URL') else instance.resolution_image.url
-                        # Note: request object is not available in signals. Construct full URL using settings.SITE_URL
-                        # context['resolution_image_url'] = settings.SITE_URL + instance.resolution_image.url
-
-                text_message = render_to_string('emails/issue_status_update.txt', context)
-                html_message = render_to_string('emails/issue_status_update.html', context)
-
-                send_mail(
-                    subject,
-                    text_message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [user_to_notify.email],
-                    html_message=html_message,
-                    fail_silently=False
-                )
-                print(f"SUCCESS: Status change email sent to {user_to_notify.email} for issue PK {instance.pk} (Status: {original_status} -> {current_status})")
-            except Exception as e:
-                print(f"ERROR sending status change email for issue PK {instance.pk}: {e}")
-        elif original_status == current_status:
-            print(f"DEBUG: Status for issue PK {instance.pk} did not change ('{current_status}'). No status change email sent.")
-        else:
-             print(f"DEBUG: No original status found or it was None for issue PK {instance.pk}. No status change email sent based on this logic path (created={created}).")
+    if issue.latitude and issue.longitude and not issue.municipal_area and geocoding.nominatim_fallback_enabled():
+        tasks.fetch_municipal_area.delay(issue.pk)
 
 
+# --- Full-text search index sync (see issues/search.py) ---
+@on_issue_change('title', 'description', 'category_id', 'municipal_area', on_create=True)
+def update_issue_search_index(issue, changes, created):
+    """Keeps the FTS row for this issue in step with title/description/area."""
+    search.index_issue(issue.pk)
 
 
+# --- Duplicate detection signatures (see issues/duplicates.py) ---
+@on_issue_change('title', 'description', on_create=True)
+def update_issue_text_signature(issue, changes, created):
+    duplicates.update_signature(issue)
 
-@receiver(post_save, sender=Issue)
-def new_issue_admin_notification(sender, instance, created, **kwargs):
-    pass
-    """
-    Sends an email notification to the issue reporter when the issue's status changes.
-    Only sends if the instance is being updated (not created) and if the status field
-    has actually changed compared to its state before this save operation.
-    """
-    if not created: # Only on updates, not new issue creation
-        original_status = getattr(instance, '_original_status_from_db', None)
-        current_status = instance.status
-
-        # Print statements for detailed debugging
-        print(f"DEBUG: issue_status_changed_notification called for Issue PK {instance.pk}")
-        print(f"DEBUG: Is created? {created}")
-        print(f"DEBUG: Original status (from pre_save): {original_status}")
-        print(f"DEBUG: Current status (after save): {current_status}")
-
-        if original_status is not None and original_status != current_status:
-            print(f"DEBUG: Status has changed from '{original_status}' to '{current_status}'. Preparing email.")
-            try:
-                user_to_notify = instance.user
-                if not user_to_notify or not user_to_notify.email:
-                    print(f"DEBUG: User to notify ({user_to_notify}) or their email is missing. No email sent.")
-                    return
-
-                subject = f"Update on Your Reported Issue: '{instance.title[:50]}...'"
-                
-                # Get display name for statuses
-                status_choices_dict = dict(Issue.STATUS_CHOICES)
-                old_status_display = status_choices_dict.get(original_status, original_status) # Fallback to key if not found
-                new_status_display = instance.get_status_display() # Uses model's own method
-
-                context = {
-                    'user_name': user_to_notify.username,
-                    'issue_title': instance.title,
-                    'issue_pk': instance.pk,
-                    'old_status': old_status_display,
-                    'new_status': new_status_display,
-                    'issue_url': settings.SITE_URL + instance.get_absolute_url() if hasattr(instance, 'get_absolute_url') else f"{settings.SITE_URL}/issues/{instance.pk}/"
-                }
-                
-                text_message = render_to_string('emails/issue_status_update.txt', context)
-                html_message = render_to_string('emails/issue_status_update.html', context)
-
-                send_mail(
-                    subject,
-                    text_message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [user_to_notify.email],
-                    html_message=html_message,
-                    fail_silently=False
-                )
-                print(f"SUCCESS: Status change email sent to {user_to_notify.email} for issue PK {instance.pk} (Status: {original_status} -> {current_status})")
-            except Exception as e:
-                print(f"ERROR sending status change email for issue PK {instance.pk}: {e}")
-        elif original_status == current_status:
-            print(f"DEBUG: Status for issue PK {instance.pk} did not change ('{current_status}'). No email sent.")
-        else: # original_status was None (e.g. issue was just created, or pre_save didn't find it)
-             print(f"DEBUG: No original status found or it was None for issue PK {instance.pk} (created={created}). No status change email sent based on this logic path.")
-
-# Ensure your other working signal handlers (new_comment_notification, new_issue_admin_notification) are also in this file
-# For example:
-# @receiver(post_save, sender=Comment)
-# def new_comment_notification(sender, instance, created, **kwargs):
-#     # ... your working code ...
-
-# @receiver(post_save, sender=Issue) # Note: this is also on Issue post_save
-# def new_issue_admin_notification(sender, instance, created, **kwargs):
-#     if created: # This one should ONLY run if created is True
-#         # ... your working code for admin notification ...
-
-
-
-
-# --- NEW SIGNAL HANDLER for Manager Assignment ---
-@receiver(post_save, sender=Issue)
-def issue_assigned_to_manager_notification(sender, instance, created, **kwargs):
-    """
-    Sends an email notification to a Municipal Manager when an issue is newly assigned to them
-    or if the assignment changes to them.
-    """
-    if not created: # Only on updates
-        original_manager = getattr(instance, '_original_assigned_to_manager_from_db', None)
-        current_manager = instance.assigned_to_manager
-
-        # Print statements for detailed debugging
-        print(f"DEBUG: issue_assigned_notification called for Issue PK {instance.pk}")
-        print(f"DEBUG: Original manager (from pre_save): {original_manager}")
-        print(f"DEBUG: Current manager (after save): {current_manager}")
-
-        if current_manager and (original_manager != current_manager):
-            # Assigned to a new manager, or was unassigned and now assigned
-            print(f"DEBUG: Issue PK {instance.pk} assigned/re-assigned to manager {current_manager.username}. Preparing email.")
-            try:
-                if not current_manager.email:
-                    print(f"DEBUG: Manager {current_manager.username} has no email address. No assignment email sent.")
-                    return
-
-                subject = f"New Issue Assigned to You: '{instance.title[:50]}...'"
-                context = {
-                    'manager_name': current_manager.username,
-                    'issue_title': instance.title,
-                    'issue_pk': instance.pk,
-                    'issue_priority': instance.get_priority_display(),
-                    'reported_by': instance.user.username,
-                    'reported_date': instance.reported_date,
-                    'issue_url': settings.SITE_URL + instance.get_absolute_url() if hasattr(instance, 'get_absolute_url') else f"{settings.SITE_URL}/issues/{instance.pk}/"
-                }
-
-                text_message = render_to_string('emails/issue_assigned_notification.txt', context)
-                html_message = render_to_string('emails/issue_assigned_notification.html', context)
-
-                send_mail(
-                    subject,
-                    text_message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [current_manager.email],
-                    html_message=html_message,
-                    fail_silently=False
-                )
-                print(f"SUCCESS: Issue assignment email sent to {current_manager.email} for issue PK {instance.pk}")
-            except Exception as e:
-                print(f"ERROR sending issue assignment email for issue PK {instance.pk} to manager {current_manager.username if current_manager else 'N/A'}: {e}")
-        elif not current_manager and original_manager:
-             print(f"DEBUG: Issue PK {instance.pk} was unassigned from manager {original_manager.username}. No assignment email sent for this action.")
-        # else:
-        #    print(f"DEBUG: Manager assignment for issue PK {instance.pk} did not change or manager is still None. No assignment email sent.")
 
+# --- Materialized dashboard counters (see issues/stats.py) ---
+@on_issue_change(*stats.TRACKED_FIELDS, on_create=True)
+def update_dashboard_stats(issue, changes, created):
+    stats.issue_saved(issue, changes, created)
 
 
+@receiver(post_delete, sender=Issue)
+def remove_issue_from_dashboard_stats(sender, instance, **kwargs):
+    stats.issue_deleted(instance)
 
 
-@receiver(post_save, sender=Comment)
-def new_comment_notification(sender, instance, created, **kwargs):
-    """
-    Sends an email notification to the issue reporter when a new comment is made on their issue,
-    unless the reporter is the one who made the comment.
-    """
-    if created: # Only when a new comment is created
-        issue_reporter = instance.issue.user
-        commenter = instance.user
-
-        if issue_reporter != commenter: # Don't notify if reporter comments on their own issue
-            subject = f"New Comment on Your Issue: '{instance.issue.title[:50]}...'"
-            
-            context = {
-                'issue_reporter_name': issue_reporter.username,
-                'issue_title': instance.issue.title,
-                'issue_pk': instance.issue.pk,
-                'commenter_name': commenter.username,
-                'comment_text_snippet': instance.comment_text[:100] + ('...' if len(instance.comment_text) > 100 else ''),
-                'issue_url': settings.SITE_URL + instance.issue.get_absolute_url() if hasattr(instance.issue, 'get_absolute_url') else f"{settings.SITE_URL}/issues/{instance.issue.pk}/"
-            }
-
-            text_message = render_to_string('emails/new_comment_notification.txt', context)
-            html_message = render_to_string('emails/new_comment_notification.html', context)
-
-            send_mail(
-                subject,
-                text_message,
-                settings.DEFAULT_FROM_EMAIL,
-                [issue_reporter.email],
-                html_message=html_message,
-                fail_silently=False
-            )
-            print(f"New comment email sent to {issue_reporter.email} for issue PK {instance.issue.pk}")
-        # else:
-        #     print(f"Commenter {commenter.username} is the issue reporter. No notification sent for issue PK {instance.issue.pk}")
+# --- Daily time-series rollup (see issues/rollup.py) ---
+@on_issue_change(*rollup.TRACKED_FIELDS, on_create=True)
+def update_daily_stats(issue, changes, created):
+    rollup.issue_saved(issue, changes, created)
+
+
+@receiver(post_delete, sender=Issue)
+def remove_issue_from_daily_stats(sender, instance, **kwargs):
+    rollup.issue_deleted(instance)
+
+
+@receiver(pre_delete, sender=IssueCategory)
+def fold_category_daily_stats(sender, instance, **kwargs):
+    # Its issues are set to category=NULL by a bulk UPDATE that fires no Issue signals
+    rollup.category_deleted(instance.pk)
+
+
+# --- Map cluster counts (see issues/clustering.py) ---
+@on_issue_change(*clustering.TRACKED_FIELDS, on_create=True)
+def update_map_cells(issue, changes, created):
+    clustering.issue_saved(issue, changes, created)
+
+
+@receiver(post_delete, sender=Issue)
+def remove_issue_from_map_cells(sender, instance, **kwargs):
+    clustering.issue_deleted(instance)
+
+
+@receiver(pre_delete, sender=IssueCategory)
+def fold_category_map_cells(sender, instance, **kwargs):
+    # Its issues are set to category=NULL by a bulk UPDATE that fires no Issue signals
+    clustering.category_deleted(instance.pk)
+
+
+# --- Image thumbnails (see issues/thumbnails.py) ---
+@receiver(post_save, sender=IssueImage)
+def generate_issue_image_derivatives(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.image:
+        tasks.generate_image_derivatives.delay(instance.image.name)
+
+
+@on_issue_change('resolution_image')
+def generate_resolution_image_derivatives(issue, changes, created):
+    if issue.resolution_image:
+        tasks.generate_image_derivatives.delay(issue.resolution_image.name)
+
 
+# --- Reference counts for shared image files (see issues/blobs.py) ---
+@receiver(pre_save, sender=IssueImage)
+def remember_previous_issue_image(sender, instance, raw=False, **kwargs):
+    # Only an admin edit replaces the file of an existing IssueImage, so one lookup here is fine
+    if instance.pk and not raw:
+        instance._previous_image_name = (
+            IssueImage.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+        )
 
 
+@receiver(post_save, sender=IssueImage)
+def count_issue_image_reference(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_previous_image_name', None)
+    if instance.image.name != previous:
+        blobs.acquire(instance.image.name)
+        blobs.release(previous)
+
+
+@receiver(post_delete, sender=IssueImage)
+def release_issue_image_reference(sender, instance, **kwargs):
+    blobs.release(instance.image.name)
+
+
+@on_issue_change('resolution_image', on_create=True)
+def count_resolution_image_reference(issue, changes, created):
+    # The new name comes from the field: the file is only stored (and named) during the save
+    previous = None if created else changes['resolution_image'][0]
+    current = issue.resolution_image.name or None
+    if current != previous:
+        blobs.acquire(current)
+        blobs.release(previous)
+
+
+@receiver(post_delete, sender=Issue)
+def release_resolution_image_reference(sender, instance, **kwargs):
+    blobs.release(instance.resolution_image.name)
+
+
+# --- Page caches (issues/page_cache.py, issues/list_cache.py) ---
+# Any write that changes what the detail page shows moves the issue to a new
+# fragment cache version. Issue saves always count: updated_at is on the page.
+# The issue lists only move to a new version when an issue joins, leaves or
+# moves within them; other writes just evict the issue's cached list row.
 
 @receiver(post_save, sender=Issue)
-def new_issue_admin_notification(sender, instance, created, **kwargs):
+def invalidate_issue_detail_cache(sender, instance, created, update_fields=None, **kwargs):
+    page_cache.invalidate_issue(instance.pk)
+    changes = None if created else getattr(instance, 'saved_changes', None)
+    if changes is None:
+        list_cache.issues_changed([instance.pk], None)
+        return
+    # upvotes_count isn't tracked (upvotes.py moves it with F() updates), so go by what was written
+    fields = set(changes) | ({'upvotes_count'} & set(update_fields or ()))
+    list_cache.issues_changed([instance.pk], fields)
+
+
+@receiver(post_delete, sender=Issue)
+def invalidate_deleted_issue_detail_cache(sender, instance, **kwargs):
+    page_cache.invalidate_issue(instance.pk)
+    list_cache.invalidate()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=IssueImage)
+@receiver(post_delete, sender=IssueImage)
+def invalidate_parent_issue_detail_cache(sender, instance, **kwargs):
+    page_cache.invalidate_issue(instance.issue_id)
+    list_cache.issues_changed([instance.issue_id], ())  # Comment count / cover image on the card
+
+
+@receiver(post_save, sender=Upvote)
+@receiver(post_delete, sender=Upvote)
+def invalidate_upvoted_issue_detail_cache(sender, instance, **kwargs):
+    page_cache.invalidate_issue(instance.issue_id)
+    list_cache.issues_changed([instance.issue_id], ['upvotes_count'])
+
+
+@receiver(post_save, sender=IssueCategory)
+def invalidate_category_issue_detail_cache(sender, instance, created, **kwargs):
+    if not created:  # The category name is shown on each of its issues' pages
+        page_cache.invalidate_issues(Issue.objects.filter(category=instance).values_list('pk', flat=True))
+        list_cache.invalidate()
+
+
+@receiver(post_delete, sender=IssueCategory)
+def invalidate_issue_list_cache_for_category(sender, instance, **kwargs):
+    list_cache.invalidate()  # Its issues were set to category=NULL without Issue signals
+
+
+@receiver(post_save, sender=User)
+def count_new_user(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.adjust('users', 1)
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    stats.adjust('users', -1)
+
+
+@receiver(post_save, sender=IssueCategory)
+def count_new_category(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.adjust('categories', 1)
+
+
+@receiver(post_delete, sender=IssueCategory)
+def count_deleted_category(sender, instance, **kwargs):
+    stats.adjust('categories', -1)
+
+
+@receiver(pre_save, sender=Issue)
+def assign_municipal_area_offline(sender, instance, **kwargs):
     """
-    Sends an email notification to all staff users when a new issue is created.
+    Before a new issue is first saved, look its area up in the local ward
+    boundary index (issues/geocoding.py). This takes microseconds and needs no
+    network, so most issues already have municipal_area when they hit the DB.
     """
-    if created: # Only when a new issue is first reported
-        admin_users = User.objects.filter(is_staff=True, is_active=True, email__isnull=False).exclude(email__exact='')
-        admin_emails = [user.email for user in admin_users if user.email] # Ensure email exists
-
-        if admin_emails:
-            subject = f"New Civic Issue Reported: '{instance.title[:50]}...'"
-            
-            # Construct link to the admin change page for the issue
-            admin_issue_url = f"{settings.SITE_URL}/admin/issues/issue/{instance.pk}/change/"
-            # Or, if you have a user-facing detail page you prefer them to see first:
-            # user_issue_url = settings.SITE_URL + instance.get_absolute_url() if hasattr(instance, 'get_absolute_url') else f"{settings.SITE_URL}/issues/{instance.pk}/"
-
-
-            context = {
-                'issue_title': instance.title,
-                'issue_description_snippet': instance.description[:150] + ('...' if len(instance.description) > 150 else ''),
-                'reporter_name': instance.user.username,
-                'category_name': instance.category.name if instance.category else "N/A",
-                'reported_date': instance.reported_date,
-                'admin_issue_url': admin_issue_url,
-                # 'user_issue_url': user_issue_url # if you prefer this
-            }
-
-            text_message = render_to_string('emails/new_issue_admin_notification.txt', context)
-            html_message = render_to_string('emails/new_issue_admin_notification.html', context)
-
-            send_mail(
-                subject,
-                text_message,
-                settings.DEFAULT_FROM_EMAIL,
-                admin_emails, # Send to all staff users
-                html_message=html_message,
-                fail_silently=False
-            )
-            print(f"New issue admin notification sent for issue PK {instance.pk} to: {admin_emails}")
+    if instance.pk is None and not instance.municipal_area:
+        area_name = geocoding.reverse_geocode_offline(instance.latitude, instance.longitude)
+        if area_name:
+            instance.municipal_area = area_name
 
 
+@receiver(post_delete, sender=Issue)
+def remove_issue_from_search_index(sender, instance, **kwargs):
+    search.remove_issue(instance.pk)
 
-@receiver(post_save, sender=Issue)
-def fetch_municipal_area_for_new_issue(sender, instance, created, **kwargs):
+
+@receiver(post_save, sender=IssueCategory)
+def update_category_in_search_index(sender, instance, created, **kwargs):
+    if not created:  # A brand new category has no issues yet
+        search.reindex_category(instance.pk)
+
+
+@receiver(pre_delete, sender=IssueCategory)
+def clear_category_in_search_index(sender, instance, **kwargs):
+    # Issues are set to category=NULL by a bulk UPDATE that fires no Issue signals.
+    search.reindex_category(instance.pk, clear=True)
+
+
+@receiver(post_save, sender=Comment)
+def new_comment_notification(sender, instance, created, **kwargs):
     """
-    When a new issue is created, use its lat/lon to call the Nominatim API
-    and save the local municipal area/ward/suburb name.
+    Queue an email to the issue reporter when a new comment is made on their issue,
+    unless the reporter is the one who made the comment.
     """
-    # 'created' is True only when the issue is first saved to the database.
-    # We also check if the area has not already been populated.
-    if created and instance.latitude and instance.longitude and not instance.municipal_area:
-        lat = instance.latitude
-        lon = instance.longitude
-
-        # Construct the Nominatim API URL. addressdetails=1 is important for getting structured data.
-        api_url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lon}&addressdetails=1"
-
-        # It's good practice to set a custom User-Agent for Nominatim's policy
-        headers = {
-            'User-Agent': 'CommunityWatchProject/1.0 (Contact: your-email@example.com)'
-        }
-
-        print(f"Fetching municipal area for new Issue PK {instance.pk}...")
-
-        try:
-            response = requests.get(api_url, headers=headers, timeout=10) # 10-second timeout
-            response.raise_for_status() # Raise an exception for HTTP errors (like 4xx or 5xx)
-
-            data = response.json()
-            address = data.get('address', {})
-
-            # Intelligently find the most specific local area name available.
-            # We try a prioritized list of keys that Nominatim might return for a locality.
-            # For Kochi, 'suburb' (e.g., 'Kaloor'), 'neighbourhood', or 'quarter' are common.
-            area_name = (
-                address.get('suburb') or 
-                address.get('neighbourhood') or 
-                address.get('quarter') or
-                address.get('county') # This might be the Taluk name, e.g., 'Kochi Taluk'
-            )
-
-            if area_name:
-                print(f"SUCCESS: Area found: '{area_name}'. Saving to issue.")
-                # Save the retrieved area name back to the issue instance
-                instance.municipal_area = area_name
-
-                # We must disconnect the signal temporarily before saving again
-                # to prevent an infinite loop of post_save calls.
-                post_save.disconnect(fetch_municipal_area_for_new_issue, sender=Issue)
-                instance.save(update_fields=['municipal_area'])
-                post_save.connect(fetch_municipal_area_for_new_issue, sender=Issue)
-            else:
-                print(f"WARNING: Could not determine a specific area name from API response for Issue PK {instance.pk}.")
-
-        except requests.exceptions.RequestException as e:
-            print(f"ERROR: Could not connect to Nominatim API. {e}")
-        except Exception as e:
-            print(f"ERROR: An unexpected error occurred while fetching municipal area for Issue PK {instance.pk}: {e}")
\ No newline at end of file
+    if created and instance.issue.user_id != instance.user_id:
+        tasks.send_new_comment_notification.delay(instance.pk)
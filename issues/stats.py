@@ -0,0 +1,126 @@
+# issues/stats.py
+"""
+Materialized counters for the admin dashboard.
+
+Instead of a dozen COUNT(*) queries per dashboard load, the IssueStat table
+holds one row per counter. Every issue contributes +1 to a small set of keys
+derived from its status, priority and manager (stat_keys()); when an issue is
+created, deleted or one of those fields changes, the old keys are decremented
+and the new ones incremented with F() updates. recompute() rebuilds all
+counters from scratch (`python manage.py recompute_dashboard_stats`) to repair
+drift. Bulk writes report their changes through issues_changed() (see
+issues/bulk.py), since queryset.update() bypasses signals.
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Issue, IssueCategory, IssueStat
+
+FINAL_STATUSES = ['Resolved', 'Closed-No Action', 'Invalid', 'Duplicate']
+READY_FOR_ASSIGNMENT_STATUS = 'Verified'
+
+# Fields whose changes move an issue between counters
+TRACKED_FIELDS = ('status', 'priority', 'assigned_to_manager_id')
+
+
+def stat_keys(status, priority, manager_id):
+    """The counters a single issue with these values counts towards."""
+    keys = {'total', f'status:{status}'}
+    if status not in FINAL_STATUSES:
+        keys.add('open')
+        if priority == 'High':
+            keys.add('high_priority_open')
+    if status == READY_FOR_ASSIGNMENT_STATUS and manager_id is None:
+        keys.add('unassigned_verified')
+    return keys
+
+
+def _bump(keys, delta):
+    for key in keys:
+        if not IssueStat.objects.filter(key=key).update(value=F('value') + delta):
+            # First time we see this key (e.g. a status no issue had before)
+            IssueStat.objects.get_or_create(key=key)
+            IssueStat.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def apply_change(old_keys, new_keys):
+    """Move one issue from the counters in old_keys to those in new_keys."""
+    removed, added = set(old_keys) - set(new_keys), set(new_keys) - set(old_keys)
+    if removed or added:
+        with transaction.atomic():
+            _bump(sorted(removed), -1)
+            _bump(sorted(added), 1)
+
+
+def issue_saved(issue, changes, created):
+    if created:
+        apply_change((), stat_keys(issue.status, issue.priority, issue.assigned_to_manager_id))
+        return
+    current = {
+        'status': issue.status,
+        'priority': issue.priority,
+        'assigned_to_manager_id': issue.assigned_to_manager_id,
+    }
+    previous = {name: changes[name][0] if name in changes else value for name, value in current.items()}
+    apply_change(
+        stat_keys(previous['status'], previous['priority'], previous['assigned_to_manager_id']),
+        stat_keys(current['status'], current['priority'], current['assigned_to_manager_id']),
+    )
+
+
+def issue_deleted(issue):
+    apply_change(stat_keys(issue.status, issue.priority, issue.assigned_to_manager_id), ())
+
+
+def issues_changed(changes):
+    """
+    Apply many issue changes at once, e.g. after a bulk update. `changes` is
+    [(old, new)], each a dict with the TRACKED_FIELDS of one issue.
+    """
+    deltas = Counter()
+    for old, new in changes:
+        deltas.subtract(stat_keys(*(old[name] for name in TRACKED_FIELDS)))
+        deltas.update(stat_keys(*(new[name] for name in TRACKED_FIELDS)))
+    with transaction.atomic():
+        for key, delta in sorted(deltas.items()):
+            if delta:
+                _bump([key], delta)
+
+
+def adjust(key, delta):
+    """For counters of other tables ('users', 'categories')."""
+    _bump([key], delta)
+
+
+def compute():
+    """All counters computed from the source tables (a few GROUP BY queries)."""
+    counts = {}
+    rows = Issue.objects.order_by().values('status', 'priority', 'assigned_to_manager_id').annotate(n=Count('pk'))
+    for row in rows:
+        for key in stat_keys(row['status'], row['priority'], row['assigned_to_manager_id']):
+            counts[key] = counts.get(key, 0) + row['n']
+    counts['users'] = get_user_model().objects.count()
+    counts['categories'] = IssueCategory.objects.count()
+    return counts
+
+
+def recompute():
+    """Rebuild every counter. Returns {key: (old, new)} for the counters that were wrong."""
+    with transaction.atomic():
+        counts = compute()
+        existing = dict(IssueStat.objects.select_for_update().values_list('key', 'value'))
+        drift = {}
+        for key in set(existing) | set(counts):
+            new = counts.get(key, 0)
+            if existing.get(key) != new:
+                drift[key] = (existing.get(key), new)
+                IssueStat.objects.update_or_create(key=key, defaults={'value': new})
+    return drift
+
+
+def get_stats():
+    """All counters in one query, as {key: value}. Missing keys read as 0."""
+    return dict(IssueStat.objects.values_list('key', 'value'))
@@ -0,0 +1,70 @@
+# issues/storage.py
+"""
+Content-addressed storage for issue and resolution images.
+
+A file is stored under the SHA-256 of its bytes, sharded two levels deep so
+no directory grows too large:
+
+    blobs/3f/a2/3fa2c1...e9.jpg
+
+Saving bytes that are already stored writes nothing and returns the existing
+name, so the same photo attached to several (duplicate) reports takes disk
+space once. Thumbnails are named after the blob (issues/thumbnails.py), so
+they are shared too.
+
+Because several rows can point at one blob, a file may only be deleted when
+nothing references it any more; issues/blobs.py keeps a reference count per
+blob (MediaBlob) and deletes the file when it drops to zero. A name handed
+out by _save() has no reference yet (signals.py takes it once the row is
+saved), so _save() first reserves the blob (blobs.reserve()) and only then
+checks the file: a concurrent delete either sees the reservation and keeps
+the file, or finishes before it and the file is written again. That import
+is deferred so models.py can still import this module.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+BLOB_PREFIX = 'blobs'
+
+
+def blob_name(digest, extension):
+    return f"{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(BLOB_PREFIX + '/')
+
+
+def normalized_extension(name):
+    extension = os.path.splitext(name)[1].lower()
+    return '.jpg' if extension == '.jpeg' else extension
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by their content hash (see module docstring)."""
+
+    def _save(self, name, content):
+        from . import blobs  # blobs imports models, which import this module
+
+        target = blob_name(content_digest(content), normalized_extension(name))
+        blobs.reserve(target, content.size)
+        if self.exists(target):
+            return target  # Already stored: nothing to write
+        return super()._save(target, content)
+
+
+_blob_storage = ContentAddressedStorage()
+
+
+def blob_storage():
+    """Storage for IssueImage.image and Issue.resolution_image (a callable keeps it out of migrations)."""
+    return _blob_storage
@@ -0,0 +1,276 @@
+# issues/tasks.py
+"""
+Background work for the issues app. Signals only enqueue these (see
+issues/signals.py) so a request never waits on SMTP or Nominatim;
+`python manage.py runworker` runs them. Emails go through the outbox
+(outbox/mail.py), which sends them in batches over one SMTP connection.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+from django.template.loader import render_to_string
+
+from outbox.mail import queue_mail
+from outbox.models import OutboxEmail
+from taskqueue.queue import task
+
+from . import blobs, bulk, geocoding, reports, thumbnails
+from .models import Comment, Issue, ReportJob
+
+User = get_user_model()
+
+
+def _issue_url(issue):
+    return settings.SITE_URL + issue.get_absolute_url()
+
+
+def _admin_emails():
+    return list(
+        User.objects.filter(is_staff=True, is_active=True, email__isnull=False)
+        .exclude(email__exact='').values_list('email', flat=True)
+    )
+
+
+@task
+def send_issue_status_email(issue_pk, old_status, new_status):
+    """Tell the reporter their issue moved from old_status to new_status."""
+    issue = Issue.objects.select_related('user').filter(pk=issue_pk).first()
+    if issue is None:
+        return
+    user_to_notify = issue.user
+    if not user_to_notify or not user_to_notify.email:
+        print(f"DEBUG: Reporter ({user_to_notify}) or their email is missing. No status change email sent.")
+        return
+
+    status_choices_dict = dict(Issue.STATUS_CHOICES)
+    context = {
+        'user_name': user_to_notify.username,
+        'issue_title': issue.title,
+        'issue_pk': issue.pk,
+        'old_status': status_choices_dict.get(old_status, old_status),
+        'new_status': status_choices_dict.get(new_status, new_status),
+        'issue_url': _issue_url(issue),
+        'resolution_notes': None,
+        'resolution_image_url': None,
+    }
+    # Add resolution details if the issue is marked Resolved and details exist
+    if new_status == 'Resolved':
+        if issue.resolution_notes:
+            context['resolution_notes'] = issue.resolution_notes
+        if issue.resolution_image:
+            context['resolution_image_url'] = settings.SITE_URL + issue.resolution_image.url
+
+    queue_mail(
+        f"Update on Your Reported Issue: '{issue.title[:50]}...'",
+        render_to_string('emails/issue_status_update.txt', context),
+        [user_to_notify.email],
+        html_message=render_to_string('emails/issue_status_update.html', context),
+        kind='status_update',
+    )
+    print(f"SUCCESS: Status change email queued for {user_to_notify.email} for issue PK {issue.pk} (Status: {old_status} -> {new_status})")
+
+
+@task
+def send_issue_assigned_email(issue_pk, manager_pk):
+    """Tell a Municipal Manager an issue has been assigned to them."""
+    issue = Issue.objects.select_related('user').filter(pk=issue_pk).first()
+    manager = User.objects.filter(pk=manager_pk).first()
+    if issue is None or manager is None:
+        return
+    if not manager.email:
+        print(f"DEBUG: Manager {manager.username} has no email address. No assignment email sent.")
+        return
+
+    context = {
+        'manager_name': manager.username,
+        'issue_title': issue.title,
+        'issue_pk': issue.pk,
+        'issue_priority': issue.get_priority_display(),
+        'reported_by': issue.user.username,
+        'reported_date': issue.reported_date,
+        'issue_url': _issue_url(issue),
+    }
+    queue_mail(
+        f"New Issue Assigned to You: '{issue.title[:50]}...'",
+        render_to_string('emails/issue_assigned_notification.txt', context),
+        [manager.email],
+        html_message=render_to_string('emails/issue_assigned_notification.html', context),
+        kind='manager_assigned',
+    )
+    print(f"SUCCESS: Issue assignment email queued for {manager.email} for issue PK {issue.pk}")
+
+
+@task
+def send_new_issue_admin_notification(issue_pk):
+    """Email all active staff users about a newly reported issue."""
+    issue = Issue.objects.select_related('user', 'category').filter(pk=issue_pk).first()
+    if issue is None:
+        return
+    admin_emails = _admin_emails()
+    if not admin_emails:
+        return
+
+    context = {
+        'issue_title': issue.title,
+        'issue_description_snippet': issue.description[:150] + ('...' if len(issue.description) > 150 else ''),
+        'reporter_name': issue.user.username,
+        'category_name': issue.category.name if issue.category else "N/A",
+        'reported_date': issue.reported_date,
+        'admin_issue_url': f"{settings.SITE_URL}/admin/issues/issue/{issue.pk}/change/",
+    }
+    queue_mail(
+        f"New Civic Issue Reported: '{issue.title[:50]}...'",
+        render_to_string('emails/new_issue_admin_notification.txt', context),
+        admin_emails,
+        html_message=render_to_string('emails/new_issue_admin_notification.html', context),
+        kind='new_issue_admin',
+    )
+    print(f"New issue admin notification queued for issue PK {issue.pk} to: {admin_emails}")
+
+
+ADMIN_DIGEST_MAX_ISSUES = 200  # Issues listed in one digest; the rest are only counted
+
+
+@task
+def send_new_issue_admin_digest():
+    """
+    Digest mode (settings.ISSUE_ADMIN_NOTIFICATIONS = 'digest'): one email to
+    staff listing every issue reported since the previous digest.
+    """
+    interval = getattr(settings, 'ISSUE_ADMIN_DIGEST_INTERVAL', 3600)
+    now = timezone.now()
+    last_digest_at = (
+        OutboxEmail.objects.filter(kind='admin_digest').order_by('-created_at')
+        .values_list('created_at', flat=True).first()
+    )
+    since = last_digest_at or now - timedelta(seconds=interval)
+    new_issues = Issue.objects.filter(reported_date__gt=since, reported_date__lte=now)
+    issue_count = new_issues.count()
+    admin_emails = _admin_emails()
+    if not issue_count or not admin_emails:
+        return
+
+    issues = [
+        {
+            'title': issue.title,
+            'reporter_name': issue.user.username,
+            'category_name': issue.category.name if issue.category else "N/A",
+            'reported_date': issue.reported_date,
+            'admin_issue_url': f"{settings.SITE_URL}/admin/issues/issue/{issue.pk}/change/",
+        }
+        for issue in new_issues.select_related('user', 'category').order_by('reported_date', 'pk')[:ADMIN_DIGEST_MAX_ISSUES]
+    ]
+    context = {
+        'issues': issues,
+        'issue_count': issue_count,
+        'more_count': issue_count - len(issues),
+        'since': since,
+        'admin_issue_list_url': f"{settings.SITE_URL}/admin/issues/issue/",
+    }
+    digest_email = queue_mail(
+        f"CommunityWatch: {issue_count} new issue{'s' if issue_count != 1 else ''} reported",
+        render_to_string('emails/new_issue_admin_digest.txt', context),
+        admin_emails,
+        html_message=render_to_string('emails/new_issue_admin_digest.html', context),
+        kind='admin_digest',
+    )
+    # The digest's timestamp is the watermark for the next one, so pin it to the end of this period
+    OutboxEmail.objects.filter(pk=digest_email.pk).update(created_at=now)
+    print(f"New issue admin digest queued: {issue_count} issues since {since} to: {admin_emails}")
+
+
+@task
+def send_new_comment_notification(comment_pk):
+    """Email the issue reporter about a new comment by someone else."""
+    comment = Comment.objects.select_related('issue__user', 'user').filter(pk=comment_pk).first()
+    if comment is None:
+        return
+    issue_reporter = comment.issue.user
+    if issue_reporter == comment.user or not issue_reporter.email:
+        return
+
+    context = {
+        'issue_reporter_name': issue_reporter.username,
+        'issue_title': comment.issue.title,
+        'issue_pk': comment.issue.pk,
+        'commenter_name': comment.user.username,
+        'comment_text_snippet': comment.comment_text[:100] + ('...' if len(comment.comment_text) > 100 else ''),
+        'issue_url': _issue_url(comment.issue),
+    }
+    queue_mail(
+        f"New Comment on Your Issue: '{comment.issue.title[:50]}...'",
+        render_to_string('emails/new_comment_notification.txt', context),
+        [issue_reporter.email],
+        html_message=render_to_string('emails/new_comment_notification.html', context),
+        kind='new_comment',
+    )
+    print(f"New comment email queued for {issue_reporter.email} for issue PK {comment.issue.pk}")
+
+
+@task(max_attempts=8)
+def fetch_municipal_area(issue_pk):
+    """
+    Nominatim fallback for issues the offline ward index could not place.
+    Network errors and an open circuit breaker propagate, so the queue retries
+    the lookup later with backoff. The lookup counters and breaker state are
+    stored in the database, where the admin dashboard reads them.
+    """
+    issue = Issue.objects.filter(pk=issue_pk).only('pk', 'latitude', 'longitude', 'municipal_area').first()
+    if issue is None or issue.municipal_area or issue.latitude is None or issue.longitude is None:
+        return
+
+    area_name = geocoding.cached_reverse_geocode(issue.latitude, issue.longitude)
+    if area_name:
+        # A bulk update rather than save(): no notification signals for this bookkeeping
+        # write, but the rollup, search index and caches follow the new area.
+        bulk.update_issues(
+            Issue.objects.filter(Q(municipal_area__isnull=True) | Q(municipal_area=''), pk=issue_pk),
+            municipal_area=area_name,
+        )
+        print(f"SUCCESS: Area found: '{area_name}'. Saved to Issue PK {issue_pk}.")
+    else:
+        print(f"WARNING: Could not determine a specific area name from API response for Issue PK {issue_pk}.")
+
+
+@task(max_attempts=2)
+def render_report(job_pk):
+    """Render a queued PDF report (issues/reports.py) and tell the requester it is ready."""
+    job = ReportJob.objects.select_related('requested_by').filter(pk=job_pk).first()
+    if job is None or job.state not in ('queued', 'running', 'failed'):
+        return
+    reports.run_job(job)
+
+    requester = job.requested_by
+    if requester and requester.email:
+        context = {
+            'user_name': requester.username,
+            'start_date': job.start_date,
+            'end_date': job.end_date,
+            'status_filter': dict(Issue.STATUS_CHOICES).get(job.status_filter, 'All') if job.status_filter else 'All',
+            'report_url': settings.SITE_URL + job.get_absolute_url(),
+        }
+        queue_mail(
+            'Your CommunityWatch issue report is ready',
+            render_to_string('emails/report_ready.txt', context),
+            [requester.email],
+            html_message=render_to_string('emails/report_ready.html', context),
+            kind='report_ready',
+        )
+
+
+@task(max_attempts=2)
+def generate_image_derivatives(name):
+    """Write the thumbnail and mid-size copies of an uploaded image (issues/thumbnails.py)."""
+    if not default_storage.exists(name):  # Replaced or deleted since it was queued
+        return
+    thumbnails.generate(name)
+
+
+@task
+def collect_media_blob(name):
+    """Delete a blob whose last reference went while an upload had it reserved (issues/blobs.py)."""
+    blobs.collect(name)
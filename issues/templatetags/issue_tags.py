@@ -1,4 +1,5 @@
 from django import template
+from issues import thumbnails
 # No need to import models directly if they are passed as arguments to the tag
 
 register = template.Library()
@@ -8,7 +9,11 @@ def get_upvote_status(issue, user):
     """
     Checks if a given user has upvoted a given issue.
     Relies on the is_upvoted_by_user method on the Issue model.
+    Uses the precomputed flag from attach_viewer_state() when the view set it,
+    so list pages don't run one query per card.
     """
+    if hasattr(issue, 'viewer_has_upvoted'):
+        return issue.viewer_has_upvoted
     if hasattr(issue, 'is_upvoted_by_user') and callable(issue.is_upvoted_by_user):
         return issue.is_upvoted_by_user(user)
     return False # Default or if method doesn't exist for some reason
@@ -23,11 +28,21 @@ def url_replace(context, **kwargs):
     It takes keyword arguments for the parameters to be added or changed.
     """
     query = context['request'].GET.copy()
-    # The 'page' parameter is removed so that sorting starts from the first page
-    if 'page' in query:
-        del query['page']
+    # The 'page'/'cursor' parameters are removed so that sorting starts from the first page
+    for param in ('page', 'cursor'):
+        if param in query and param not in kwargs:
+            del query[param]
 
     for key, value in kwargs.items():
         query[key] = value
 
-    return query.urlencode()
\ No newline at end of file
+    return query.urlencode()
+
+@register.simple_tag
+def image_url(field_file, size='thumb'):
+    """
+    URL of a resized copy of an image field ('thumb' or 'medium'), e.g.
+    {% image_url issue.resolution_image 'medium' %}. Falls back to the original
+    (and queues the resize) for images that have no copies yet.
+    """
+    return thumbnails.derivative_url(field_file, size)
@@ -1,3 +1,987 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import random
+import shutil
+import tempfile
+import zlib
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+from taskqueue.models import Task
+from weasyprint import HTML
+
+from . import (
+    blobs, bulk, clustering, duplicates, geocoding, list_cache, page_cache, pdfmerge, report_render, reports, rollup, search, stats, tasks, upvotes,
+)
+from .budgets import budget_for, budget_report, duplicate_queries, normalize_sql
+from .models import CircuitBreakerState, Comment, Issue, IssueCategory, IssueDailyStats, IssueImage, IssueMapCell, MediaBlob, ReportJob, Upvote
+from .pagination import InvalidCursor, KeysetPaginator
+from .storage import blob_storage
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='communitywatch-test-media-')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ViewQueryBudgetTests(TestCase):
+    """
+    Every view must stay within the SQL budget declared next to it (issues/budgets.py).
+    Requests run against a seeded dataset with empty caches, so a per-row
+    query on a list page costs tens of queries here and fails loudly.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_benchmark', issues=300, users=60, managers=3, images=3, stdout=io.StringIO())
+        bench_users = User.objects.filter(email__endswith='@bench.invalid').order_by('pk')
+        cls.admin = bench_users.filter(is_staff=True).first()
+        cls.citizen = bench_users.filter(role='citizen').first()
+        cls.manager = User.objects.get(pk=(
+            Issue.objects.filter(assigned_to_manager__isnull=False).values('assigned_to_manager')
+            .annotate(n=Count('pk')).order_by('-n').values_list('assigned_to_manager', flat=True).first()
+        ))
+        cls.category = IssueCategory.objects.annotate(n=Count('issues')).order_by('-n').first()
+        cls.issue = Issue.objects.annotate(n=Count('comments')).order_by('-n', 'pk').first()
+        cls.job = ReportJob.objects.create(
+            requested_by=cls.admin, start_date='2025-12-01', end_date='2025-12-31',
+            data_version='test', cache_key='test', state='done', finished_at=timezone.now(),
+            file=ContentFile(b'%PDF-1.4\n%%EOF\n', name='test.pdf'), file_size=15,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def assertWithinBudget(self, path, data=None, user=None, method='get', **extra):
+        for alias in settings.CACHES:
+            caches[alias].clear()  # The expensive case: nothing cached yet
+        if user is not None:
+            self.client.force_login(user)
+        budget = budget_for(resolve(path.split('?')[0]).func)
+        self.assertIsNotNone(budget, f"{path} has no query budget; declare one next to its view.")
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data or {}, **extra)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)  # Streaming views query while the body is produced
+        self.assertIn(response.status_code, (200, 302), f"{path} returned {response.status_code}")
+        report = budget_report(budget, queries.captured_queries)
+        if report:
+            self.fail(f"{method.upper()} {path}: {report}")
+        return response
+
+    # --- Public pages ---
+
+    def test_issue_list(self):
+        url = reverse('issues:issue_list')
+        for params in ({}, {'sort': 'oldest'}, {'sort': 'upvotes'}, {'status': 'Reported'},
+                       {'category': self.category.name, 'status': 'Reported'}, {'q': 'pothole'}, {'page': '3'}):
+            with self.subTest(params=params):
+                self.assertWithinBudget(url, params)
+        with self.subTest(signed_in=True):
+            self.assertWithinBudget(url, user=self.citizen)
+
+    def test_issue_search_with_many_matches(self):
+        # The seeded dataset has too few matches for a per-row rank lookup to show;
+        # a few thousand make one cost seconds instead of milliseconds.
+        Issue.objects.bulk_create(
+            Issue(title=f'Pothole on ward road {n}', description='Deep pothole after the rains.',
+                  user=self.citizen, category=self.category, latitude=10.0, longitude=76.3)
+            for n in range(2000)
+        )
+        search.rebuild_index()
+        url = reverse('issues:issue_list')
+        for params in ({'q': 'pothole'}, {'q': 'pothole', 'page': '2'}, {'q': 'pothole', 'cursor': ''}):
+            with self.subTest(params=params):
+                self.assertWithinBudget(url, params)
+
+        queryset, ranked = search.search_issues(Issue.objects.all(), 'pothole')
+        self.assertTrue(ranked)
+        with connection.cursor() as cursor:
+            sql, params = queryset.order_by('search_rank').query.sql_with_params()
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' | '.join(row[-1] for row in cursor.fetchall())
+        self.assertNotIn('CORRELATED', plan)
+        self.assertIn(search.FTS_TABLE, plan.split(' | ')[0])  # The MATCH drives the join
+
+    def test_search_sort_reflects_ranking(self):
+        url = reverse('issues:issue_list')
+        self.assertEqual(self.client.get(url, {'q': 'pothole'}).context['current_sort'], 'relevance')
+        for params in ({'q': '!!!'}, {'q': '!!!', 'sort': 'relevance'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).context['current_sort'], 'newest')
+
+    def test_issue_detail(self):
+        url = reverse('issues:issue_detail', kwargs={'pk': self.issue.pk})
+        self.assertWithinBudget(url)
+        self.assertWithinBudget(url, user=self.citizen)
+        self.assertWithinBudget(url, {'submit_comment': '1', 'comment_text': 'Still broken.'}, user=self.citizen, method='post')
+
+    def test_issue_map_data(self):
+        self.assertWithinBudget(reverse('issues:issue_map_data'), {'bbox': '76.2,9.9,76.4,10.2', 'zoom': '13'})
+
+    # --- Citizen pages ---
+
+    def test_report_issue(self):
+        url = reverse('issues:report_issue')
+        self.assertWithinBudget(url, user=self.citizen)
+        photo = io.BytesIO()
+        Image.new('RGB', (64, 48), 'gray').save(photo, 'JPEG')
+        self.assertWithinBudget(url, {
+            'title': 'Fallen tree blocking the road', 'description': 'A large branch fell across the road.',
+            'category': self.category.pk, 'latitude': '10.0', 'longitude': '76.3',
+            'images': [SimpleUploadedFile('tree.jpg', photo.getvalue(), 'image/jpeg')],
+        }, user=self.citizen, method='post')
+
+    def test_my_reported_issues(self):
+        reporter = User.objects.get(pk=Issue.objects.values('user').annotate(n=Count('pk')).order_by('-n')[0]['user'])
+        self.assertWithinBudget(reverse('issues:my_reported_issues'), user=reporter)
+
+    def test_toggle_upvote(self):
+        url = reverse('issues:toggle_upvote_issue', kwargs={'pk': self.issue.pk})
+        self.assertWithinBudget(url, user=self.citizen, method='post')
+        self.assertWithinBudget(url, user=self.citizen, method='post', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    # --- Staff and manager pages ---
+
+    def test_manager_dashboard(self):
+        self.assertWithinBudget(reverse('issues:manager_dashboard'), user=self.manager)
+
+    def test_admin_dashboard(self):
+        self.assertWithinBudget(reverse('issues:admin_dashboard'), user=self.admin)
+
+    def test_issue_trends(self):
+        params = {'start_date': '2025-10-01', 'end_date': '2025-12-31'}
+        self.assertWithinBudget(reverse('issues:issue_trends'), params, user=self.admin)
+        self.assertWithinBudget(reverse('issues:issue_trends_data'), params, user=self.admin)
+
+    def test_reports(self):
+        self.assertWithinBudget(reverse('issues:generate_issue_report'), user=self.admin)
+        self.assertWithinBudget(reverse('issues:generate_issue_report'), {
+            'start_date': '2025-12-01', 'end_date': '2025-12-31', 'status': '',
+        }, user=self.admin, method='post')
+        for name in ('report_job_detail', 'report_job_status', 'report_job_download'):
+            with self.subTest(view=name):
+                self.assertWithinBudget(reverse(f'issues:{name}', kwargs={'pk': self.job.pk}), user=self.admin)
+
+    def test_export_issues(self):
+        url = reverse('issues:export_issues')
+        self.assertWithinBudget(url, user=self.admin)
+        self.assertWithinBudget(url, {'format': 'csv', 'start_date': '2025-01-01', 'end_date': '2025-12-31'}, user=self.admin)
+
+    def test_admin_issue_changelist(self):
+        self.assertWithinBudget(reverse('admin:issues_issue_changelist'), user=self.admin)
+
+
+class MapClusteringTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='mapper', email='mapper@example.com', password='x')
+        cls.roads, cls.water = IssueCategory.objects.bulk_create([
+            IssueCategory(name='Roads'), IssueCategory(name='Water'),
+        ])
+        cls.issues = [
+            Issue.objects.create(
+                title=f'Issue {n}', description='On the map.', user=cls.user,
+                category=cls.roads if n % 3 else cls.water, status='Resolved' if n % 4 == 0 else 'Reported',
+                # Spread over a few grid cells on both sides of 76.3 and 10.0
+                latitude=f'{9.97 + (n * 37 % 61) / 1000:.4f}', longitude=f'{76.27 + (n * 53 % 67) / 1000:.4f}',
+            )
+            for n in range(60)
+        ]
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def map_features(self, bbox, zoom, **filters):
+        response = self.client.get(reverse('issues:issue_map_data'), {'bbox': bbox, 'zoom': zoom, **filters})
+        self.assertEqual(response.status_code, 200)
+        return {
+            (feature['properties'].get('count'), feature['properties'].get('pk'),
+             tuple(round(value, 6) for value in feature['geometry']['coordinates']))
+            for feature in response.json()['features']
+        }
+
+    def map_cell_rows(self):
+        return sorted(
+            (row.geo_cell_lat, row.geo_cell_lon, row.category_id or 0, row.status, row.issue_count,
+             round(row.latitude_sum, 6), round(row.longitude_sum, 6), row.issue_pk_sum)
+            for row in IssueMapCell.objects.filter(issue_count__gt=0)
+        )
+
+    def test_neighbouring_viewports_agree_on_every_cluster(self):
+        for zoom in (9, 12, 13, 14, 15):
+            with self.subTest(zoom=zoom):
+                whole = self.map_features('76.25,9.95,76.36,10.05', zoom)
+                west = self.map_features('76.25,9.95,76.3037,10.05', zoom)
+                east = self.map_features('76.3037,9.95,76.36,10.05', zoom)
+                self.assertEqual(west | east, whole)
+                self.assertEqual(sum(count or 1 for count, _, _ in whole), len(self.issues))
+
+    def test_filters_apply_to_clusters(self):
+        features = self.map_features('76.25,9.95,76.36,10.05', 12, category='Water', status='Reported')
+        expected = sum(1 for issue in self.issues if issue.category == self.water and issue.status == 'Reported')
+        self.assertEqual(sum(count or 1 for count, _, _ in features), expected)
+
+    def test_panning_within_the_same_cells_hits_the_cache(self):
+        self.map_features('76.281,9.981,76.319,10.019', 12)
+        with self.assertNumQueries(0):
+            self.map_features('76.282,9.982,76.318,10.018', 12)
+
+    def test_map_cells_follow_issue_changes(self):
+        moved, recategorized, resolved, deleted = self.issues[:4]
+        moved.latitude, moved.longitude = '10.0412', '76.2555'
+        moved.save()
+        recategorized.category = self.water if recategorized.category == self.roads else self.roads
+        recategorized.save()
+        resolved.status = 'Resolved'
+        resolved.save(update_fields=['status'])
+        deleted.delete()
+        incremental = self.map_cell_rows()
+        clustering.rebuild()
+        self.assertEqual(incremental, self.map_cell_rows())
+
+    def test_deleting_a_category_folds_its_map_cells(self):
+        water = next(issue for issue in self.issues if issue.category == self.water and issue.status == 'Reported')
+        uncategorized = Issue.objects.create(  # Shares the grid cell and status of a Water issue
+            title='No category', description='On the map.', user=self.user,
+            latitude=water.latitude, longitude=water.longitude,
+        )
+        self.water.delete()
+        uncategorized.status = 'Under Review'
+        uncategorized.save()
+        incremental = self.map_cell_rows()
+        clustering.rebuild()
+        self.assertEqual(incremental, self.map_cell_rows())
+        self.assertFalse(
+            IssueMapCell.objects.filter(category=None).values('geo_cell_lat', 'geo_cell_lon', 'status')
+            .annotate(n=Count('pk')).filter(n__gt=1).exists()
+        )
+
+
+class BulkUpdateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+        cls.roads = IssueCategory.objects.create(name='Roads')
+        cls.water = IssueCategory.objects.create(name='Water')
+        cls.issues = [
+            Issue.objects.create(
+                title=f'Issue {n}', description='Bulk.', user=cls.admin, category=cls.roads if n % 2 else cls.water,
+                municipal_area='Ward 1' if n % 3 else 'Ward 2', priority='High' if n % 4 == 0 else 'Medium',
+                latitude=f'{10 + n / 1000:.4f}', longitude=f'{76.3 + n / 1000:.4f}',
+            )
+            for n in range(12)
+        ]
+
+    def test_admin_bulk_action_keeps_derived_data_current(self):
+        self.client.force_login(self.admin)
+        resolved = [issue.pk for issue in self.issues[:5]]
+        response = self.client.post(
+            reverse('admin:issues_issue_changelist'), {'action': 'make_resolved', '_selected_action': resolved},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Issue.objects.filter(status='Resolved').count(), 5)
+
+        self.assertEqual(stats.recompute(), {})
+        incremental = sorted(IssueMapCell.objects.filter(issue_count__gt=0).values_list(
+            'geo_cell_lat', 'geo_cell_lon', 'category_id', 'status', 'issue_count', 'issue_pk_sum',
+        ))
+        clustering.rebuild()
+        self.assertEqual(incremental, sorted(IssueMapCell.objects.values_list(
+            'geo_cell_lat', 'geo_cell_lon', 'category_id', 'status', 'issue_count', 'issue_pk_sum',
+        )))
+        today = timezone.localdate()
+        self.assertEqual(rollup.status_breakdown(today, today), {'Reported': 12, 'Resolved': 5})
+        self.assertEqual(rollup.daily_series(today, today)[0]['backlog'], 7)
+
+    def test_rollup_follows_bulk_bucket_moves(self):
+        bulk.update_issues(Issue.objects.filter(municipal_area='Ward 2'), municipal_area='Ward 3', status='Under Review')
+        bulk.update_issues(Issue.objects.filter(category=self.water), category=self.roads)
+        today = timezone.localdate()
+        for category, area in (('', ''), (self.roads.pk, 'Ward 3'), (self.water.pk, 'Ward 1')):
+            with self.subTest(category=category, area=area):
+                self.assertEqual(
+                    rollup.daily_series(today, today, category_id=category, municipal_area=area)[0]['backlog'],
+                    Issue.objects.filter(
+                        **({'category_id': category} if category else {}), **({'municipal_area': area} if area else {}),
+                    ).count(),
+                )
+        self.assertEqual(stats.recompute(), {})
+
+    def test_deleting_a_category_keeps_its_rollup_history(self):
+        Issue.objects.create(  # An uncategorized bucket for the Water rows to fold into
+            title='No category', description='Bulk.', user=self.admin, municipal_area='Ward 1',
+            latitude='10.5000', longitude='76.5000',
+        )
+
+        def rollup_rows():
+            return sorted(
+                (str(row.date), row.category_id or 0, row.municipal_area, row.status,
+                 row.new_count, row.entered_count, row.exited_count, row.adjusted_count)
+                for row in IssueDailyStats.objects.all()
+            )
+
+        self.water.delete()
+        incremental = rollup_rows()
+        rollup.backfill()
+        self.assertEqual(incremental, rollup_rows())
+        today = timezone.localdate()
+        self.assertEqual(rollup.daily_series(today, today)[0]['backlog'], Issue.objects.count())
+
+    def test_fetched_municipal_area_reaches_rollup_and_caches(self):
+        issue = Issue.objects.create(
+            title='Unplaced', description='Far out.', user=self.admin, category=self.roads,
+            latitude='11.0000', longitude='77.0000',
+        )
+        version = page_cache.issue_version(issue.pk)
+        with mock.patch.object(geocoding, 'cached_reverse_geocode', return_value='Kaloor'):
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks.fetch_municipal_area(issue.pk)
+        self.assertNotEqual(page_cache.issue_version(issue.pk), version)
+        today = timezone.localdate()
+        self.assertEqual(rollup.daily_series(today, today, municipal_area='Kaloor')[0]['backlog'], 1)
+        self.assertEqual(search.search_issues(Issue.objects.all(), 'Kaloor')[0].get(), issue)
+
+    def test_worker_lookups_show_on_the_admin_dashboard(self):
+        issue = Issue.objects.create(
+            title='Unplaced', description='Far out.', user=self.admin, latitude='11.0000', longitude='77.0000',
+        )
+        geocoding._memory_cache.clear()
+        with mock.patch.object(geocoding, 'reverse_geocode_nominatim', return_value='Kaloor'):
+            tasks.fetch_municipal_area(issue.pk)  # What the worker process runs
+        self.client.force_login(self.admin)
+        stats = self.client.get(reverse('issues:admin_dashboard')).context['geocoder_stats']
+        self.assertEqual(stats['api_calls'], 1)
+        self.assertEqual(stats['breaker']['state'], geocoding.CircuitBreaker.CLOSED)
+
+    def test_bulk_update_changes_the_report_data_version(self):
+        Issue.objects.update(updated_at=timezone.now() - datetime.timedelta(days=1))
+        start, end = timezone.now() - datetime.timedelta(days=2), timezone.now()
+        version = reports.data_version(start, end)
+        bulk.update_issues(Issue.objects.filter(pk=self.issues[0].pk), status='Resolved')
+        self.assertNotEqual(reports.data_version(start, end), version)
+
+    def test_rejects_fields_it_cannot_keep_current(self):
+        with self.assertRaises(ValueError):
+            bulk.update_issues(Issue.objects.all(), latitude='10.5')
+
+
+class PdfReportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='reporter', email='reporter@example.com', password='x')
+        cls.day = timezone.now().replace(microsecond=0) - datetime.timedelta(days=1)
+        # Groups of issues sharing a reported_date, so chunk bounds fall inside ties
+        cls.issues = Issue.objects.bulk_create(
+            Issue(
+                title=f'Report issue {n}', description='For the PDF.', user=user,
+                reported_date=cls.day + datetime.timedelta(minutes=n // 4), latitude='10.0000', longitude='76.3000',
+            )
+            for n in range(90)
+        )
+
+    def render(self, rows):
+        """A WeasyPrint PDF whose table spans several pages."""
+        body = ''.join(f'<tr><td>{n}</td><td>Row {n}</td></tr>' for n in rows)
+        return HTML(string=f'<h1>Chunk</h1><table>{body}</table>').write_pdf(uncompressed_pdf=True)
+
+    def read_pages(self, data):
+        """The decoded content streams of each page of an uncompressed PDF, in page order."""
+        reader = pdfmerge._Reader(data)
+        pages = []
+        for number in reader.page_numbers():
+            references = reader.read_object(number)[0]['Contents']
+            if isinstance(references, pdfmerge._Reference):
+                value, stream = reader.read_object(references.number)
+                references = [references] if stream is not None else value
+            pages.append(tuple(self.stream_data(reader, reference) for reference in references))
+        return pages
+
+    def stream_data(self, reader, reference):
+        value, stream = reader.read_object(reference.number)
+        return zlib.decompress(stream) if value.get('Filter') == '/FlateDecode' else stream
+
+    def test_merge_keeps_every_page_and_numbers_across_chunks(self):
+        chunks = [self.render(range(start, start + 80)) for start in (0, 80, 160)]
+        source_pages = [page for chunk in chunks for page in self.read_pages(chunk)]
+        self.assertGreater(len(source_pages), len(chunks))  # Each chunk runs over several pages
+
+        merger = pdfmerge.PdfMerger()
+        self.assertEqual([merger.append(chunk) for chunk in chunks][-1], len(source_pages))
+        merger.number_pages('Page {page} of {pages}')
+        output = io.BytesIO()
+        merger.write(output, compress=False)
+
+        merged_pages = self.read_pages(output.getvalue())
+        self.assertEqual(len(merged_pages), len(source_pages))
+        for index, (merged, source) in enumerate(zip(merged_pages, source_pages), start=1):
+            with self.subTest(page=index):
+                save_state, *contents, stamp = merged
+                self.assertEqual(save_state, b'q')
+                self.assertEqual(tuple(contents), source)
+                self.assertIn(f'(Page {index} of {len(source_pages)}) Tj'.encode(), stamp)
+
+    @override_settings(REPORT_CHUNK_SIZE=25, REPORT_RENDER_PROCESSES=1)
+    def test_report_is_the_summary_followed_by_every_chunk(self):
+        start, end = self.day - datetime.timedelta(hours=1), timezone.now()
+        bounds = report_render.chunk_bounds(Issue.objects.all(), 25)
+        self.assertEqual(len(bounds), 4)
+        expected = self.read_pages(report_render.render_summary(start, end, '', len(bounds)))
+        for first, last in bounds:
+            expected += self.read_pages(report_render.render_chunk(start, end, '', first, last))
+
+        write = pdfmerge.PdfMerger.write
+        with mock.patch.object(pdfmerge.PdfMerger, 'write', autospec=True,
+                               side_effect=lambda merger, output, title=None: write(merger, output, title, compress=False)):
+            report = report_render.render_report_pdf(start, end)
+
+        pages = self.read_pages(report)
+        self.assertEqual([page[1:-1] for page in pages], expected)
+        self.assertIn(f'(Page {len(expected)} of {len(expected)}) Tj'.encode(), pages[-1][-1])
+
+    def test_chunk_bounds_split_ties_on_reported_date(self):
+        issues = Issue.objects.all()
+        for chunk_size in (1, 3, 4, 7, 90, 100):
+            with self.subTest(chunk_size=chunk_size):
+                bounds = report_render.chunk_bounds(issues, chunk_size)
+                chunks = [
+                    list(issues.filter(report_render._within(first, last)).order_by('reported_date', 'pk').values_list('pk', flat=True))
+                    for first, last in bounds
+                ]
+                self.assertEqual([len(chunk) for chunk in chunks[:-1]], [chunk_size] * (len(chunks) - 1))
+                self.assertEqual(
+                    [pk for chunk in chunks for pk in chunk],
+                    list(issues.order_by('reported_date', 'pk').values_list('pk', flat=True)),
+                )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageDerivativeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='uploader', email='uploader@example.com', password='x')
+        cls.issue = Issue.objects.create(
+            title='Broken sign', description='Bent pole.', user=user, latitude='10.0000', longitude='76.3000',
+        )
+        # Not an image: no derivative can ever be made of it
+        IssueImage.objects.create(issue=cls.issue, image=ContentFile(b'not a jpeg', name='sign.jpg'))
+
+    def test_pages_without_derivatives_queue_nothing(self):
+        tasks_before = Task.objects.count()
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.client.get(reverse('issues:issue_list')).status_code, 200)
+                self.assertEqual(
+                    self.client.get(reverse('issues:issue_detail', kwargs={'pk': self.issue.pk})).status_code, 200,
+                )
+            caches[settings.ISSUE_LIST_CACHE_ALIAS].clear()
+            caches[settings.ISSUE_DETAIL_CACHE_ALIAS].clear()
+        self.assertEqual(Task.objects.count(), tasks_before)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaBlobTests(TestCase):
+    PHOTO = b'same photo bytes'
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='photographer', email='photographer@example.com', password='x')
+        cls.issue = Issue.objects.create(
+            title='Overflowing bin', description='Near the bus stop.', user=user, latitude='10.0000', longitude='76.3000',
+        )
+
+    def attach(self, data, name='bin.jpg'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return IssueImage.objects.create(issue=self.issue, image=ContentFile(data, name=name))
+
+    def detach(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+
+    def expire_reservations(self):
+        MediaBlob.objects.update(reserved_at=timezone.now() - blobs.RESERVATION - datetime.timedelta(seconds=1))
+
+    def test_identical_uploads_share_one_blob_until_the_last_reference_goes(self):
+        first = self.attach(self.PHOTO, 'bin.jpg')
+        second = self.attach(self.PHOTO, 'BIN.JPEG')
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 2)
+        self.expire_reservations()
+
+        self.detach(first)
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(default_storage.exists(name))
+
+        self.detach(second)
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_reused_blob_survives_a_delete_before_its_reference_is_taken(self):
+        name = self.attach(self.PHOTO).image.name
+        IssueImage.objects.filter(image=name).delete()  # No signals: count stays 1
+        MediaBlob.objects.filter(name=name).update(refcount=0)
+        self.expire_reservations()
+
+        # An upload of the same bytes gets the existing name back; the release
+        # of the old reference commits before the new row is saved
+        self.assertEqual(blob_storage().save('again.jpg', ContentFile(self.PHOTO)), name)
+        self.assertFalse(blobs.delete_if_unreferenced(name))
+        self.assertTrue(default_storage.exists(name))
+        IssueImage.objects.create(issue=self.issue, image=name)
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+
+    def test_upload_after_a_delete_writes_the_file_again(self):
+        name = self.attach(self.PHOTO).image.name
+        MediaBlob.objects.filter(name=name).update(refcount=0)
+        self.expire_reservations()
+        self.assertTrue(blobs.delete_if_unreferenced(name))
+        self.assertFalse(default_storage.exists(name))
+
+        self.assertEqual(blob_storage().save('again.jpg', ContentFile(self.PHOTO)), name)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_blob_released_while_reserved_is_collected_later(self):
+        image = self.attach(self.PHOTO)
+        name = image.image.name
+        self.detach(image)
+        self.assertTrue(default_storage.exists(name))
+        task = Task.objects.get(name=tasks.collect_media_blob.task_name, status='pending')
+        self.assertEqual(task.args, [name])
+        self.assertGreater(task.run_after, timezone.now() + blobs.RESERVATION - datetime.timedelta(minutes=1))
+
+        self.expire_reservations()
+        tasks.collect_media_blob(name)
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_dedupe_media_moves_legacy_files_and_repairs_counts(self):
+        legacy = [default_storage.save(f'issue_images/legacy_{n}.jpg', ContentFile(self.PHOTO)) for n in range(2)]
+        for name in legacy:
+            IssueImage.objects.create(issue=self.issue, image=name)  # Not a blob: nothing counted
+        orphan = self.attach(b'nobody uses this').image.name
+        IssueImage.objects.filter(image=orphan).delete()  # No signals: count stays 1
+        self.expire_reservations()
+
+        call_command('dedupe_media', stdout=io.StringIO())
+
+        names = set(IssueImage.objects.filter(issue=self.issue).values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        target = names.pop()
+        self.assertTrue(target.startswith('blobs/'))
+        self.assertEqual(MediaBlob.objects.get(name=target).refcount, 2)
+        self.assertTrue(default_storage.exists(target))
+        self.assertFalse(any(default_storage.exists(name) for name in legacy))
+        self.assertFalse(MediaBlob.objects.filter(name=orphan).exists())
+        self.assertFalse(default_storage.exists(orphan))
+
+
+class KeysetPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='pager', email='pager@example.com', password='x')
+        start = timezone.make_aware(datetime.datetime(2026, 1, 1))
+        for n in range(8):
+            issue = Issue.objects.create(
+                title=f'Pothole {n}', description='Deep.', user=user, latitude='10.0000', longitude='76.3000',
+            )
+            # Pairs share a reported_date, so the pk tiebreaker decides their order
+            Issue.objects.filter(pk=issue.pk).update(reported_date=start + datetime.timedelta(days=n // 2))
+
+    def paginator(self, per_page=3):
+        return KeysetPaginator(Issue.objects.order_by('-reported_date', '-pk'), per_page)
+
+    def walk(self, paginator):
+        pages, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_next_cursors_visit_every_row_once_in_order(self):
+        pages = self.walk(self.paginator())
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual(
+            [issue.pk for page in pages for issue in page],
+            list(Issue.objects.order_by('-reported_date', '-pk').values_list('pk', flat=True)),
+        )
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+        self.assertFalse(pages[-1].has_next())
+
+    def test_previous_cursor_returns_the_page_before(self):
+        paginator = self.paginator()
+        pages = self.walk(paginator)
+        back = paginator.page(pages[2].previous_cursor)
+        self.assertEqual([issue.pk for issue in back], [issue.pk for issue in pages[1]])
+        self.assertTrue(back.has_next())
+        first = paginator.page(back.previous_cursor)
+        self.assertEqual([issue.pk for issue in first], [issue.pk for issue in pages[0]])
+        self.assertFalse(first.has_previous())
+
+    def test_exact_multiple_of_page_size_has_no_empty_last_page(self):
+        pages = self.walk(self.paginator(per_page=4))
+        self.assertEqual([len(page) for page in pages], [4, 4])
+
+    def test_cursor_is_stable_when_newer_rows_arrive(self):
+        paginator = self.paginator()
+        first = paginator.page()
+        second = [issue.pk for issue in paginator.page(first.next_cursor)]
+        Issue.objects.create(
+            title='Newest', description='Just in.', user=first.object_list[0].user, latitude='10.0000', longitude='76.3000',
+        )
+        self.assertEqual([issue.pk for issue in paginator.page(first.next_cursor)], second)
+
+    def test_bad_cursors_are_invalid(self):
+        paginator = self.paginator()
+        for cursor in ('not-a-cursor', KeysetPaginator(Issue.objects.order_by('-pk'), 3).page().next_cursor):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+        with self.assertRaises(ValueError):
+            KeysetPaginator(Issue.objects.order_by('-reported_date'), 3)
+
+
+class DuplicateDetectionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reporter', email='reporter@example.com', password='x')
+        cls.roads = IssueCategory.objects.create(name='Roads')
+        cls.water = IssueCategory.objects.create(name='Water')
+        cls.pothole = cls.report('Deep pothole on MG Road', 'Big pothole in front of the bakery, bikes keep falling.')
+
+    @classmethod
+    def report(cls, title, description, category=None, latitude='10.0000', longitude='76.3000', **fields):
+        return Issue.objects.create(
+            title=title, description=description, category=category or cls.roads, user=cls.user,
+            latitude=latitude, longitude=longitude, **fields,
+        )
+
+    def candidates(self, title='Pothole on MG Road', description='Deep pothole in front of the bakery, bikes falling.',
+                   category=None, latitude=10.0001, longitude=76.3001):
+        return duplicates.find_duplicate_candidates(title, description, (category or self.roads).pk, latitude, longitude)
+
+    def test_near_duplicates_share_a_band(self):
+        rng = random.Random(7)
+        vocabulary = [f'word{n}' for n in range(400)]
+        for _ in range(50):
+            words = rng.sample(vocabulary, 14)
+            variant = list(words)
+            variant[rng.randrange(len(variant))] = rng.choice(vocabulary)  # One word changed
+            first = duplicates.minhash(duplicates.shingles(' '.join(words[:5]), ' '.join(words[5:])))
+            second = duplicates.minhash(duplicates.shingles(' '.join(variant[:5]), ' '.join(variant[5:])))
+            self.assertTrue(set(duplicates.band_keys(first)) & set(duplicates.band_keys(second)))
+            self.assertGreaterEqual(duplicates.estimated_similarity(first, second), 0.5)
+
+    def test_unrelated_texts_share_no_band(self):
+        first = duplicates.minhash(duplicates.shingles('Streetlight out', 'Dark junction near the temple every night.'))
+        second = duplicates.minhash(duplicates.shingles('Garbage pile', 'Uncollected waste behind the market for a week.'))
+        self.assertFalse(set(duplicates.band_keys(first)) & set(duplicates.band_keys(second)))
+
+    def test_finds_open_reports_nearby_in_the_same_category(self):
+        self.report(self.pothole.title, self.pothole.description, category=self.water)
+        self.report(self.pothole.title, self.pothole.description, latitude='10.0200')  # ~2 km away
+        self.report(self.pothole.title, self.pothole.description, status='Resolved')
+        self.assertEqual([candidate.issue for candidate in self.candidates()], [self.pothole])
+        self.assertEqual(self.candidates(title='Garbage pile', description='Uncollected waste behind the market.'), [])
+
+    def test_candidate_cap_keeps_the_newest_reports(self):
+        newer = self.report(self.pothole.title, self.pothole.description, priority='Low')
+        # Older and more urgent, so the model's default ordering would put it first
+        Issue.objects.filter(pk=self.pothole.pk).update(
+            reported_date=timezone.now() - datetime.timedelta(days=30), priority='High', priority_rank=3,
+        )
+        with mock.patch.object(duplicates, 'MAX_CANDIDATES', 1):
+            self.assertEqual([candidate.issue for candidate in self.candidates()], [newer])
+
+    def test_report_form_asks_before_saving_a_likely_duplicate(self):
+        self.client.force_login(self.user)
+        url = reverse('issues:report_issue')
+        data = {
+            'title': 'Pothole on MG Road', 'description': 'Deep pothole in front of the bakery, bikes falling.',
+            'category': self.roads.pk, 'latitude': '10.0001', 'longitude': '76.3001',
+        }
+        issues_before = Issue.objects.count()
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.pothole.get_absolute_url())
+        self.assertContains(response, 'name="not_a_duplicate"')
+        self.assertEqual(Issue.objects.count(), issues_before)
+
+        response = self.client.post(url, {**data, 'not_a_duplicate': '1'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(Issue.objects.count(), issues_before + 1)
+
+
+class UpvoteReconcileTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.voters = [
+            User.objects.create_user(username=f'voter{n}', email=f'voter{n}@example.com', password='x') for n in range(3)
+        ]
+        cls.issues = [
+            Issue.objects.create(
+                title=f'Broken footpath {n}', description='Loose tiles.', user=cls.voters[0],
+                latitude='10.0000', longitude='76.3000',
+            )
+            for n in range(3)
+        ]
+        for issue in cls.issues:
+            for voter in cls.voters[:2]:
+                upvotes.toggle_upvote(issue.pk, voter)
+
+    def counts(self):
+        return list(Issue.objects.filter(pk__in=[issue.pk for issue in self.issues]).order_by('pk')
+                    .values_list('upvotes_count', flat=True))
+
+    def test_drifted_counters_are_recomputed(self):
+        first, second, third = self.issues
+        Upvote.objects.filter(issue=first, user=self.voters[0]).delete()  # A vote removed behind the counter's back
+        Issue.objects.filter(pk=second.pk).update(upvotes_count=9)
+        self.assertEqual(self.counts(), [2, 9, 2])
+
+        self.assertEqual(upvotes.reconcile_upvote_counts(), 2)
+        self.assertEqual(self.counts(), [1, 2, 2])
+        self.assertEqual(upvotes.reconcile_upvote_counts(), 0)
+
+    def test_only_the_given_issues_are_checked(self):
+        Issue.objects.update(upvotes_count=0)
+        self.assertEqual(upvotes.reconcile_upvote_counts([self.issues[0].pk]), 1)
+        self.assertEqual(self.counts(), [2, 0, 0])
+
+    def test_cached_pages_of_the_fixed_issues_are_invalidated(self):
+        fixed, untouched = self.issues[0], self.issues[1]
+        Issue.objects.filter(pk=fixed.pk).update(upvotes_count=7)
+        fixed_version = page_cache.issue_version(fixed.pk)
+        untouched_version = page_cache.issue_version(untouched.pk)
+        upvote_order = list_cache.current_version({'sort': 'upvotes'})['upvotes']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            upvotes.reconcile_upvote_counts()
+
+        self.assertNotEqual(page_cache.issue_version(fixed.pk), fixed_version)
+        self.assertEqual(page_cache.issue_version(untouched.pk), untouched_version)
+        self.assertNotEqual(list_cache.current_version({'sort': 'upvotes'})['upvotes'], upvote_order)
+
+    def test_command_reports_how_many_were_fixed(self):
+        Issue.objects.update(upvotes_count=5)
+        output = io.StringIO()
+        call_command('reconcile_upvotes', stdout=output)
+        self.assertIn('Corrected upvote counts on 3 issues.', output.getvalue())
+
+
+class IssueSaveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='saver', email='saver@example.com', password='x')
+        cls.issue = Issue.objects.create(
+            title='Broken bench', description='In the park.', user=user, latitude='10.0000', longitude='76.3000',
+        )
+
+    def test_narrow_save_does_not_load_deferred_fields(self):
+        issue = Issue.objects.only('pk').get(pk=self.issue.pk)
+        issue.upvotes_count = 3
+        with self.assertNumQueries(1):
+            issue.save(update_fields=['upvotes_count'])
+
+    def test_derived_fields_follow_their_sources(self):
+        issue = Issue.objects.only('pk', 'priority', 'latitude', 'longitude').get(pk=self.issue.pk)
+        issue.priority, issue.latitude = 'High', '10.0523'
+        issue.save(update_fields=['priority', 'latitude'])
+        self.assertEqual(
+            Issue.objects.values_list('priority_rank', 'geo_cell_lat').get(pk=self.issue.pk),
+            (Issue.PRIORITY_RANKS['High'], 1005),
+        )
+
+
+class PageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='viewer', email='viewer@example.com', password='x')
+        cls.issue = Issue.objects.create(
+            title='Leaking hydrant', description='On the corner.', user=user, latitude='10.0000', longitude='76.3000',
+        )
+
+    def test_detail_fragments_live_in_the_configured_cache(self):
+        shared = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, shared, ignore_errors=True)
+        file_cache = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': shared}
+        with override_settings(CACHES={**settings.CACHES, 'shared': file_cache}, ISSUE_DETAIL_CACHE_ALIAS='shared'):
+            caches['default'].clear()
+            self.assertEqual(self.client.get(reverse('issues:issue_detail', kwargs={'pk': self.issue.pk})).status_code, 200)
+            version_key = f'issue_version:{self.issue.pk}'
+            self.assertIsNotNone(caches['shared'].get(version_key))
+            self.assertGreater(len(os.listdir(shared)), 1)  # The version and the fragments
+            self.assertIsNone(caches['default'].get(version_key))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.issue.save()
+            self.assertIsNone(caches['shared'].get(version_key))
+
+
+class ListCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='lister', email='lister@example.com', password='x')
+        cls.issues = [
+            Issue.objects.create(
+                title=f'Listed issue {n}', description='On the list.', user=cls.user,
+                latitude='10.0000', longitude='76.3000',
+            )
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        caches[settings.ISSUE_LIST_CACHE_ALIAS].clear()
+
+    def list_cards(self, **params):
+        response = self.client.get(reverse('issues:issue_list'), params)
+        return {issue.pk: (issue.upvotes_count, issue.comment_count, issue.status) for issue in response.context['issues']}
+
+    def versions(self):
+        return [list_cache.current_version({'sort': sort})[part] for sort, part in (('newest', 'list'), ('upvotes', 'upvotes'))]
+
+    def test_card_changes_evict_rows_not_the_list_version(self):
+        issue = self.issues[0]
+        self.list_cards()
+        self.list_cards(sort='upvotes')
+        list_version, upvote_version = self.versions()
+
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('issues:toggle_upvote_issue', kwargs={'pk': issue.pk}))
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(issue=issue, user=self.user, comment_text='Still there.')
+        self.assertEqual(self.versions()[0], list_version)
+        self.assertNotEqual(self.versions()[1], upvote_version)  # Votes reorder the pages sorted by upvotes
+        self.assertEqual(self.list_cards()[issue.pk], (1, 1, 'Reported'))
+        self.assertEqual(self.list_cards(sort='upvotes')[issue.pk], (1, 1, 'Reported'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            issue.status = 'Resolved'
+            issue.save(update_fields=['status'])
+        self.assertNotEqual(self.versions()[0], list_version)
+        self.assertEqual(self.list_cards()[issue.pk], (1, 1, 'Resolved'))
+
+    def test_rows_read_before_a_change_are_not_stored(self):
+        params = {'sort': 'newest', 'page': '1'}
+        issue = Issue.objects.get(pk=self.issues[0].pk)
+        stale_version = list_cache.current_version(params)
+        with self.captureOnCommitCallbacks(execute=True):
+            list_cache.invalidate_rows([issue.pk])
+        list_cache.store_page(stale_version, params, {}, [issue])
+        self.assertIsNone(list_cache.get_page(list_cache.current_version(params), params))
+
+        list_cache.store_page(list_cache.current_version(params), params, {}, [issue])
+        self.assertIsNotNone(list_cache.get_page(list_cache.current_version(params), params))
+
+
+class SystemCheckTests(TestCase):
+
+    def test_missing_municipal_area_file_is_reported(self):
+        from .checks import municipal_area_boundaries_check
+        with override_settings(MUNICIPAL_AREA_GEOJSON='/nonexistent/municipal_areas.geojson'):
+            self.assertEqual([w.id for w in municipal_area_boundaries_check(None)], ['issues.W001'])
+        with override_settings(MUNICIPAL_AREA_GEOJSON=''):
+            self.assertEqual(municipal_area_boundaries_check(None), [])
+
+
+class CircuitBreakerTests(TestCase):
+
+    def setUp(self):
+        geocoding._memory_cache.clear()
+        self.breaker = geocoding.CircuitBreaker('test', failure_threshold=1, reset_timeout=300)
+
+    def elapse(self, seconds):
+        CircuitBreakerState.objects.filter(name='test').update(opened_at=F('opened_at') - seconds)
+
+    def test_unexpected_error_in_the_trial_call_reopens_the_breaker(self):
+        self.breaker.record_failure()
+        self.elapse(301)
+        with mock.patch.object(geocoding, '_breaker', self.breaker), \
+                mock.patch.object(geocoding, 'reverse_geocode_nominatim', side_effect=TypeError('list body')):
+            with self.assertRaises(TypeError):
+                geocoding.cached_reverse_geocode(10.0, 76.3)
+        self.assertEqual(self.breaker.state, geocoding.CircuitBreaker.OPEN)
+
+    def test_a_trial_that_never_reports_back_is_given_up(self):
+        self.breaker.record_failure()
+        self.elapse(301)
+        self.assertTrue(self.breaker.allow_request())  # The trial call, which never finishes
+        self.assertFalse(self.breaker.allow_request())
+        self.elapse(301)
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, geocoding.CircuitBreaker.CLOSED)
+
+    def test_breaker_and_counters_are_shared_between_processes(self):
+        # Another process (the task worker) sees the same breaker and counters through the database
+        elsewhere = geocoding.CircuitBreaker('test', failure_threshold=1, reset_timeout=300)
+        self.breaker.record_failure()
+        self.assertFalse(elsewhere.allow_request())
+        self.assertEqual(elsewhere.snapshot()['state'], geocoding.CircuitBreaker.OPEN)
+
+        with mock.patch.object(geocoding, 'reverse_geocode_nominatim', return_value='Kaloor'):
+            geocoding.cached_reverse_geocode(10.0, 76.3)
+            geocoding.cached_reverse_geocode(10.0, 76.3)
+        geocoding._memory_cache.clear()  # As in a freshly started process
+        geocoding.cached_reverse_geocode(10.0, 76.3)
+        stats = geocoding.geocoder_stats()
+        self.assertEqual((stats['api_calls'], stats['memory_hits'], stats['db_hits']), (1, 1, 1))
+        self.assertEqual(stats['breaker']['state'], geocoding.CircuitBreaker.CLOSED)
+
+    def test_non_object_response_is_a_value_error(self):
+        response = mock.Mock(**{'json.return_value': [], 'raise_for_status.return_value': None})
+        with mock.patch.object(geocoding.requests, 'get', return_value=response):
+            with self.assertRaises(ValueError):
+                geocoding.reverse_geocode_nominatim(10.0, 76.3)
+
+
+class BudgetReportTests(TestCase):
+
+    def test_normalize_sql_groups_repeated_statements(self):
+        first = normalize_sql('SELECT * FROM "issues_issueimage" WHERE "issue_id" = 12 AND "name" = \'a\'\'b\' LIMIT 1')
+        second = normalize_sql('SELECT * FROM "issues_issueimage" WHERE "issue_id" = 907 AND "name" = \'c\' LIMIT 1')
+        self.assertEqual(first, second)
+        self.assertEqual(normalize_sql('SELECT 1 FROM t WHERE id IN (1, 2, 3)'), normalize_sql('SELECT 1 FROM t WHERE id IN (4)'))
+
+    def test_report_lists_duplicates_only_when_over_budget(self):
+        from .budgets import QueryBudget
+        queries = [{'sql': f'SELECT * FROM "issues_comment" WHERE "issue_id" = {n}', 'time': '0.001'} for n in range(4)]
+        queries.append({'sql': 'SELECT COUNT(*) FROM "issues_issue"', 'time': '0.001'})
+        self.assertEqual(budget_report(QueryBudget(5), queries), '')
+        report = budget_report(QueryBudget(3), queries)
+        self.assertIn('5 queries (budget 3)', report)
+        self.assertIn('4x SELECT * FROM "issues_comment"', report)
+        self.assertEqual(len(duplicate_queries(queries)), 1)
+        self.assertEqual(budget_report(QueryBudget(10, sql_ms=1), queries), '')  # Time is opt-in
+        self.assertIn('ms of SQL', budget_report(QueryBudget(10, sql_ms=1), queries, check_time=True))
+        with override_settings(QUERY_BUDGET_CHECK_SQL_TIME=True):
+            self.assertIn('ms of SQL', budget_report(QueryBudget(10, sql_ms=1), queries))
@@ -0,0 +1,107 @@
+# issues/thumbnails.py
+"""
+Resized copies ("derivatives") of uploaded issue and resolution images.
+
+Every original gets a small cropped thumbnail for list cards and the admin
+and a mid-size copy for the detail page, encoded as WebP (JPEG if Pillow was
+built without WebP, or when IMAGE_DERIVATIVE_FORMAT = 'JPEG'). They are
+stored next to the original with the size in the name:
+
+    issue_images/pothole.jpg  ->  issue_images/pothole.thumb.webp
+                                  issue_images/pothole.medium.webp
+
+New uploads are processed by the generate_image_derivatives task (queued from
+signals.py). derivative_url() falls back to the original for images that have
+no derivatives (uploaded before this existed, or an original that can't be
+decoded); it never queues work itself, since a page view must not write.
+`python manage.py generate_image_derivatives` fills in the missing ones.
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# name: (width, height, crop to fill the box exactly)
+SIZES = {
+    'thumb': (640, 400, True),
+    'medium': (1280, 1280, False),
+}
+QUALITY = 80
+
+
+def derivative_format():
+    wanted = getattr(settings, 'IMAGE_DERIVATIVE_FORMAT', 'WEBP').upper()
+    if wanted == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return wanted
+
+
+def derivative_name(name, size):
+    root, _ext = os.path.splitext(name)
+    extension = 'webp' if derivative_format() == 'WEBP' else 'jpg'
+    return f"{root}.{size}.{extension}"
+
+
+def derivative_url(field_file, size):
+    """URL of the `size` derivative of an image field, or of the original when it doesn't exist."""
+    if not field_file:
+        return ''
+    name = derivative_name(field_file.name, size)
+    if field_file.storage.exists(name):
+        return field_file.storage.url(name)
+    return field_file.url
+
+
+def _resize(image, size):
+    width, height, crop = SIZES[size]
+    if crop:
+        # Keep the aspect ratio of the box but don't enlarge small images
+        scale = min(1, image.width / width, image.height / height)
+        box = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return ImageOps.fit(image, box, Image.Resampling.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.Resampling.LANCZOS)  # Never enlarges
+    return resized
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+    elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+    output = io.BytesIO()
+    image.save(output, image_format, quality=QUALITY, optimize=image_format == 'JPEG')
+    return output.getvalue()
+
+
+def generate(name, storage=default_storage, overwrite=False):
+    """Write the missing derivatives of the stored image `name`. Returns how many were written."""
+    targets = {size: derivative_name(name, size) for size in SIZES}
+    if not overwrite:
+        targets = {size: target for size, target in targets.items() if not storage.exists(target)}
+    if not targets:
+        return 0
+
+    image_format = derivative_format()
+    with storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        # Let the JPEG decoder downscale while decoding; much faster for phone photos
+        largest = max(max(SIZES[size][:2]) for size in targets)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+
+    for size, target in targets.items():
+        data = _encode(_resize(image, size), image_format)
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(data))
+    return len(targets)
@@ -0,0 +1,94 @@
+# issues/uploads.py
+"""
+Upload-time normalization of issue and resolution images.
+
+Phone photos arrive as 12+ megapixel JPEGs carrying EXIF (GPS, camera
+details) and an orientation flag. Before anything is stored we:
+
+    * apply the EXIF orientation to the pixels,
+    * downscale so neither side exceeds UPLOAD_IMAGE_MAX_DIMENSION,
+    * drop EXIF/XMP and other metadata (the ICC colour profile is kept),
+    * re-encode: JPEG (progressive, UPLOAD_IMAGE_QUALITY) for photos,
+      optimized PNG for images with transparency.
+
+normalize_images() processes all files of one submission concurrently on a
+shared pool of UPLOAD_IMAGE_WORKERS threads (Pillow releases the GIL while
+decoding, resizing and encoding), so the pool also caps how much CPU image
+uploads can take across simultaneous requests.
+"""
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'UPLOAD_IMAGE_WORKERS', 4),
+                thread_name_prefix='image-upload',
+            )
+    return _executor
+
+
+def normalize_image(uploaded_file):
+    """Return a ContentFile with the normalized image. Raises InvalidImage if it isn't one."""
+    max_dimension = getattr(settings, 'UPLOAD_IMAGE_MAX_DIMENSION', 2560)
+    quality = getattr(settings, 'UPLOAD_IMAGE_QUALITY', 85)
+
+    try:
+        uploaded_file.seek(0)
+        image = Image.open(uploaded_file)
+        icc_profile = image.info.get('icc_profile')
+        image.draft('RGB', (max_dimension, max_dimension))  # JPEG: decode at reduced scale when possible
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise InvalidImage(f"{uploaded_file.name} is not a readable image.")
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        if image.mode == 'CMYK':
+            icc_profile = None  # Describes the CMYK data, not the converted RGB
+        image = image.convert('RGBA' if has_alpha else 'RGB')  # Palette/CMYK/16-bit: resample in a true-colour mode
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)  # Never enlarges
+
+    stem = os.path.splitext(os.path.basename(uploaded_file.name))[0] or 'image'
+    options = {'icc_profile': icc_profile} if icc_profile else {}
+    output = io.BytesIO()
+    if has_alpha:
+        image.save(output, 'PNG', optimize=True, **options)
+        name = f"{stem}.png"
+    else:
+        image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True, **options)
+        name = f"{stem}.jpg"
+    return ContentFile(output.getvalue(), name=name)
+
+
+def normalize_images(uploaded_files):
+    """
+    Normalize several uploads in parallel. Returns (images, errors): the
+    ContentFiles in upload order and a message for each file that was skipped.
+    """
+    if not uploaded_files:
+        return [], []
+    futures = [_get_executor().submit(normalize_image, f) for f in uploaded_files]
+    images, errors = [], []
+    for future in futures:
+        try:
+            images.append(future.result())
+        except InvalidImage as e:
+            errors.append(str(e))
+    return images, errors
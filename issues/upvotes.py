@@ -0,0 +1,64 @@
+# issues/upvotes.py
+"""
+Upvote writes.
+
+The Upvote table is the source of truth; Issue.upvotes_count is a denormalised
+counter for sorting and display. A vote inserts/deletes its Upvote row and
+bumps the counter with a single `UPDATE ... SET upvotes_count = upvotes_count + 1`,
+so concurrent votes never lose updates and no Issue.save() (and no save
+signal) is involved. reconcile_upvote_counts() recomputes the counters from the
+Upvote table in bulk, to repair any drift (e.g. rows removed by hand), and
+drops the cached pages that showed the wrong counts.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from . import list_cache, page_cache
+from .models import Issue, Upvote
+
+
+def toggle_upvote(issue_id, user):
+    """Add the user's vote, or remove it if they already voted. Returns (upvoted, upvotes_count)."""
+    with transaction.atomic():
+        try:
+            with transaction.atomic():  # Savepoint: the duplicate insert must not break the outer transaction
+                Upvote.objects.create(user=user, issue_id=issue_id)
+            delta, upvoted = 1, True
+        except IntegrityError:  # (user, issue) combination already exists, so remove the vote
+            deleted, _ = Upvote.objects.filter(user=user, issue_id=issue_id).delete()
+            delta, upvoted = -deleted, False
+        counter = Issue.objects.filter(pk=issue_id)
+        if delta:
+            counter.update(upvotes_count=Greatest(F('upvotes_count') + delta, Value(0)))
+        count = counter.values_list('upvotes_count', flat=True).first() or 0
+    return upvoted, count
+
+
+def reconcile_upvote_counts(issue_ids=None):
+    """
+    Set upvotes_count to the real number of Upvote rows for every issue whose
+    counter has drifted (optionally only `issue_ids`). Returns the number fixed.
+    A queryset update sends no signals, so the caches are invalidated here.
+    """
+    actual = Coalesce(
+        Subquery(
+            Upvote.objects.filter(issue=OuterRef('pk')).order_by()
+            .values('issue').annotate(total=Count('pk')).values('total')[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+    issues = Issue.objects.all()
+    if issue_ids is not None:
+        issues = issues.filter(pk__in=issue_ids)
+    with transaction.atomic():
+        drifted = list(
+            issues.annotate(actual_upvotes=actual).filter(~Q(upvotes_count=F('actual_upvotes')))
+            .values_list('pk', flat=True)
+        )
+        # Recomputed in the UPDATE itself, so votes cast since the SELECT are counted too
+        Issue.objects.filter(pk__in=drifted).update(upvotes_count=actual)
+        page_cache.invalidate_issues(drifted)
+        list_cache.issues_changed(drifted, ['upvotes_count'])
+    return len(drifted)
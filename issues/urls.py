@@ -9,11 +9,18 @@ urlpatterns = [
     path('report/', views.report_issue, name='report_issue'),
     path('<int:pk>/', views.issue_detail, name='issue_detail'),
     path('', views.IssueListView.as_view(), name='issue_list'), # For all issues
+    path('map-data/', views.issue_map_data, name='issue_map_data'), # Clustered GeoJSON for the map
     path('my-issues/', views.my_reported_issues, name='my_reported_issues'), # For user's issues
     path('<int:pk>/upvote/', views.toggle_upvote_issue, name='toggle_upvote_issue'),
     # Add your issue-related URL patterns here as you build them
      # --- NEW URL for Admin Dashboard ---
     path('dashboard/admin/', views.admin_dashboard, name='admin_dashboard'),
     path('dashboard/manager/', views.manager_dashboard, name='manager_dashboard'), # NEW URL
+    path('dashboard/trends/', views.issue_trends, name='issue_trends'),
+    path('dashboard/trends/data/', views.issue_trends_data, name='issue_trends_data'), # JSON for the charts
     path('reports/generate/', views.generate_issue_report, name='generate_issue_report'),
+    path('reports/<int:pk>/', views.report_job_detail, name='report_job_detail'),
+    path('reports/<int:pk>/status/', views.report_job_status, name='report_job_status'), # Polled while rendering
+    path('reports/<int:pk>/download/', views.report_job_download, name='report_job_download'),
+    path('reports/export/', views.export_issues, name='export_issues'), # Streaming CSV/JSONL
 ]
\ No newline at end of file
@@ -0,0 +1,72 @@
+# issues/viewer_state.py
+"""
+Batched per-viewer state for lists of issues.
+
+Issue cards used to ask each issue for its upvote status and first image,
+which costs one or two queries per card. attach_viewer_state() resolves the
+same information for a whole page in a constant number of queries and stores
+it on each issue as plain attributes the templates can read:
+
+    issue.viewer_has_upvoted  -> bool
+    issue.cover_image         -> IssueImage or None (same image as images.first)
+    issue.comment_count       -> int
+
+attach_card_state() and attach_upvote_state() do the viewer-independent and
+the per-viewer half separately, for callers that cache the former.
+"""
+from django.db.models import Count, Min
+
+from .models import Comment, IssueImage, Upvote
+
+
+def attach_viewer_state(issues, user):
+    """
+    Annotate an iterable of issues for `user` (may be anonymous).
+    Returns the issues as a list. Costs at most three queries in total.
+    """
+    issues = attach_card_state(issues)
+    attach_upvote_state(issues, user)
+    return issues
+
+
+def attach_card_state(issues):
+    """
+    Set cover_image and comment_count, the parts that are the same for every
+    viewer (the issue list caches issues with these attached). Two queries.
+    """
+    issues = list(issues)
+    issue_ids = [issue.pk for issue in issues]
+    if not issue_ids:
+        return issues
+
+    # images.first() orders by pk, so the lowest image pk per issue is the cover
+    first_image_ids = (
+        IssueImage.objects.filter(issue_id__in=issue_ids)
+        .values('issue_id').annotate(first_pk=Min('pk')).values('first_pk')
+    )
+    cover_images = {image.issue_id: image for image in IssueImage.objects.filter(pk__in=first_image_ids)}
+
+    comment_counts = dict(
+        Comment.objects.filter(issue_id__in=issue_ids)
+        .values('issue_id').annotate(total=Count('pk')).values_list('issue_id', 'total')
+        .order_by()
+    )
+
+    for issue in issues:
+        issue.cover_image = cover_images.get(issue.pk)
+        issue.comment_count = comment_counts.get(issue.pk, 0)
+    return issues
+
+
+def attach_upvote_state(issues, user):
+    """Set viewer_has_upvoted for `user`. One query, none for anonymous visitors."""
+    issues = list(issues)
+    upvoted_ids = set()
+    if issues and user is not None and user.is_authenticated:
+        upvoted_ids = set(
+            Upvote.objects.filter(user=user, issue_id__in=[issue.pk for issue in issues])
+            .values_list('issue_id', flat=True)
+        )
+    for issue in issues:
+        issue.viewer_has_upvoted = issue.pk in upvoted_ids
+    return issues
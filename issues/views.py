@@ -2,33 +2,57 @@ from django.views.generic import ListView
 from django.contrib.admin.views.decorators import staff_member_required # For restricting access
 from django.db.models import Count
 from django.http import JsonResponse # For AJAX responses if you go that route later
-from django.db import IntegrityError
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required,user_passes_test # For function-based views
 from django.contrib import messages
 from django.contrib.auth import get_user_model # To get the active User model
-from .models import Issue, Comment, IssueCategory, IssueImage  # Your models
+from .models import Issue, Comment, IssueCategory, IssueImage, IssueMapCell, ReportJob  # Your models
 from django.utils.http import urlencode # For safely building query strings
 from .forms import CommentForm, ManagerIssueUpdateForm # Import CommentForm
 from .forms import IssueForm # The form we just created
-from .models import Upvote # Import Upvote model
 from django.db.models import Q # Import Q objects for OR queries
 from django.urls import reverse # For generating admin URLs
-from django.db.models import Case, When, Value, IntegerField 
-from django.http import HttpResponse
-from django.template.loader import render_to_string
-from weasyprint import HTML
+from django.http import FileResponse, StreamingHttpResponse
 from .forms import ReportGenerationForm # Import the new form
-import datetime
+from .forms import TrendFilterForm
+from .forms import IssueExportForm
+from . import search # Full-text search helpers
+from . import duplicates # Near-duplicate detection
+from . import geocoding # Reverse geocoding cache/breaker stats for the dashboard
+from . import upvotes # Atomic upvote toggling
+from . import stats # Materialized dashboard counters
+from . import rollup # Daily time-series rollup for the trend charts
+from . import reports # Background PDF report jobs
+from . import export # Streaming CSV/JSONL export
+from . import uploads # Upload-time image normalization
+from . import page_cache # Versioned fragment cache for the detail page
+from .pagination import KeysetPaginator, KeysetPage, InvalidCursor # Cursor pagination for the issue list
+from django.conf import settings
+from django.http import Http404
+from django.core.cache import cache
+from . import clustering # Server-side map marker clustering
+from .budgets import QueryBudget, query_budget # Per-view SQL budgets, enforced by issues/tests.py
+from .viewer_state import attach_viewer_state, attach_card_state, attach_upvote_state # Batched upvote/image/comment lookups for lists
+from . import list_cache # Cached page id lists for the issue list
+from django.utils import timezone
 
 # (Any existing views like temp_report_issue_placeholder can be removed or commented out)
 User = get_user_model()
 
 @login_required # Ensures only logged-in users can access this view
+@query_budget(queries=40, sql_ms=100)
 def report_issue(request):
     if request.method == 'POST':
         form = IssueForm(request.POST, request.FILES) # request.FILES is for image uploads
-        if form.is_valid():
+        # --- Before saving, point the citizen at open reports that look like the same problem ---
+        # They can upvote one of those instead, or submit again to report it anyway.
+        similar_issues = []
+        if form.is_valid() and not request.POST.get('not_a_duplicate'):
+            similar_issues = duplicates.find_duplicate_candidates(
+                form.cleaned_data['title'], form.cleaned_data['description'], form.cleaned_data['category'].pk,
+                form.cleaned_data['latitude'], form.cleaned_data['longitude'], limit=3,
+            )
+        if form.is_valid() and not similar_issues:
             issue = form.save(commit=False) # Create Issue instance but don't save to DB yet
             issue.user = request.user # Assign the currently logged-in user
 
@@ -38,31 +62,44 @@ def report_issue(request):
             # The upvotes_count defaults to 0 as per the model definition.
             # The reported_date defaults to timezone.now as per the model definition.
 
+            # Rotate, downscale and strip the uploaded photos in parallel (issues/uploads.py)
+            images, image_errors = uploads.normalize_images(request.FILES.getlist('images')) # 'images' is the name of our file input
+
             issue.save() # Now save the issue to the database
 
             # --- NEW: Handle Multiple Image Uploads ---
-            images = request.FILES.getlist('images') # 'images' is the name of our file input
             for image_file in images:
                 IssueImage.objects.create(issue=issue, image=image_file)
+            for error in image_errors:
+                messages.warning(request, f"An image was skipped: {error}")
 
             messages.success(request, 'Your issue has been reported successfully! Thank you for your contribution.')
+
             # Redirect to a new URL: to the detail page of the new issue (we'll create this view later)
             # For now, let's redirect to the homepage.
             # Replace 'home' with 'issues:issue_detail' and pass issue.pk when detail view is ready
             return redirect('home') # Or: return redirect('issues:issue_detail', pk=issue.pk)
     else: # GET request
         form = IssueForm()
+        similar_issues = []
 
     context = {
         'form': form,
+        'similar_issues': similar_issues,
         'page_title': 'Report a New Civic Issue'
     }
     return render(request, 'issues/report_issue.html', context)
 
 
+@query_budget(queries=8, sql_ms=100)
 def issue_detail(request, pk):
-    issue = get_object_or_404(Issue, pk=pk)
-    comments = issue.comments.all().order_by('created_at') # Or '-created_at'
+    # The shared parts of the page are cached per issue version (issues/page_cache.py).
+    # The version is read before the issue so a concurrent change can't be cached under it.
+    issue_version = page_cache.issue_version(pk)
+    issue = get_object_or_404(Issue.objects.select_related('category', 'user'), pk=pk)
+    # Lazy: only evaluated when the template renders a fragment that isn't cached
+    images = issue.images.all()
+    comments = issue.comments.select_related('user').order_by('created_at') # Or '-created_at'
 
     # Determine if the current user is the assigned manager for this issue
     is_assigned_manager = (request.user.is_authenticated and 
@@ -114,7 +151,11 @@ def issue_detail(request, pk):
 
     context = {
         'issue': issue,
+        'images': images,
         'comments': comments,
+        'issue_version': issue_version,
+        'fragment_timeout': page_cache.fragment_timeout(),
+        'fragment_cache': page_cache.cache_alias(),
         'comment_form': comment_form,
         'manager_form': manager_form, # Pass manager_form to context
         'is_assigned_manager': is_assigned_manager, # Pass flag to template
@@ -124,43 +165,146 @@ def issue_detail(request, pk):
 
 
 
+def filter_issues_by_params(queryset, params):
+    """Applies the list page's category/status filters (shared with the map endpoint and its IssueMapCell rows)."""
+    category_filter_name = params.get('category', None)
+    status_filter = params.get('status', None)
+    if category_filter_name:
+        queryset = queryset.filter(category__name=category_filter_name)
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+    return queryset
+
+
 # display a list of all reported issues
 class IssueListView(ListView):
     model = Issue
     template_name = 'issues/issue_list.html'
     context_object_name = 'issues'
     paginate_by = 10
+    query_budget = QueryBudget(queries=10, sql_ms=100)
     # ordering = ['-reported_date']
 
     def get_queryset(self):
-        queryset = super().get_queryset().select_related('user', 'category')  # Optimize DB queries
+        # Cards show the category but not the reporter; the rows are also what the list cache stores
+        queryset = super().get_queryset().select_related('category')  # Optimize DB queries
 
         # --- Filtering and Search ---
-        category_filter_name = self.request.GET.get('category', None)
-        status_filter = self.request.GET.get('status', None)
+        queryset = filter_issues_by_params(queryset, self.request.GET)
         search_query = self.request.GET.get('q', None)
-
-        if category_filter_name:
-            queryset = queryset.filter(category__name=category_filter_name)
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
+        ranked = False
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) | 
-                Q(description__icontains=search_query)
-            )
+            # Uses the FTS5 index when available, icontains otherwise (see issues/search.py)
+            queryset, ranked = search.search_issues(queryset, search_query)
+        self.search_ranked = ranked  # Text with no searchable words (e.g. '!!!') is filtered but not ranked
 
         # --- Dynamic Sorting ---
-        sort_option = self.request.GET.get('sort', 'newest')  # Default to 'newest'
-        if sort_option == 'upvotes':
-            queryset = queryset.order_by('-upvotes_count', '-reported_date')
+        sort_option = self.get_sort_option(ranked)
+        # Every ordering ends with pk so rows have a unique position (needed for cursor pagination)
+        if sort_option == 'relevance' and ranked:
+            queryset = queryset.order_by('search_rank', '-reported_date', '-pk')
+        elif sort_option == 'upvotes':
+            queryset = queryset.order_by('-upvotes_count', '-reported_date', '-pk')
         elif sort_option == 'oldest':
-            queryset = queryset.order_by('reported_date')
+            queryset = queryset.order_by('reported_date', 'pk')
         else:
-            queryset = queryset.order_by('-reported_date')  # Default fallback
+            queryset = queryset.order_by('-reported_date', '-pk')  # Default fallback
 
         return queryset
 
+    def get_pagination_mode(self):
+        # Old ?page= links keep working; everything else follows the ISSUE_LIST_PAGINATION setting
+        if 'cursor' in self.request.GET:
+            return 'cursor'
+        if 'page' in self.request.GET:
+            return 'offset'
+        return getattr(settings, 'ISSUE_LIST_PAGINATION', 'offset')
+
+    def get_cache_params(self, page_size):
+        """
+        The request, normalized, as the list cache key (issues/list_cache.py).
+        None for searches: free text is too varied to be worth caching.
+        """
+        if self.request.GET.get('q'):
+            return None
+        mode = self.get_pagination_mode()
+        sort = self.get_sort_option()
+        params = {
+            'category': self.request.GET.get('category') or '',
+            'status': self.request.GET.get('status') or '',
+            'sort': sort if sort in ('upvotes', 'oldest') else 'newest',  # Anything else sorts as newest
+            'mode': mode,
+            'per_page': page_size,
+        }
+        if mode == 'cursor':
+            params['cursor'] = self.request.GET.get('cursor') or ''
+        else:
+            params['page'] = (self.request.GET.get('page') or '1').strip()
+        return params
+
+    def paginate_queryset(self, queryset, page_size):
+        cache_params = self.get_cache_params(page_size)
+        if cache_params is None:
+            return self.paginate_from_database(queryset, page_size)
+
+        # Read the version before the database so a concurrent write can't be cached under it
+        version = list_cache.current_version(cache_params)
+        cached = list_cache.get_page(version, cache_params)
+        if cached is not None:
+            return self.paginate_from_cache(queryset, page_size, *cached)
+
+        paginator, page, issues, is_paginated = self.paginate_from_database(queryset, page_size)
+        if self.get_pagination_mode() == 'cursor':
+            page_info = {
+                'next_cursor': page.next_cursor,
+                'previous_cursor': page.previous_cursor,
+                'approximate_total': page.approximate_total,
+            }
+        else:
+            page_info = {'number': page.number, 'count': paginator.count}
+        list_cache.store_page(version, cache_params, page_info, issues)
+        return paginator, page, issues, is_paginated
+
+    def paginate_from_database(self, queryset, page_size):
+        if self.get_pagination_mode() != 'cursor':
+            paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        else:
+            paginator = KeysetPaginator(
+                queryset, page_size,
+                with_total=getattr(settings, 'ISSUE_LIST_APPROXIMATE_TOTAL', False)
+            )
+            try:
+                page = paginator.page(self.request.GET.get('cursor') or None)
+            except InvalidCursor as e:
+                raise Http404(str(e))
+            is_paginated = page.has_other_pages()
+        # Cover image and comment count for the whole page in 2 queries
+        page.object_list = attach_card_state(page.object_list)
+        return paginator, page, page.object_list, is_paginated
+
+    def paginate_from_cache(self, queryset, page_size, page_info, issues):
+        """Rebuild the paginator and page from a list cache entry, without any query."""
+        if self.get_pagination_mode() == 'cursor':
+            paginator = KeysetPaginator(queryset, page_size)
+            page = KeysetPage(
+                issues, page_info['next_cursor'], page_info['previous_cursor'], page_info['approximate_total']
+            )
+        else:
+            paginator = self.get_paginator(
+                queryset, page_size, orphans=self.get_paginate_orphans(),
+                allow_empty_first_page=self.get_allow_empty(),
+            )
+            paginator.count = page_info['count']  # Overrides the cached_property, so no COUNT query
+            page = paginator.page(page_info['number'])
+            page.object_list = issues
+        return paginator, page, issues, page.has_other_pages()
+
+    def get_sort_option(self, ranked=False):
+        # Search results are ordered by relevance unless the user picked a sort
+        default_sort = 'relevance' if ranked else 'newest'
+        sort = self.request.GET.get('sort', default_sort)
+        return 'newest' if sort == 'relevance' and not ranked else sort  # Unranked results are sorted by date
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
@@ -172,25 +316,59 @@ class IssueListView(ListView):
             context['page_title'] = "All Reported Civic Issues"
         context['search_query'] = search_query
 
-        # Map marker data (based on paginated results)
-        issues_data_list = list(self.object_list.values(
-            'pk', 'title', 'latitude', 'longitude', 'status'
-        ))
-        context['all_issues_for_map_data'] = issues_data_list
+        # The map loads its markers from issue_map_data for the visible viewport
+        context['map_data_url'] = reverse('issues:issue_map_data')
+
+        # Cover image and comment count are attached while paginating; the upvoted flag is per viewer
+        page_issues = attach_upvote_state(context['issues'], self.request.user)
+        context['issues'] = context['object_list'] = page_issues
+        if context.get('page_obj') is not None:
+            context['page_obj'].object_list = page_issues
 
         # Support UI filters
         context['categories'] = IssueCategory.objects.all()
-        context['current_sort'] = self.request.GET.get('sort', 'newest')
+        context['current_sort'] = self.get_sort_option(ranked=self.search_ranked)
+        context['pagination_mode'] = self.get_pagination_mode()
 
         return context
 
 
 
 
+@query_budget(queries=4, sql_ms=100)
+def issue_map_data(request):
+    """
+    GeoJSON for the issue map: ?bbox=west,south,east,north&zoom=N plus the
+    list page's category/status filters. Issues are clustered server-side
+    (see issues/clustering.py) so the whole city fits in one small response.
+    """
+    try:
+        bbox = clustering.parse_bbox(request.GET.get('bbox'))
+        zoom = clustering.clamp_zoom(request.GET.get('zoom', 12))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    # Keyed by the snapped viewport, so panning within the same cells is a cache hit
+    cells = clustering.snap_viewport(bbox, zoom)
+    filters = sorted((key, value) for key, value in request.GET.items() if key in ('category', 'status') and value)
+    cache_key = f"issue_map:{zoom}:{':'.join(map(str, cells))}:{urlencode(filters)}"
+    data = cache.get(cache_key)
+    if data is None:
+        data = clustering.cluster_issues(
+            filter_issues_by_params(Issue.objects.all(), request.GET),
+            filter_issues_by_params(IssueMapCell.objects.all(), request.GET),
+            cells, zoom,
+        )
+        cache.set(cache_key, data, getattr(settings, 'ISSUE_MAP_CACHE_TIMEOUT', 60))
+    return JsonResponse(data)
+
+
 # You might also want a view for "My Reported Issues" for logged-in users
 @login_required
+@query_budget(queries=8, sql_ms=100)
 def my_reported_issues(request):
-    issues = Issue.objects.filter(user=request.user).order_by('-reported_date')
+    issues = Issue.objects.filter(user=request.user).select_related('category').order_by('-reported_date')
+    issues = attach_viewer_state(issues, request.user)
     context = {
         'issues': issues,
         'page_title': "My Reported Issues"
@@ -200,27 +378,14 @@ def my_reported_issues(request):
 
 
 @login_required
+@query_budget(queries=15, sql_ms=100)
 def toggle_upvote_issue(request, pk):
-    issue = get_object_or_404(Issue, pk=pk)
-    upvoted = False
-    try:
-        # Try to create an upvote
-        Upvote.objects.create(user=request.user, issue=issue)
-        issue.upvotes_count += 1
-        upvoted = True
-    except IntegrityError: # (user, issue) combination already exists, so it's a duplicate
-        # User has already upvoted, so remove the upvote (toggle)
-        Upvote.objects.filter(user=request.user, issue=issue).delete()
-        issue.upvotes_count -= 1
-        # Ensure count doesn't go below zero, though it shouldn't with this logic
-        if issue.upvotes_count < 0:
-            issue.upvotes_count = 0
-        upvoted = False
-
-    issue.save(update_fields=['upvotes_count']) # Efficiently update only this field
+    issue = get_object_or_404(Issue.objects.only('pk'), pk=pk)
+    # Atomic counter update; no Issue.save() and no save signals (see issues/upvotes.py)
+    upvoted, upvotes_count = upvotes.toggle_upvote(issue.pk, request.user)
 
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest': # For AJAX calls
-        return JsonResponse({'upvoted': upvoted, 'count': issue.upvotes_count})
+        return JsonResponse({'upvoted': upvoted, 'count': upvotes_count})
 
     # For non-AJAX, redirect back to the issue detail page or where the user came from
     # Using HTTP_REFERER is common but can be unreliable.
@@ -230,73 +395,93 @@ def toggle_upvote_issue(request, pk):
 
 
 @staff_member_required
+@query_budget(queries=6, sql_ms=100)
 def admin_dashboard(request):
-    # --- Basic Stats ---
-    total_issues = Issue.objects.count()
-    total_users = User.objects.count()
-    recently_reported_issues = Issue.objects.order_by('-reported_date')[:5]
-    total_categories = IssueCategory.objects.count()
+    # --- All counters come from the materialized IssueStat table in one query (see issues/stats.py) ---
+    counters = stats.get_stats()
+    recently_reported_issues = Issue.objects.select_related('user').order_by('-reported_date')[:5]
 
     # --- Issues by Status Breakdown (for the list view) ---
-    issues_by_status_map = {
-        item['status']: item['count'] 
-        for item in Issue.objects.values('status').annotate(count=Count('status'))
-    }
     issues_by_status_display = {
-        status_display: issues_by_status_map.get(status_key, 0)
+        status_display: counters.get(f'status:{status_key}', 0)
         for status_key, status_display in Issue.STATUS_CHOICES
     }
 
     # --- Unassigned Issues Count ---
-    ready_for_assignment_status_key = 'Verified'
-    unassigned_issues_query = Q(assigned_to_manager__isnull=True) & Q(status=ready_for_assignment_status_key)
-    unassigned_issues_count = Issue.objects.filter(unassigned_issues_query).count()
     admin_filter_params = {
         'assigned_to_manager__isnull': 'True',
-        'status__exact': ready_for_assignment_status_key
+        'status__exact': stats.READY_FOR_ASSIGNMENT_STATUS
     }
     unassigned_issues_admin_url = reverse('admin:issues_issue_changelist') + '?' + urlencode(admin_filter_params)
 
-    # --- Pending and Resolved Counts ---
-    final_statuses = ['Resolved', 'Closed-No Action', 'Invalid', 'Duplicate']
-    pending_issues_count = Issue.objects.exclude(status__in=final_statuses).count()
-    resolved_issues_count = Issue.objects.filter(status='Resolved').count()
-
-    # --- FIX: ADDED HIGH PRIORITY COUNT CALCULATION ---
-    # This counts issues with priority 'High' that are not in a final/closed state.
-    high_priority_open_issues_count = Issue.objects.filter(
-        priority='High'
-    ).exclude(status__in=final_statuses).count()
-    
-    # --- Optional: Count for issues needing assistance ---
-    issues_requiring_assistance_count = Issue.objects.filter(status='Requires Assistance').count()
-
-
     context = {
         'page_title': 'Admin Dashboard',
-        'total_issues': total_issues,
-        'total_users': total_users,
+        'total_issues': counters.get('total', 0),
+        'total_users': counters.get('users', 0),
         'recently_reported_issues': recently_reported_issues,
-        'total_categories': total_categories,
+        'total_categories': counters.get('categories', 0),
         'issues_by_status_display': issues_by_status_display,
-        'unassigned_issues_count': unassigned_issues_count,
+        'unassigned_issues_count': counters.get('unassigned_verified', 0),
         'unassigned_issues_admin_url': unassigned_issues_admin_url,
-        'pending_issues_count': pending_issues_count,
-        'resolved_issues_count': resolved_issues_count,
-        'high_priority_open_issues_count': high_priority_open_issues_count, # ADDED TO CONTEXT
-        'issues_requiring_assistance_count': issues_requiring_assistance_count, # ADDED TO CONTEXT
+        'pending_issues_count': counters.get('open', 0),
+        'resolved_issues_count': counters.get('status:Resolved', 0),
+        'high_priority_open_issues_count': counters.get('high_priority_open', 0),
+        'issues_requiring_assistance_count': counters.get('status:Requires Assistance', 0),
+        'geocoder_stats': geocoding.geocoder_stats(), # Nominatim cache hit rate + circuit breaker state
+        'list_cache_stats': list_cache.list_cache_stats(), # Issue list result cache hit rate
     }
     return render(request, 'issues/admin_dashboard.html', context)
 
 
 
 
+def _trend_data(form):
+    filters = {
+        'category_id': form.cleaned_data['category'].pk if form.cleaned_data['category'] else None,
+        'municipal_area': form.cleaned_data['municipal_area'] or None,
+    }
+    start_date, end_date = form.cleaned_data['start_date'], form.cleaned_data['end_date']
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'series': rollup.daily_series(start_date, end_date, status=form.cleaned_data['status'] or None, **filters),
+        'by_status': rollup.status_breakdown(start_date, end_date, **filters),
+    }
+
+
+@staff_member_required
+@query_budget(queries=8, sql_ms=100)
+def issue_trends(request):
+    """Trend charts (new / resolved / backlog per day) read from the IssueDailyStats rollup."""
+    form = TrendFilterForm(request.GET)  # Every field is optional; no filters means the last 30 days
+    trend_data = _trend_data(form) if form.is_valid() else None
+    return render(request, 'issues/issue_trends.html', {
+        'page_title': 'Issue Trends',
+        'form': form,
+        'trend_data': trend_data,
+        'data_url': reverse('issues:issue_trends_data'),
+    })
+
+
+@staff_member_required
+@query_budget(queries=7, sql_ms=100)
+def issue_trends_data(request):
+    """JSON version of issue_trends, same GET parameters."""
+    form = TrendFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    return JsonResponse(_trend_data(form))
+
+
+
+
 # Helper function to check if the user is a Municipal Manager
 def is_manager(user):
     return user.is_authenticated and hasattr(user, 'is_municipal_manager') and user.is_municipal_manager()
 
 @login_required
 @user_passes_test(is_manager, login_url='home') # Redirect to home if not a manager. Or 'users:login'
+@query_budget(queries=8, sql_ms=100)
 def manager_dashboard(request):
     # Base queryset for issues assigned to the current manager that are not yet fully closed
     assigned_issues_base = Issue.objects.filter(
@@ -305,19 +490,10 @@ def manager_dashboard(request):
         status__in=['Resolved', 'Closed-No Action']
     )
 
-    # Annotate the queryset with a numeric order for priority
-    assigned_issues_annotated = assigned_issues_base.annotate(
-        priority_order=Case(
-            When(priority='High', then=Value(1)),    # High priority gets 1
-            When(priority='Medium', then=Value(2)), # Medium priority gets 2
-            When(priority='Low', then=Value(3)),     # Low priority gets 3
-            default=Value(4),                        # Any other/null priority gets 4
-            output_field=IntegerField(),             # Ensures the result is treated as an integer
-        )
-    )
-
-    # Now, order by the annotated field 'priority_order', then by 'reported_date'
-    assigned_issues = assigned_issues_annotated.order_by('priority_order', 'reported_date')
+    # Most urgent first (stored priority_rank), oldest first within a priority;
+    # served in this order by the issue_manager_queue_idx index
+    assigned_issues = assigned_issues_base.select_related('category').order_by('-priority_rank', 'reported_date', 'pk')
+    assigned_issues = attach_viewer_state(assigned_issues, request.user)
 
     context = {
         'page_title': 'My Assigned Issues',
@@ -331,47 +507,100 @@ def manager_dashboard(request):
 #report
 
 @staff_member_required
+@query_budget(queries=8, sql_ms=100)
 def generate_issue_report(request):
+    # The PDF is rendered by the task worker (issues/reports.py); identical
+    # requests over unchanged data are served from the stored copy.
     if request.method == 'POST':
         form = ReportGenerationForm(request.POST)
         if form.is_valid():
-            start_date = form.cleaned_data['start_date']
-            end_date = form.cleaned_data['end_date']
-            status = form.cleaned_data['status']
-
-            # Filter the issues based on the form data
-            issues_queryset = Issue.objects.filter(
-                reported_date__range=(start_date, end_date)
-            ).select_related('user', 'category', 'assigned_to_manager').order_by('reported_date')
-
-            if status: # If a specific status was chosen
-                issues_queryset = issues_queryset.filter(status=status)
-
-            # Context for the PDF template
-            context = {
-                'issues': issues_queryset,
-                'start_date': start_date,
-                'end_date': end_date,
-                'status_filter': dict(Issue.STATUS_CHOICES).get(status, 'All') if status else 'All',
-                'generated_at': datetime.datetime.now(),
-            }
-
-            # Render the HTML template to a string
-            html_string = render_to_string('reports/issue_report_pdf.html', context)
-
-            # Generate the PDF
-            html = HTML(string=html_string)
-            pdf = html.write_pdf()
-
-            # Create an HTTP response with the PDF
-            response = HttpResponse(pdf, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="CommunityWatch_Report_{start_date}_to_{end_date}.pdf"'
-
-            return response
+            job = reports.submit_report(
+                request.user,
+                form.cleaned_data['start_date'],
+                form.cleaned_data['end_date'],
+                form.cleaned_data['status'],
+            )
+            return redirect(job)
     else:
         form = ReportGenerationForm()
 
     return render(request, 'reports/report_generation_form.html', {
         'form': form,
-        'page_title': 'Generate Issue Report'
-    })
\ No newline at end of file
+        'page_title': 'Generate Issue Report',
+        'recent_jobs': ReportJob.objects.filter(requested_by=request.user)[:10],
+    })
+
+
+def _report_job_status(job):
+    return {
+        'id': job.pk,
+        'state': job.state,
+        'state_display': job.get_state_display(),
+        'error': job.error,
+        'download_url': reverse('issues:report_job_download', kwargs={'pk': job.pk}) if job.state == 'done' else None,
+    }
+
+
+@staff_member_required
+@query_budget(queries=5, sql_ms=100)
+def report_job_detail(request, pk):
+    job = get_object_or_404(ReportJob, pk=pk)
+    return render(request, 'reports/report_job_detail.html', {
+        'job': job,
+        'job_status': _report_job_status(job),
+        'status_filter': dict(Issue.STATUS_CHOICES).get(job.status_filter, 'All') if job.status_filter else 'All',
+        'page_title': 'Issue Report',
+    })
+
+
+@staff_member_required
+@query_budget(queries=5, sql_ms=100)
+def report_job_status(request, pk):
+    """Polled by the report page until the PDF is ready."""
+    job = get_object_or_404(ReportJob, pk=pk)
+    return JsonResponse(_report_job_status(job))
+
+
+@staff_member_required
+@query_budget(queries=6, sql_ms=100)
+def report_job_download(request, pk):
+    job = get_object_or_404(ReportJob, pk=pk, state='done')
+    try:
+        pdf = job.file.open('rb')
+    except FileNotFoundError:
+        ReportJob.objects.filter(pk=job.pk).update(state='expired', file='', file_size=0)
+        messages.warning(request, "That report is no longer stored. Please generate it again.")
+        return redirect('issues:generate_issue_report')
+    ReportJob.objects.filter(pk=job.pk).update(last_accessed_at=timezone.now())
+    return FileResponse(pdf, as_attachment=True, filename=job.download_filename, content_type='application/pdf')
+
+
+@staff_member_required
+@query_budget(queries=5, sql_ms=100)
+def export_issues(request):
+    """Stream the filtered issues as CSV or JSON Lines; shows the filter form until one is submitted."""
+    if 'format' not in request.GET:
+        return render(request, 'reports/export_issues.html', {
+            'form': IssueExportForm(),
+            'page_title': 'Export Issues',
+        })
+
+    form = IssueExportForm(request.GET)
+    if not form.is_valid():
+        return render(request, 'reports/export_issues.html', {
+            'form': form,
+            'page_title': 'Export Issues',
+        }, status=400)
+
+    export_format, compress = form.cleaned_data['format'], form.cleaned_data['compress']
+    issues = export.export_queryset(
+        start_date=form.cleaned_data['start_date'],
+        end_date=form.cleaned_data['end_date'],
+        status=form.cleaned_data['status'],
+        category=form.cleaned_data['category'],
+        municipal_area=form.cleaned_data['municipal_area'],
+    )
+    content_type = 'application/gzip' if compress else export.FORMATS[export_format][0]
+    response = StreamingHttpResponse(export.stream_export(issues, export_format, compress), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export.export_filename(export_format, compress)}"'
+    return response
@@ -0,0 +1,20 @@
+from django.contrib import admin, messages
+
+from .models import OutboxEmail
+from . import mail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'kind', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('subject', 'recipients', 'last_error')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+    @admin.action(description='Send selected emails again')
+    def resend(self, request, queryset):
+        updated_count = queryset.exclude(status='pending').update(status='pending', attempts=0, last_error='')
+        mail.schedule_flush()
+        self.message_user(request, f'{updated_count} emails queued for sending.', messages.SUCCESS)
+
+    actions = ['resend']
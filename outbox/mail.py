@@ -0,0 +1,150 @@
+# outbox/mail.py
+"""
+Email outbox.
+
+Instead of calling send_mail() (one SMTP connection + TLS handshake per
+message), code calls queue_mail(), which stores an OutboxEmail row and
+schedules a flush. The flush task opens ONE connection with get_connection()
+and hands the pending messages to send_messages() in batches, so a storm of
+notifications costs a few connections instead of thousands. At most
+MAX_PER_FLUSH messages go out per flush; the rest wait FLUSH_INTERVAL seconds
+for the next one, which keeps us under the provider's rate limits.
+
+Settings (all optional) live in settings.EMAIL_OUTBOX:
+    FLUSH_DELAY       seconds to wait after the first queued email, so a burst is sent together
+    FLUSH_INTERVAL    seconds between flushes while a backlog remains
+    BATCH_SIZE        messages handed to one send_messages() call
+    MAX_PER_FLUSH     messages sent per flush (rate limit)
+    MAX_ATTEMPTS      flushes a message may fail before it is marked failed
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from taskqueue.queue import schedule_once
+
+from .models import OutboxEmail
+
+DEFAULTS = {
+    'FLUSH_DELAY': 5,
+    'FLUSH_INTERVAL': 60,
+    'BATCH_SIZE': 50,
+    'MAX_PER_FLUSH': 500,
+    'MAX_ATTEMPTS': 5,
+}
+
+FLUSH_TASK = 'outbox.tasks.flush_outbox'
+CLAIM_TIMEOUT = 600  # Seconds before emails claimed by a crashed flush are picked up again
+
+
+def get_setting(name):
+    return getattr(settings, 'EMAIL_OUTBOX', {}).get(name, DEFAULTS[name])
+
+
+def queue_mail(subject, message, recipient_list, html_message=None, from_email=None, kind=''):
+    """send_mail() replacement: store the email in the outbox and schedule a flush."""
+    recipients = [address for address in recipient_list if address]
+    if not recipients:
+        return None
+    email = OutboxEmail.objects.create(
+        kind=kind,
+        subject=subject,
+        body=message,
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=recipients,
+    )
+    schedule_flush()
+    return email
+
+
+def schedule_flush(countdown=None):
+    schedule_once(FLUSH_TASK, countdown=get_setting('FLUSH_DELAY') if countdown is None else countdown)
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email, email.recipients, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _claim_pending(limit):
+    """
+    Mark up to `limit` pending emails as 'sending' under a fresh token and
+    return them. Two flushes running at once never claim the same row.
+    """
+    stale_before = timezone.now() - timedelta(seconds=CLAIM_TIMEOUT)
+    OutboxEmail.objects.filter(status='sending', claimed_at__lt=stale_before).update(status='pending', claim_token='')
+
+    token = uuid.uuid4().hex
+    pending_ids = list(
+        OutboxEmail.objects.filter(status='pending').order_by('created_at', 'pk').values_list('pk', flat=True)[:limit]
+    )
+    OutboxEmail.objects.filter(pk__in=pending_ids, status='pending').update(
+        status='sending', claim_token=token, claimed_at=timezone.now()
+    )
+    return list(OutboxEmail.objects.filter(claim_token=token, status='sending').order_by('created_at', 'pk'))
+
+
+def flush(limit=None):
+    """
+    Send pending emails over a single reused connection. Returns (sent, failed).
+    Emails in a batch that raised go back to pending for a later flush.
+    """
+    batch_size = get_setting('BATCH_SIZE')
+    max_attempts = get_setting('MAX_ATTEMPTS')
+    claimed = _claim_pending(limit or get_setting('MAX_PER_FLUSH'))
+    sent_count = failed_count = 0
+    if not claimed:
+        return sent_count, failed_count
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for start in range(0, len(claimed), batch_size):
+            batch = claimed[start:start + batch_size]
+            try:
+                connection.send_messages([_build_message(email, connection) for email in batch])
+            except Exception as e:
+                failed_count += len(batch)
+                print(f"ERROR: Outbox batch of {len(batch)} emails failed: {e}")
+                _release(batch, max_attempts, error=str(e))
+                # The server may have dropped us; carry on with a fresh connection
+                connection.close()
+                connection.open()
+                continue
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                status='sent', sent_at=timezone.now(), claim_token=''
+            )
+            sent_count += len(batch)
+    except Exception as e:
+        # Could not (re)connect: hand back everything not yet sent, let the task retry
+        _release(
+            OutboxEmail.objects.filter(claim_token=claimed[0].claim_token, status='sending'),
+            max_attempts, error=str(e)
+        )
+        raise
+    finally:
+        connection.close()
+
+    print(f"Outbox flush: {sent_count} sent, {failed_count} failed.")
+    if OutboxEmail.objects.filter(status='pending').exists():
+        schedule_flush(countdown=get_setting('FLUSH_INTERVAL'))
+    return sent_count, failed_count
+
+
+def _release(emails, max_attempts, error):
+    with transaction.atomic():
+        for email in emails:
+            attempts = email.attempts + 1
+            OutboxEmail.objects.filter(pk=email.pk).update(
+                attempts=attempts, last_error=error, claim_token='',
+                status='failed' if attempts >= max_attempts else 'pending',
+            )
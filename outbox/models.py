@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class OutboxEmail(models.Model):
+    """An email waiting to be (or already) delivered by the outbox flusher."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),   # Claimed by a flush
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),     # Gave up after EMAIL_OUTBOX['MAX_ATTEMPTS']
+    ]
+
+    kind = models.CharField(max_length=50, blank=True, help_text="What produced this email, e.g. 'status_update' or 'admin_digest'")
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    claim_token = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at', 'pk']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='outbox_status_created_idx'),
+            models.Index(fields=['kind', 'created_at'], name='outbox_kind_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
@@ -0,0 +1,10 @@
+# outbox/tasks.py
+from taskqueue.queue import task
+
+from . import mail
+
+
+@task
+def flush_outbox():
+    """Send the pending outbox emails over one SMTP connection (see outbox/mail.py)."""
+    mail.flush()
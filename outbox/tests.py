@@ -0,0 +1,161 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail as django_mail
+from django.core.mail.backends import locmem
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from taskqueue.models import Task
+
+from issues import tasks as issue_tasks
+from issues.models import Issue
+
+from . import mail
+from .models import OutboxEmail
+
+User = get_user_model()
+
+
+class RecordingBackend(locmem.EmailBackend):
+    """locmem backend that records connections and batches, and can be told to fail."""
+    connections = 0
+    batches = []
+    failures = 0  # The next this-many send_messages() calls raise
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        RecordingBackend.connections += 1
+
+    def send_messages(self, messages):
+        if RecordingBackend.failures:
+            RecordingBackend.failures -= 1
+            raise ConnectionResetError("Connection reset by peer")
+        RecordingBackend.batches.append(len(messages))
+        return super().send_messages(messages)
+
+
+def outbox_settings(**overrides):
+    return override_settings(EMAIL_OUTBOX={**settings.EMAIL_OUTBOX, **overrides})
+
+
+@override_settings(EMAIL_BACKEND='outbox.tests.RecordingBackend')
+class OutboxFlushTests(TestCase):
+
+    def setUp(self):
+        RecordingBackend.connections = 0
+        RecordingBackend.batches = []
+        RecordingBackend.failures = 0
+
+    def queue(self, count):
+        return [
+            mail.queue_mail(f"Update {n}", "Body", [f"citizen{n}@example.com"], kind='status_update')
+            for n in range(count)
+        ]
+
+    def flush_tasks(self):
+        return Task.objects.filter(name=mail.FLUSH_TASK, status='pending')
+
+    def test_queueing_a_burst_schedules_one_flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.queue(3)
+        self.assertEqual(OutboxEmail.objects.filter(status='pending').count(), 3)
+        self.assertEqual(self.flush_tasks().count(), 1)
+        self.assertEqual(mail.queue_mail("Nobody", "Body", ['']), None)
+
+    @outbox_settings(BATCH_SIZE=2)
+    def test_flush_sends_batches_over_one_connection(self):
+        self.queue(5)
+        self.assertEqual(mail.flush(), (5, 0))
+        self.assertEqual(RecordingBackend.connections, 1)
+        self.assertEqual(RecordingBackend.batches, [2, 2, 1])
+        self.assertEqual(len(django_mail.outbox), 5)
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+
+    @outbox_settings(MAX_PER_FLUSH=3, FLUSH_INTERVAL=60)
+    def test_backlog_over_the_rate_limit_waits_for_the_next_flush(self):
+        emails = self.queue(5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(mail.flush(), (3, 0))
+        self.assertEqual(
+            list(OutboxEmail.objects.filter(status='pending').values_list('pk', flat=True)),
+            [email.pk for email in emails[3:]],  # Oldest go first
+        )
+        next_flush = self.flush_tasks().get()
+        self.assertGreater(next_flush.run_after, timezone.now() + datetime.timedelta(seconds=50))
+
+    @outbox_settings(BATCH_SIZE=2)
+    def test_failed_batch_is_released_and_sent_by_a_later_flush(self):
+        first, second, third = self.queue(3)
+        RecordingBackend.failures = 1
+        self.assertEqual(mail.flush(), (1, 2))
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts, first.claim_token), ('pending', 1, ''))
+        self.assertIn('Connection reset', first.last_error)
+        self.assertEqual(OutboxEmail.objects.get(pk=third.pk).status, 'sent')
+
+        self.assertEqual(mail.flush(), (2, 0))
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+
+    @outbox_settings(MAX_ATTEMPTS=2)
+    def test_email_is_marked_failed_after_max_attempts(self):
+        email, = self.queue(1)
+        RecordingBackend.failures = 2
+        mail.flush()
+        mail.flush()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+        self.assertEqual(mail.flush(), (0, 0))
+
+    def test_claim_of_a_crashed_flush_is_picked_up_again(self):
+        email, = self.queue(1)
+        stale = timezone.now() - datetime.timedelta(seconds=mail.CLAIM_TIMEOUT + 1)
+        OutboxEmail.objects.filter(pk=email.pk).update(status='sending', claim_token='abandoned', claimed_at=stale)
+        self.assertEqual(mail.flush(), (1, 0))
+
+    def test_fresh_claim_is_left_to_its_flush(self):
+        email, = self.queue(1)
+        OutboxEmail.objects.filter(pk=email.pk).update(status='sending', claim_token='other', claimed_at=timezone.now())
+        self.assertEqual(mail.flush(), (0, 0))
+
+
+@override_settings(ISSUE_ADMIN_NOTIFICATIONS='digest', ISSUE_ADMIN_DIGEST_INTERVAL=3600)
+class AdminDigestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='staff', email='staff@example.com', password='x', is_staff=True)
+        cls.reporter = User.objects.create_user(username='citizen', email='citizen@example.com', password='x')
+
+    def report(self, n):
+        return Issue.objects.create(
+            title=f'Leaking pipe {n}', description='Water everywhere.', user=self.reporter,
+            latitude='10.0000', longitude='76.3000',
+        )
+
+    def test_new_issues_schedule_one_digest_instead_of_one_email_each(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(3):
+                self.report(n)
+        self.assertEqual(Task.objects.filter(name=issue_tasks.send_new_issue_admin_digest.task_name).count(), 1)
+        self.assertFalse(Task.objects.filter(name=issue_tasks.send_new_issue_admin_notification.task_name).exists())
+        self.assertFalse(OutboxEmail.objects.filter(kind='new_issue_admin').exists())
+
+    def test_digest_covers_the_issues_since_the_previous_one(self):
+        for n in range(3):
+            self.report(n)
+        issue_tasks.send_new_issue_admin_digest()
+        digest = OutboxEmail.objects.get(kind='admin_digest')
+        self.assertEqual(digest.recipients, ['staff@example.com'])
+        self.assertIn('3 new issues', digest.subject)
+        self.assertIn('Leaking pipe 2', digest.body)
+
+        issue_tasks.send_new_issue_admin_digest()  # Nothing new since
+        self.assertEqual(OutboxEmail.objects.filter(kind='admin_digest').count(), 1)
+
+        self.report(3)
+        issue_tasks.send_new_issue_admin_digest()
+        latest = OutboxEmail.objects.filter(kind='admin_digest').latest('created_at')
+        self.assertIn('1 new issue reported', latest.subject)
+        self.assertIn('Leaking pipe 3', latest.body)
+        self.assertNotIn('Leaking pipe 2', latest.body)
@@ -0,0 +1,21 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_at', 'last_error')
+
+    @admin.action(description='Retry selected tasks now')
+    def retry_now(self, request, queryset):
+        updated_count = queryset.exclude(status='running').update(
+            status='pending', attempts=0, run_after=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{updated_count} tasks queued for retry.', messages.SUCCESS)
+
+    actions = ['retry_now']
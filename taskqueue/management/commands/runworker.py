@@ -0,0 +1,67 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from taskqueue import queue
+
+
+class Command(BaseCommand):
+    help = "Run background tasks from the database queue (see taskqueue/queue.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Number of worker threads (default: TASK_QUEUE['CONCURRENCY']).")
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Seconds to sleep when the queue is empty (default: TASK_QUEUE['POLL_INTERVAL']).")
+        parser.add_argument('--once', action='store_true',
+                            help="Process every task that is currently due, then exit.")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'] or queue.get_setting('CONCURRENCY'))
+        poll_interval = options['poll_interval'] or queue.get_setting('POLL_INTERVAL')
+        self.stop_event = threading.Event()
+        worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+        released = queue.release_stale_tasks()
+        if released:
+            self.stdout.write(self.style.WARNING(f"Re-queued {released} task(s) abandoned by a previous worker."))
+
+        if not options['once']:
+            signal.signal(signal.SIGINT, self.request_stop)
+            signal.signal(signal.SIGTERM, self.request_stop)
+            self.stdout.write(f"Starting {concurrency} worker thread(s). Press Ctrl+C to stop.")
+
+        threads = [
+            threading.Thread(
+                target=self.work, args=(f"{worker_prefix}:{index}", poll_interval, options['once']),
+                name=f"taskqueue-worker-{index}",
+            )
+            for index in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(self.style.SUCCESS("Worker stopped."))
+
+    def request_stop(self, signum, frame):
+        self.stdout.write("Finishing running tasks before shutting down...")
+        self.stop_event.set()
+
+    def work(self, worker_name, poll_interval, once):
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                task_obj = queue.claim_next_task(worker_name)
+                if task_obj is None:
+                    if once:
+                        return
+                    self.stop_event.wait(poll_interval)
+                    continue
+                queue.run_task(task_obj)
+        finally:
+            close_old_connections()
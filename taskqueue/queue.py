@@ -0,0 +1,187 @@
+# taskqueue/queue.py
+"""
+A small database-backed task queue.
+
+    from taskqueue.queue import task
+
+    @task(max_attempts=5)
+    def send_something(issue_pk):
+        ...
+
+    send_something.delay(issue.pk)   # inside a view or signal
+
+delay() stores a Task row once the current transaction commits (so a worker
+never sees work for data that was rolled back), and `python manage.py runworker`
+picks it up. Failed tasks are retried with exponential backoff until
+max_attempts is reached. schedule_once() queues a task only if an identical
+one is not already waiting, which is how periodic/debounced work is done.
+
+Settings (all optional) live in settings.TASK_QUEUE:
+    EAGER               run tasks in-process right after commit instead of queueing
+    CONCURRENCY         worker threads started by runworker
+    POLL_INTERVAL       seconds an idle worker sleeps between polls
+    MAX_ATTEMPTS        default attempts per task
+    RETRY_BACKOFF_BASE  first retry delay in seconds (doubles on every attempt)
+    RETRY_BACKOFF_MAX   cap for the retry delay
+    LOCK_TIMEOUT        seconds after which a 'running' task is considered abandoned
+"""
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task
+
+DEFAULTS = {
+    'EAGER': False,
+    'CONCURRENCY': 2,
+    'POLL_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF_BASE': 10,
+    'RETRY_BACKOFF_MAX': 3600,
+    'LOCK_TIMEOUT': 600,
+}
+
+_registry = {}
+
+
+def get_setting(name):
+    return getattr(settings, 'TASK_QUEUE', {}).get(name, DEFAULTS[name])
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(func=None, *, max_attempts=None, name=None):
+    """Register a function as a background task and give it .delay() and .schedule_once() methods."""
+    def decorator(function):
+        task_name = name or f'{function.__module__}.{function.__name__}'
+        function.task_name = task_name
+        function.max_attempts = max_attempts
+        function.delay = lambda *args, **kwargs: enqueue(task_name, *args, **kwargs)
+        function.schedule_once = lambda *args, **kwargs: schedule_once(task_name, *args, **kwargs)
+        _registry[task_name] = function
+        return function
+    return decorator(func) if func is not None else decorator
+
+
+def get_task_function(task_name):
+    try:
+        return _registry[task_name]
+    except KeyError:
+        raise UnknownTask(f"No task registered as '{task_name}'.")
+
+
+def enqueue(task_name, *args, run_after=None, **kwargs):
+    """
+    Queue `task_name(*args, **kwargs)` to run once the current transaction
+    commits. Arguments must be JSON serialisable (pass pks, not model instances).
+    """
+    function = get_task_function(task_name)
+
+    if get_setting('EAGER'):
+        transaction.on_commit(lambda: function(*args, **kwargs))
+        return
+
+    def create_task():
+        Task.objects.create(
+            name=task_name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=function.max_attempts or get_setting('MAX_ATTEMPTS'),
+            run_after=run_after or timezone.now(),
+        )
+    transaction.on_commit(create_task)
+
+
+def schedule_once(task_name, *args, countdown=0, **kwargs):
+    """
+    Like enqueue(), but does nothing if the same task with the same arguments
+    is already waiting to run. Used to debounce work that should happen at most
+    once per window (flushing the email outbox, building a digest).
+    """
+    function = get_task_function(task_name)
+
+    if get_setting('EAGER'):
+        transaction.on_commit(lambda: function(*args, **kwargs))
+        return
+
+    def create_task():
+        already_pending = Task.objects.filter(
+            name=task_name, status='pending', args=list(args), kwargs=kwargs
+        ).exists()
+        if not already_pending:
+            Task.objects.create(
+                name=task_name,
+                args=list(args),
+                kwargs=kwargs,
+                max_attempts=function.max_attempts or get_setting('MAX_ATTEMPTS'),
+                run_after=timezone.now() + timedelta(seconds=countdown),
+            )
+    transaction.on_commit(create_task)
+
+
+def retry_delay(attempts):
+    """Exponential backoff with a little jitter so retries don't stampede."""
+    base = get_setting('RETRY_BACKOFF_BASE') * (2 ** max(attempts - 1, 0))
+    return min(base, get_setting('RETRY_BACKOFF_MAX')) * random.uniform(0.9, 1.1)
+
+
+def release_stale_tasks():
+    """Put tasks whose worker died mid-run back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=get_setting('LOCK_TIMEOUT'))
+    return Task.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='pending', locked_by='', locked_at=None
+    )
+
+
+def claim_next_task(worker_name, batch=10):
+    """
+    Atomically claim one due task. The conditional UPDATE only succeeds for one
+    worker per row, so this works on SQLite as well as on Postgres/MySQL.
+    """
+    now = timezone.now()
+    candidate_ids = list(
+        Task.objects.filter(status='pending', run_after__lte=now)
+        .order_by('run_after', 'pk').values_list('pk', flat=True)[:batch]
+    )
+    for task_id in candidate_ids:
+        claimed = Task.objects.filter(pk=task_id, status='pending').update(
+            status='running', locked_by=worker_name, locked_at=now
+        )
+        if claimed:
+            return Task.objects.get(pk=task_id)
+    return None
+
+
+def run_task(task_obj):
+    """Execute a claimed task and record the outcome. Returns True on success."""
+    task_obj.attempts += 1
+    try:
+        function = get_task_function(task_obj.name)
+        function(*task_obj.args, **task_obj.kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+        if task_obj.attempts >= task_obj.max_attempts or isinstance(e, UnknownTask):
+            Task.objects.filter(pk=task_obj.pk).update(
+                status='failed', attempts=task_obj.attempts, last_error=error,
+                locked_by='', locked_at=None, finished_at=timezone.now()
+            )
+            print(f"ERROR: Task {task_obj} failed permanently after {task_obj.attempts} attempts: {e}")
+        else:
+            delay = retry_delay(task_obj.attempts)
+            Task.objects.filter(pk=task_obj.pk).update(
+                status='pending', attempts=task_obj.attempts, last_error=error,
+                locked_by='', locked_at=None, run_after=timezone.now() + timedelta(seconds=delay)
+            )
+            print(f"WARNING: Task {task_obj} failed (attempt {task_obj.attempts}), retrying in {delay:.0f}s: {e}")
+        return False
+
+    Task.objects.filter(pk=task_obj.pk).update(
+        status='done', attempts=task_obj.attempts, locked_by='', locked_at=None, finished_at=timezone.now()
+    )
+    return True
@@ -0,0 +1,21 @@
+# users/tasks.py
+from django.template.loader import render_to_string
+
+from outbox.mail import queue_mail
+from taskqueue.queue import task
+
+from .models import User
+
+
+@task
+def send_activation_email(user_pk, verification_link):
+    """Send the account activation link to a newly registered user."""
+    user = User.objects.filter(pk=user_pk).first()
+    if user is None or user.is_active:  # Deleted, or already activated by an admin
+        return
+    subject = 'Activate Your CommunityWatch Account'
+    message = render_to_string('users/email/account_activation_email.html', {
+        'user': user,
+        'verification_link': verification_link,
+    })
+    queue_mail(subject, message, [user.email], kind='account_activation')
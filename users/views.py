@@ -8,8 +8,6 @@ from django.urls import reverse_lazy
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import default_token_generator
-from django.template.loader import render_to_string
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from .forms import UserUpdateForm
@@ -17,6 +15,7 @@ from .forms import UserUpdateForm
 
 from .forms import UserRegisterForm
 from .models import User # Your custom User model
+from .tasks import send_activation_email
 
 def register(request):
     if request.method == 'POST':
@@ -32,12 +31,8 @@ def register(request):
             verification_link = request.build_absolute_uri(
                 reverse_lazy('users:activate', kwargs={'uidb64': uid, 'token': token})
             )
-            subject = 'Activate Your CommunityWatch Account'
-            message = render_to_string('users/email/account_activation_email.html', {
-                'user': user,
-                'verification_link': verification_link,
-            })
-            send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email])
+            # Sent by the task worker once the new user is committed
+            send_activation_email.delay(user.pk, verification_link)
 
             messages.success(request, 'Registration successful! Please check your email to activate your account.')
             return redirect('users:login') # Or a page saying "check your email"